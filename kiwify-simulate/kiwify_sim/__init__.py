@@ -0,0 +1,5 @@
+"""
+Simulador de webhooks da Kiwify: payloads, geração de carga, estatísticas e receptor local
+
+A CLI fica em simulate_webhook.py; cada módulo do pacote cobre uma parte do simulador.
+"""
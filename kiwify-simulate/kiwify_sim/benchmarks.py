@@ -0,0 +1,233 @@
+"""
+Benchmarks de assinatura e de tamanho do payload
+"""
+
+import json
+import time
+import random
+import uuid
+import hmac
+import hashlib
+import itertools
+import statistics
+from typing import Dict, Any, Optional, List, Tuple, Iterable
+
+from .payloads import (
+    EventType, PLAN_MAPPING, PayloadFactory, encode_payload, SignatureVerifier, prepare_event, inflate_payload,
+    scale_payload,
+)
+from .loadgen import run_load
+
+
+def _measure_ops(operation, seconds: float) -> float:
+    """Executa `operation` repetidamente por `seconds` segundos e retorna operações por segundo"""
+    count = 0
+    batch = 64
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        for _ in range(batch):
+            operation()
+        count += batch
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - started)
+
+
+# Casos medidos pelo benchmark de assinatura
+SIGNATURE_BENCH_CASES = ("hmac.new", "copy", "verify", "verify+json")
+
+
+def benchmark_signatures(
+    secret_key: str,
+    event_types: Iterable[EventType],
+    sizes: Iterable[int] = (),
+    seconds: float = 0.5,
+) -> List[Dict[str, Any]]:
+    """
+    Mede a vazão de assinatura e verificação por tipo de evento e tamanho do corpo
+    
+    Casos medidos (operações por segundo):
+        hmac.new     assinatura processando a chave a cada chamada
+        copy         assinatura a partir do estado pré-calculado (SignatureVerifier)
+        verify       verificação dos bytes recebidos com compare_digest
+        verify+json  verificação como o backend, reserializando o JSON antes
+    
+    Args:
+        secret_key: Chave usada nas assinaturas
+        event_types: Tipos de evento medidos
+        sizes: Tamanhos adicionais do corpo em bytes (além do payload original)
+        seconds: Duração de cada medição
+    
+    Returns:
+        Uma linha por (evento, tamanho) com as operações por segundo de cada caso
+    """
+    factory = PayloadFactory(seed=0)
+    key = secret_key.encode("utf-8")
+    verifier = SignatureVerifier(secret_key)
+    rows = []
+    for event_type in event_types:
+        base = factory.build(event_type, "benchmark@example.com")
+        payloads = [base] + [inflate_payload(base, size) for size in sizes]
+        for payload in payloads:
+            body = encode_payload(payload)
+            signature = verifier.sign(body)
+            operations = {
+                "hmac.new": lambda: hmac.new(key, body, hashlib.sha1).hexdigest(),
+                "copy": lambda: verifier.sign(body),
+                "verify": lambda: verifier.verify(body, signature),
+                "verify+json": lambda: verifier.verify(encode_payload(json.loads(body)), signature),
+            }
+            rows.append({
+                "event": event_type.value,
+                "bytes": len(body),
+                "ops_per_s": {
+                    case: round(_measure_ops(operations[case], seconds), 1) for case in SIGNATURE_BENCH_CASES
+                },
+            })
+    return rows
+
+
+def print_signature_benchmark(rows: List[Dict[str, Any]]) -> None:
+    header = "".join(f"{case:>14}" for case in SIGNATURE_BENCH_CASES)
+    print("\n🔏 Vazão de assinatura (operações/s)")
+    print(f"   {'evento':<24}{'bytes':>8}{header}{'MB/s copy':>12}")
+    for row in rows:
+        cells = "".join(f"{row['ops_per_s'][case]:>14,.0f}" for case in SIGNATURE_BENCH_CASES)
+        throughput = row["ops_per_s"]["copy"] * row["bytes"] / 1e6
+        print(f"   {row['event']:<24}{row['bytes']:>8}{cells}{throughput:>12.1f}")
+
+
+def payload_bench_cases(
+    charges: List[int],
+    tracking: List[int],
+    name_lengths: List[int],
+    grid: bool = False,
+) -> List[Tuple[int, int, int]]:
+    """
+    Combinações (cobranças, rastreamento, nome) medidas pelo bench-payload
+    
+    Sem `grid` varia uma dimensão por vez, com as outras no primeiro valor da lista;
+    com `grid` mede o produto cartesiano completo.
+    """
+    if grid:
+        return list(itertools.product(charges, tracking, name_lengths))
+    base = (charges[0], tracking[0], name_lengths[0])
+    cases = [base]
+    for axis, values in enumerate((charges, tracking, name_lengths)):
+        for value in values[1:]:
+            case = list(base)
+            case[axis] = value
+            cases.append((case[0], case[1], case[2]))
+    return cases
+
+
+async def benchmark_payload_sizes(
+    url: str,
+    sender,
+    secret_key: str,
+    event_type: EventType,
+    cases: List[Tuple[int, int, int]],
+    requests: int = 30,
+    concurrency: int = 1,
+    seed: int = 0,
+    local_seconds: float = 0.2,
+    on_case=None,
+    run_id: str = "",
+) -> List[Dict[str, Any]]:
+    """
+    Mede como a latência e a aceitação da assinatura variam com o tamanho do payload
+    
+    Cada caso envia `requests` eventos assinados e conta as respostas 401 como
+    assinaturas recusadas. Com eventos que não são compras, cada caso antes aprova
+    um cliente da sonda (fora da medição) e os eventos medidos usam o email e o
+    subscription_id dele, para medir o caminho real do backend e não a resposta de
+    assinatura não encontrada; compras usam um email novo por requisição. Localmente
+    mede o custo de json.loads + reserialização + HMAC, o mesmo trabalho do
+    validateKiwifyWebhook com JSON.stringify(req.body), e confere se a
+    reserialização reproduz os bytes.
+    
+    Args:
+        url: URL do webhook
+        sender: WebhookSender ou AsyncWebhookSender
+        secret_key: Chave secreta da Kiwify
+        event_type: Tipo do evento enviado
+        cases: Combinações (cobranças, caracteres de rastreamento, caracteres do nome)
+        requests: Requisições por caso
+        concurrency: Requisições simultâneas em cada caso
+        seed: Semente dos ids gerados
+        local_seconds: Duração da medição local de cada caso
+        on_case: Função chamada com a linha de cada caso concluído (opcional)
+        run_id: Identificador da execução nos emails (opcional, sorteado se omitido)
+    
+    Returns:
+        Uma linha por caso, na ordem de `cases`
+    
+    Raises:
+        RuntimeError: Se a compra do cliente da sonda de algum caso falhar
+    """
+    factory = PayloadFactory(seed=seed)
+    rng = random.Random(seed)
+    verifier = SignatureVerifier(secret_key)
+    run_id = run_id or uuid.uuid4().hex[:8]
+    plans = list(PLAN_MAPPING)
+    rows = []
+    for index, (charges, tracking, name_length) in enumerate(cases):
+        if event_type == EventType.ORDER_APPROVED:
+            payloads = [
+                factory.build(event_type, f"loadtest+payload-{run_id}-{index + 1}-{number}@example.com",
+                              plan_id=rng.choice(plans))
+                for number in range(1, requests + 1)
+            ]
+        else:
+            email = f"loadtest+payload-{run_id}-{index + 1}@example.com"
+            approval = factory.build(EventType.ORDER_APPROVED, email, plan_id=rng.choice(plans))
+            probe = await run_load(url, [prepare_event(approval, secret_key)], sender)
+            if not probe.succeeded:
+                status = ", ".join(f"HTTP {code}" for code in probe.status_counts) or "sem resposta"
+                raise RuntimeError(f"A compra do cliente da sonda ({email}) falhou ({status}); "
+                                   f"confira a URL e a chave secreta")
+            payloads = [
+                factory.build(event_type, email, subscription_id=approval["subscription_id"])
+                for _ in range(requests)
+            ]
+        events = [
+            prepare_event(scale_payload(payload, charges, tracking, name_length, rng), secret_key)
+            for payload in payloads
+        ]
+        stats = await run_load(url, events, sender, concurrency=concurrency)
+        
+        body, signature = events[0].body, events[0].signature
+        local_ops = _measure_ops(lambda: verifier.verify(encode_payload(json.loads(body)), signature), local_seconds)
+        rejected = stats.status_counts.get(401, 0)
+        latency = stats.latency["total"]
+        row = {
+            "charges": charges,
+            "tracking_chars": tracking,
+            "name_chars": name_length,
+            "bytes": round(statistics.mean(len(event.body) for event in events)),
+            "requests": stats.sent,
+            "accepted": stats.succeeded,
+            "signature_rejected": rejected,
+            "other_failures": stats.sent - stats.succeeded - rejected,
+            "p50_ms": round(latency.percentile_ms(50), 3),
+            "p99_ms": round(latency.percentile_ms(99), 3),
+            "local_verify_json_us": round(1e6 / local_ops, 2),
+            "roundtrip_ok": encode_payload(json.loads(body)) == body,
+        }
+        rows.append(row)
+        if on_case is not None:
+            on_case(row)
+    return rows
+
+
+def latency_slope(rows: List[Dict[str, Any]], key: str = "p50_ms") -> Optional[float]:
+    """Inclinação em ms por KB da reta de mínimos quadrados de `key` contra o tamanho do corpo"""
+    points = [(row["bytes"] / 1024, row[key]) for row in rows if row["requests"]]
+    if len({size for size, _ in points}) < 2:
+        return None
+    mean_size = statistics.mean(size for size, _ in points)
+    mean_latency = statistics.mean(latency for _, latency in points)
+    covariance = sum((size - mean_size) * (latency - mean_latency) for size, latency in points)
+    variance = sum((size - mean_size) ** 2 for size, _ in points)
+    return covariance / variance
@@ -0,0 +1,137 @@
+"""
+Busca da vazão máxima que atende ao SLO, em degraus de taxa crescente
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple, Iterator
+
+from .payloads import PreparedEvent
+from .loadgen import RateProfile, Pacing, run_load
+
+
+@dataclass
+class CapacityStep:
+    """Resultado de um degrau da busca de capacidade"""
+    rps: float
+    achieved_rps: float
+    requests: int
+    p99_ms: float
+    error_rate: float
+    passed: bool
+    phase: str = "ramp"  # "ramp" ou "search"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phase": self.phase,
+            "rps": round(self.rps, 3),
+            "achieved_rps": round(self.achieved_rps, 3),
+            "requests": self.requests,
+            "p99_ms": round(self.p99_ms, 3),
+            "error_rate": round(self.error_rate, 6),
+            "passed": self.passed,
+        }
+
+
+async def find_capacity(
+    url: str,
+    events: Iterator[PreparedEvent],
+    sender,
+    slo_p99_ms: float = 800.0,
+    max_error_rate: float = 0.001,
+    start_rps: float = 5.0,
+    max_rps: float = 1000.0,
+    step_factor: float = 2.0,
+    step_duration: float = 10.0,
+    precision: float = 0.05,
+    concurrency: int = 100,
+    min_achieved: float = 0.9,
+    on_step=None,
+) -> Tuple[Optional[float], List[CapacityStep]]:
+    """
+    Encontra a maior taxa sustentável dentro do SLO
+    
+    Cada degrau dispara no modelo aberto e mede o p99 desde o instante previsto
+    de envio. Sobe a taxa multiplicando-a por `step_factor` a cada degrau (o último
+    degrau é limitado a `max_rps`, que é sempre testado) até o SLO ser violado (p99
+    acima do limite, erros acima do limite ou taxa alcançada abaixo de
+    `min_achieved` da pedida) e então faz uma busca binária, em escala geométrica,
+    entre o último degrau aprovado e o primeiro reprovado. Se o primeiro degrau
+    já viola o SLO não há busca: nenhuma taxa abaixo de `start_rps` é medida.
+    
+    Args:
+        url: URL do endpoint do webhook
+        events: Fluxo de eventos compartilhado entre os degraus (os emails não se repetem)
+        sender: WebhookSender ou AsyncWebhookSender, reaproveitado entre os degraus
+        slo_p99_ms: Latência p99 máxima em ms
+        max_error_rate: Fração máxima de requisições sem resposta 2xx
+        start_rps: Taxa do primeiro degrau
+        max_rps: Taxa máxima testada
+        step_factor: Fator de multiplicação da taxa na rampa
+        step_duration: Duração de cada degrau em segundos
+        precision: Encerra a busca quando o intervalo for menor que esta fração
+        concurrency: Máximo de requisições em andamento no modelo aberto
+        min_achieved: Fração mínima da taxa pedida que precisa ser alcançada
+        on_step: Função chamada com cada CapacityStep concluído (opcional)
+    
+    Returns:
+        (maior taxa aprovada ou None se nem a inicial foi sustentada, degraus executados)
+    """
+    steps: List[CapacityStep] = []
+    
+    async def measure(rps: float, phase: str) -> bool:
+        stats = await run_load(
+            url,
+            events,
+            sender,
+            pacing=Pacing(profile=RateProfile([(math.inf, rps)])),
+            duration=step_duration,
+            open_model=True,
+            max_in_flight=concurrency,
+        )
+        p99_ms = stats.response_latency.percentile_ms(99)
+        passed = (
+            stats.sent > 0
+            and p99_ms <= slo_p99_ms
+            and stats.error_rate <= max_error_rate
+            and stats.achieved_rps >= rps * min_achieved
+        )
+        step = CapacityStep(rps, stats.achieved_rps, stats.sent, p99_ms, stats.error_rate, passed, phase)
+        steps.append(step)
+        if on_step is not None:
+            on_step(step)
+        return passed
+    
+    best: Optional[float] = None
+    breach: Optional[float] = None
+    rps = start_rps
+    while True:
+        if not await measure(rps, "ramp"):
+            breach = rps
+            break
+        best = rps
+        if rps >= max_rps:
+            break
+        rps = min(rps * step_factor, max_rps)
+    
+    if breach is not None and best is not None:
+        low = best
+        while breach / low > 1 + precision:
+            middle = math.sqrt(low * breach)
+            if await measure(middle, "search"):
+                best = low = middle
+            else:
+                breach = middle
+    return best, steps
+
+
+def latency_inflection(steps: List[CapacityStep], factor: float = 2.0) -> Optional[CapacityStep]:
+    """Primeiro degrau (em ordem de taxa) cujo p99 passa de `factor` vezes o p99 da menor taxa"""
+    ordered = sorted((step for step in steps if step.requests), key=lambda step: step.rps)
+    if not ordered:
+        return None
+    baseline = ordered[0].p99_ms
+    for step in ordered[1:]:
+        if step.p99_ms > baseline * factor:
+            return step
+    return None
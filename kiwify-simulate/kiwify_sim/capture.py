@@ -0,0 +1,361 @@
+"""
+Proxy de gravação (record) e leitura das capturas de webhooks reais
+"""
+
+import json
+import time
+import asyncio
+import itertools
+import os
+import zlib
+import gzip
+import struct
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, Iterator, Iterable
+from urllib.parse import urlparse, urlunparse, parse_qs
+
+from .payloads import PreparedEvent, endpoint_url
+from .providers import TikTokProvider, SaleProvider, PROVIDERS
+from .receiver import HTTP_REASONS, HttpRequestError, read_http_request, write_http_error, http_keep_alive
+
+
+# Entrada do índice da captura: offset no log, tamanho comprimido e instante (epoch) do registro
+CAPTURE_INDEX_ENTRY = struct.Struct("<QId")
+# Cabeçalhos que dizem respeito a cada conexão e não são repassados ao destino
+HOP_BY_HOP_HEADERS = frozenset((
+    "host", "connection", "keep-alive", "proxy-connection", "transfer-encoding", "te", "trailer",
+    "upgrade", "content-length",
+))
+# Cabeçalhos com credenciais ou dados do cliente: repassados ao destino, mas gravados como "[redacted]"
+REDACTED_CAPTURE_HEADERS = frozenset((
+    "authorization", "proxy-authorization", "cookie", "set-cookie", "x-api-key", "x-kiwify-token",
+    "x-forwarded-for", "x-real-ip", "forwarded", "x-cloud-trace-context", "traceparent", "tracestate",
+))
+# Bloco lido por vez ao varrer uma captura sem índice
+CAPTURE_SCAN_CHUNK = 64 * 1024
+
+
+def redact_capture_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Headers gravados na captura, com os valores de REDACTED_CAPTURE_HEADERS ocultos"""
+    return {
+        name: "[redacted]" if name in REDACTED_CAPTURE_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+class CaptureLog:
+    """
+    Log de captura comprimido e somente de acréscimo, com índice de offsets
+    
+    Cada requisição vira um membro gzip independente no arquivo de dados (o
+    arquivo inteiro pode ser lido com zcat), contendo uma linha JSON com os
+    metadados seguida do corpo bruto e de uma quebra de linha. O índice
+    (<arquivo>.idx) guarda offset, tamanho e instante de cada registro, para
+    leitura direta de qualquer trecho; se ele se perder, read_capture refaz a
+    varredura do arquivo de dados.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Arquivo de dados (criado ou continuado; o índice fica em <path>.idx)
+        """
+        self.path = path
+        self._data = open(path, "ab")
+        self._index = open(path + ".idx", "ab")
+        self.offset = self._data.tell()
+        self.records = self._index.tell() // CAPTURE_INDEX_ENTRY.size
+    
+    def append(self, metadata: Dict[str, Any], body: bytes) -> int:
+        """
+        Acrescenta um registro e o torna visível no índice
+        
+        Returns:
+            Número do registro na captura
+        """
+        header = json.dumps({**metadata, "body_length": len(body)}, separators=(',', ':'), ensure_ascii=False)
+        member = gzip.compress(header.encode("utf-8") + b"\n" + body + b"\n", mtime=0)
+        self._data.write(member)
+        self._data.flush()
+        # O índice só aponta para dados já gravados
+        self._index.write(CAPTURE_INDEX_ENTRY.pack(self.offset, len(member), metadata.get("ts", 0.0)))
+        self._index.flush()
+        self.offset += len(member)
+        self.records += 1
+        return self.records - 1
+    
+    def close(self) -> None:
+        self._data.close()
+        self._index.close()
+
+
+def is_capture_file(path: str) -> bool:
+    """Se o arquivo é um log de captura (gzip) em vez de um NDJSON de eventos"""
+    with open(path, "rb") as f:
+        return f.read(2) == b"\x1f\x8b"
+
+
+def _parse_capture_record(data: bytes) -> Tuple[Dict[str, Any], bytes]:
+    header, _, rest = data.partition(b"\n")
+    metadata = json.loads(header)
+    return metadata, rest[:metadata["body_length"]]
+
+
+def _scan_capture(path: str) -> Iterator[Tuple[int, int]]:
+    """
+    (offset, tamanho) de cada membro gzip, para capturas sem índice válido
+    
+    Lê o arquivo em blocos de CAPTURE_SCAN_CHUNK, um membro por vez, sem carregar
+    a captura inteira na memória.
+    """
+    with open(path, "rb") as f:
+        offset = 0
+        while True:
+            f.seek(offset)
+            decompressor = zlib.decompressobj(wbits=31)
+            consumed = 0
+            while not decompressor.eof:
+                chunk = f.read(CAPTURE_SCAN_CHUNK)
+                if not chunk:
+                    return  # Fim do arquivo ou último registro incompleto (gravação interrompida)
+                consumed += len(chunk)
+                decompressor.decompress(chunk)
+            length = consumed - len(decompressor.unused_data)
+            yield offset, length
+            offset += length
+
+
+def read_capture(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[Dict[str, Any], bytes]]:
+    """
+    Lê os registros [start, stop) de uma captura
+    
+    Usa o índice para ir direto ao primeiro registro pedido; sem índice (ou com
+    índice maior que os dados) varre o arquivo.
+    
+    Returns:
+        Iterador de (metadados, corpo bruto)
+    """
+    index_path = path + ".idx"
+    data_size = os.path.getsize(path)
+    entries: Iterable[Tuple[int, int]]
+    if os.path.isfile(index_path):
+        with open(index_path, "rb") as f:
+            raw = f.read()
+        count = len(raw) // CAPTURE_INDEX_ENTRY.size
+        last = CAPTURE_INDEX_ENTRY.unpack_from(raw, (count - 1) * CAPTURE_INDEX_ENTRY.size) if count else None
+        if last is None or last[0] + last[1] <= data_size:
+            stop = count if stop is None else min(stop, count)
+            entries = (
+                CAPTURE_INDEX_ENTRY.unpack_from(raw, number * CAPTURE_INDEX_ENTRY.size)[:2]
+                for number in range(start, stop)
+            )
+        else:
+            entries = itertools.islice(_scan_capture(path), start, stop)
+    else:
+        entries = itertools.islice(_scan_capture(path), start, stop)
+    
+    with open(path, "rb") as f:
+        for offset, length in entries:
+            f.seek(offset)
+            yield _parse_capture_record(gzip.decompress(f.read(length)))
+
+
+def capture_to_event(metadata: Dict[str, Any], body: bytes, origin: float) -> PreparedEvent:
+    """
+    Converte uma entrega capturada em evento para o replay
+    
+    O provedor sai do caminho capturado, a assinatura do query parameter (Kiwify)
+    ou do header x-tiktok-signature, e o instante é relativo à primeira entrega.
+    O corpo é reenviado byte a byte como chegou.
+    """
+    endpoint = metadata.get("path", "").rstrip("/").rpartition("/")[2]
+    provider = next((p for p in PROVIDERS.values() if p.endpoint == endpoint), PROVIDERS["kiwify"])
+    headers = metadata.get("headers") or {}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    payload = payload if isinstance(payload, dict) else {}
+    
+    if provider.name == "tiktok":
+        data = payload.get("data") if isinstance(payload.get("data"), dict) else {}
+        event_type = f"tiktok:{data.get('order_status') or payload.get('event_type') or ''}"
+        signature = headers.get("x-tiktok-signature", "")
+        group = str(payload.get("shop_id") or "")
+    elif provider.name == "sale":
+        event_type = f"sale:{payload.get('status') or 'completed'}"
+        signature = ""
+        group = headers.get("x-user-id") or str(payload.get("userId") or "")
+    else:
+        event_type = payload.get("webhook_event_type") or ""
+        signature = metadata.get("signature") or ""
+        group = payload.get("subscription_id") or (payload.get("Subscription") or {}).get("id") or ""
+    return PreparedEvent(
+        event_type=event_type,
+        body=body,
+        signature=signature,
+        subscription_id=group,
+        at=max(0.0, metadata.get("ts", origin) - origin),
+        provider=provider.name,
+    )
+
+
+def iter_capture_events(path: str) -> Iterator[PreparedEvent]:
+    """Eventos de uma captura para o replay (apenas requisições POST)"""
+    origin: Optional[float] = None
+    for metadata, body in read_capture(path):
+        if metadata.get("method") != "POST":
+            continue
+        if origin is None:
+            origin = metadata.get("ts", 0.0)
+        yield capture_to_event(metadata, body, origin)
+
+
+class RecordingProxy:
+    """
+    Proxy reverso que grava cada entrega recebida e a repassa sem alterações
+    
+    Corpo, query string e headers (exceto os de conexão) seguem byte a byte para
+    o destino; a resposta do destino volta ao remetente. Na captura, os valores
+    de headers com credenciais ou dados do cliente (REDACTED_CAPTURE_HEADERS)
+    são gravados como "[redacted]". Caminhos terminados em
+    tiktokWebhook e saleWebhook são enviados à função correspondente ao lado da
+    URL de destino.
+    """
+    
+    def __init__(self, target: str, log: CaptureLog, timeout: float = 30.0, pool_size: int = 32):
+        """
+        Args:
+            target: URL do webhook de destino (ex: a do kiwifyWebhook)
+            log: Log onde as entregas são gravadas
+            timeout: Timeout do repasse em segundos
+            pool_size: Conexões mantidas com o destino
+        """
+        self.target = target
+        self.log = log
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+        self.forwarded = 0
+        self.failed = 0
+        self.status_counts: Dict[int, int] = {}
+    
+    def upstream_url(self, path: str, query: str) -> str:
+        """URL de destino de uma requisição recebida (mesma query string)"""
+        endpoint = path.rstrip("/").rpartition("/")[2]
+        url = self.target
+        if endpoint in (TikTokProvider.endpoint, SaleProvider.endpoint):
+            url = endpoint_url(url, endpoint)
+        if query:
+            parsed_url = urlparse(url)
+            url = urlunparse(parsed_url._replace(query=query))
+        return url
+    
+    def _forward(self, method: str, url: str, headers: Dict[str, str], body: bytes) -> Tuple[int, str, bytes]:
+        response = self.session.request(
+            method, url, data=body, headers=headers, timeout=self.timeout, allow_redirects=False
+        )
+        return response.status_code, response.headers.get("Content-Type", ""), response.content
+    
+    async def handle(
+        self,
+        method: str,
+        target: str,
+        headers: Dict[str, str],
+        body: bytes,
+        remote: str = "",
+    ) -> Tuple[int, str, bytes]:
+        """
+        Repassa a requisição ao destino e grava a entrega
+        
+        Returns:
+            (status HTTP, Content-Type, corpo) da resposta do destino (502 se falhar)
+        """
+        received_at = time.time()
+        path, _, query = target.partition("?")
+        forward_headers = {name: value for name, value in headers.items() if name not in HOP_BY_HOP_HEADERS}
+        started = time.perf_counter()
+        try:
+            status, content_type, response_body = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._forward, method, self.upstream_url(path, query), forward_headers, body
+            )
+            self.forwarded += 1
+        except requests.RequestException as e:
+            status, content_type = 502, "application/json; charset=utf-8"
+            response_body = json.dumps({"success": False, "error": "BadGateway", "message": str(e)}).encode("utf-8")
+            self.failed += 1
+        upstream_ms = (time.perf_counter() - started) * 1000.0
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        
+        self.log.append({
+            "ts": received_at,
+            "method": method,
+            "path": path,
+            "query": query,
+            "signature": parse_qs(query).get("signature", [""])[0],
+            "headers": redact_capture_headers(headers),
+            "remote": remote,
+            "status": status,
+            "upstream_ms": round(upstream_ms, 3),
+        }, body)
+        return status, content_type, response_body
+    
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+
+async def _proxy_connection(proxy: RecordingProxy, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Atende as requisições HTTP/1.1 de uma conexão do proxy (com keep-alive)"""
+    peer = writer.get_extra_info("peername")
+    remote = f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else ""
+    try:
+        while True:
+            try:
+                request = await read_http_request(reader)
+            except HttpRequestError as e:
+                await write_http_error(writer, e)
+                return
+            if request is None:
+                return
+            method, target, version, headers, body = request
+            status, content_type, response_body = await proxy.handle(method, target, headers, body, remote)
+            keep_alive = http_keep_alive(version, headers)
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type or 'application/octet-stream'}\r\n"
+                f"Content-Length: {len(response_body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + response_body
+            )
+            await writer.drain()
+            if not keep_alive:
+                return
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return
+    finally:
+        writer.close()
+
+
+async def run_recording_proxy(
+    proxy: RecordingProxy,
+    host: str = "127.0.0.1",
+    port: int = 8788,
+    duration: Optional[float] = None,
+) -> None:
+    """Atende o proxy de gravação até ser interrompido (ou por `duration` segundos)"""
+    server = await asyncio.start_server(
+        lambda reader, writer: _proxy_connection(proxy, reader, writer),
+        host,
+        port,
+        backlog=1024,
+    )
+    async with server:
+        if duration is None:
+            await server.serve_forever()
+        else:
+            await asyncio.sleep(duration)
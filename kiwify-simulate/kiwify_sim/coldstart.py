@@ -0,0 +1,235 @@
+"""
+Sonda de cold starts por ociosidade e rajadas de concorrência
+"""
+
+import time
+import uuid
+import itertools
+import statistics
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple
+
+from .payloads import EventType, PayloadFactory
+from .senders import WebhookSender, signed_request
+
+
+@dataclass
+class ColdStartProbe:
+    """Uma requisição da sonda de cold start"""
+    phase: str  # "warmup", "gap" ou "burst"
+    idle: float  # Segundos ocioso antes do envio
+    concurrency: int
+    status: Optional[int]
+    server_ms: float  # Até o primeiro byte, descontado o tempo de conexão
+    total_ms: float
+    error: Optional[str] = None
+    cold: bool = False
+    
+    @property
+    def ok(self) -> bool:
+        """Resposta 2xx (erros de transporte e demais status contam como erro)"""
+        return self.status is not None and 200 <= self.status < 300
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phase": self.phase,
+            "idle_s": self.idle,
+            "concurrency": self.concurrency,
+            "status": self.status,
+            "server_ms": round(self.server_ms, 3),
+            "total_ms": round(self.total_ms, 3),
+            "error": self.error,
+            "cold": self.cold,
+        }
+
+
+class ColdStartProber:
+    """
+    Sonda que separa cold starts das respostas quentes do webhook
+    
+    Primeiro mede a latência quente com requisições seguidas; depois envia eventos
+    após períodos ociosos crescentes e em rajadas simultâneas. Uma resposta é fria
+    quando o tempo de servidor (TTFB menos conexão) passa do limiar derivado da
+    latência quente. Cada requisição usa uma conexão nova, para que o reaproveitamento
+    de conexões não se confunda com o estado das instâncias.
+    
+    Com eventos que não são compras, a primeira requisição do aquecimento aprova um
+    cliente da sonda e as demais usam o email e o subscription_id dele, para medir o
+    caminho real do backend e não a resposta de assinatura não encontrada.
+    """
+    
+    def __init__(
+        self,
+        url: str,
+        secret_key: str,
+        event_type: EventType = EventType.SUBSCRIPTION_RENEWED,
+        timeout: float = 60.0,
+        max_concurrency: int = 1,
+        seed: int = 0,
+        sleep=time.sleep,
+    ):
+        """
+        Args:
+            url: URL do webhook
+            secret_key: Chave secreta da Kiwify
+            event_type: Tipo do evento enviado
+            timeout: Timeout de cada requisição em segundos
+            max_concurrency: Maior rajada simultânea que será enviada
+            seed: Semente dos ids gerados
+            sleep: Função de espera dos períodos ociosos (substituível em simulações)
+        """
+        self.url = url
+        self.secret_key = secret_key
+        self.event_type = event_type
+        self.sender = WebhookSender(pool_size=max_concurrency, keep_alive=False, timeout=timeout)
+        self.factory = PayloadFactory(seed=seed)
+        self.sleep = sleep
+        self.run_id = uuid.uuid4().hex[:8]
+        self._ids = itertools.count(1)  # next() é atômico: as rajadas geram emails em várias threads
+        self.customer: Optional[Tuple[str, str]] = None  # (email, subscription_id) do cliente da sonda
+        self.probes: List[ColdStartProbe] = []
+        self.threshold_ms: Optional[float] = None
+        self.warm_ms: Optional[float] = None
+    
+    def _payload(self) -> Dict[str, Any]:
+        if self.event_type != EventType.ORDER_APPROVED and self.customer is not None:
+            email, subscription_id = self.customer
+            return self.factory.build(self.event_type, email, subscription_id=subscription_id)
+        email = f"loadtest+coldstart-{self.run_id}-{next(self._ids)}@example.com"
+        payload = self.factory.build(EventType.ORDER_APPROVED, email)
+        if self.event_type != EventType.ORDER_APPROVED:
+            self.customer = (email, payload["subscription_id"])
+        return payload
+    
+    def _send(self, phase: str, idle: float, concurrency: int) -> ColdStartProbe:
+        payload = self._payload()
+        signed_url, body, _ = signed_request(self.url, payload, self.secret_key)
+        try:
+            response, timing = self.sender.post(signed_url, data=body)
+        except requests.exceptions.RequestException as e:
+            return ColdStartProbe(phase, idle, concurrency, None, 0.0, 0.0, error=type(e).__name__)
+        return ColdStartProbe(phase, idle, concurrency, response.status_code,
+                              max(0.0, timing.ttfb - timing.connect) * 1000, timing.total * 1000)
+    
+    def _record(self, probe: ColdStartProbe, on_probe=None) -> ColdStartProbe:
+        if self.threshold_ms is not None and probe.error is None:
+            probe.cold = probe.server_ms > self.threshold_ms
+        self.probes.append(probe)
+        if on_probe is not None:
+            on_probe(probe)
+        return probe
+    
+    def warm_up(
+        self,
+        count: int,
+        threshold_ms: Optional[float] = None,
+        factor: float = 3.0,
+        margin_ms: float = 250.0,
+        on_probe=None,
+    ) -> float:
+        """
+        Mede a latência quente e define o limiar de cold start
+        
+        A primeira requisição é descartada (ela mesma pode ter subido a instância);
+        com eventos que não são compras, é ela que aprova o cliente da sonda.
+        Sem `threshold_ms`, o limiar é o maior entre `factor` vezes a mediana quente
+        e a mediana mais `margin_ms`.
+        
+        Returns:
+            Mediana do tempo de servidor quente em ms
+        """
+        probes = [self._record(self._send("warmup", 0.0, 1), on_probe) for _ in range(count + 1)]
+        if self.customer is not None and not probes[0].ok:
+            raise RuntimeError(f"A compra do cliente da sonda falhou ({probes[0].error or f'HTTP {probes[0].status}'}); "
+                               f"confira a URL e a chave secreta")
+        warm = [probe.server_ms for probe in probes[1:] if probe.error is None]
+        if not warm:
+            raise RuntimeError("Nenhuma resposta no aquecimento; confira a URL e o timeout")
+        self.warm_ms = statistics.median(warm)
+        self.threshold_ms = (threshold_ms if threshold_ms is not None
+                             else max(self.warm_ms * factor, self.warm_ms + margin_ms))
+        for probe in probes:
+            probe.cold = probe.error is None and probe.server_ms > self.threshold_ms
+        return self.warm_ms
+    
+    def probe_gap(self, idle: float, on_probe=None) -> ColdStartProbe:
+        """Aguarda `idle` segundos sem tráfego e envia uma requisição"""
+        self.sleep(idle)
+        return self._record(self._send("gap", idle, 1), on_probe)
+    
+    def probe_burst(self, concurrency: int, idle: float, on_probe=None) -> List[ColdStartProbe]:
+        """Aguarda `idle` segundos e dispara `concurrency` requisições ao mesmo tempo"""
+        self.sleep(idle)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            probes = list(executor.map(lambda _: self._send("burst", idle, concurrency), range(concurrency)))
+        return [self._record(probe, on_probe) for probe in probes]
+    
+    def close(self) -> None:
+        self.sender.close()
+
+
+def summarize_cold_starts(probes: List[ColdStartProbe], warm_ms: float, threshold_ms: float) -> Dict[str, Any]:
+    """
+    Resume a sonda: distribuição dos cold starts, ociosidade de recolhimento e rajadas
+    
+    A ociosidade de recolhimento fica entre o maior período ocioso ainda quente e o
+    primeiro em que a maioria das requisições foi fria. Respostas sem 2xx contam
+    como erro, mas o seu tempo de servidor ainda entra na detecção de cold starts.
+    """
+    answered = [probe for probe in probes if probe.error is None]
+    cold = sorted(probe.server_ms for probe in answered if probe.cold)
+    
+    gaps: Dict[float, List[ColdStartProbe]] = {}
+    for probe in answered:
+        if probe.phase == "gap":
+            gaps.setdefault(probe.idle, []).append(probe)
+    by_gap = [
+        {
+            "idle_s": idle,
+            "requests": len(group),
+            "cold": sum(probe.cold for probe in group),
+            "p50_server_ms": round(statistics.median(probe.server_ms for probe in group), 3),
+        }
+        for idle, group in sorted(gaps.items())
+    ]
+    reclaim = None
+    last_warm = 0.0
+    for row in by_gap:
+        if row["cold"] * 2 > row["requests"]:
+            reclaim = {"after_s": last_warm, "by_s": row["idle_s"]}
+            break
+        last_warm = row["idle_s"]
+    
+    bursts: Dict[int, List[ColdStartProbe]] = {}
+    for probe in probes:
+        if probe.phase == "burst":
+            bursts.setdefault(probe.concurrency, []).append(probe)
+    by_burst = [
+        {
+            "concurrency": concurrency,
+            "cold": sum(probe.cold for probe in group),
+            "errors": sum(not probe.ok for probe in group),
+            "max_server_ms": round(max((probe.server_ms for probe in group), default=0.0), 3),
+        }
+        for concurrency, group in sorted(bursts.items())
+    ]
+    
+    def cold_percentile(fraction: float) -> float:
+        return round(cold[min(len(cold) - 1, int(fraction * len(cold)))], 3)
+    
+    return {
+        "warm_p50_ms": round(warm_ms, 3),
+        "cold_threshold_ms": round(threshold_ms, 3),
+        "requests": len(probes),
+        "errors": sum(not probe.ok for probe in probes),
+        "cold_starts": len(cold),
+        "cold_ms": {
+            "p50": cold_percentile(0.5), "p90": cold_percentile(0.9), "max": round(cold[-1], 3),
+            "penalty_p50": round(cold_percentile(0.5) - warm_ms, 3),
+        } if cold else None,
+        "gaps": by_gap,
+        "reclaim_idle_s": reclaim,
+        "bursts": by_burst,
+    }
@@ -0,0 +1,147 @@
+"""
+Daemon que mantém o simulador aquecido para eventos avulsos (simulate_client.py)
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import os
+import io
+import socket
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple, Callable
+
+from .payloads import DEFAULT_WEBHOOK_URL, EVENT_COMMANDS
+from .senders import WebhookSender
+from .distributed import CONTROL_MESSAGE_LIMIT, send_message, read_message
+
+
+# Socket padrão do daemon (KIWIFY_SIMULATE_SOCKET sobrescreve); o mesmo de simulate_client.py
+DEFAULT_DAEMON_SOCKET = os.path.join(tempfile.gettempdir(), "kiwify-simulate.sock")
+
+
+class SimulatorDaemon:
+    """
+    Processo persistente que envia eventos avulsos recebidos por um socket Unix
+    
+    Cada conexão traz uma linha JSON {"argv": [...]} com os mesmos argumentos dos
+    subcomandos approved/renewed/canceled/chargeback e recebe {"exit_code": n,
+    "output": "..."} com o que o comando teria impresso. O interpretador, o
+    parser e o pool de conexões do WebhookSender ficam aquecidos entre os
+    eventos. Os comandos rodam um por vez, em uma thread, porque a saída é
+    capturada redirecionando stdout/stderr.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        parser: argparse.ArgumentParser,
+        run_command: Callable[..., int],
+        pool_size: int = 4,
+        timeout: float = 30.0,
+        idle_exit: Optional[float] = None,
+    ):
+        """
+        Args:
+            path: Caminho do socket Unix
+            parser: Parser da CLI usado para interpretar os argumentos recebidos
+            run_command: Executa um subcomando de evento com (args, url, sender=...) e
+                retorna o código de saída
+            pool_size: Conexões mantidas no pool por host
+            timeout: Timeout de cada requisição em segundos
+            idle_exit: Encerra após N segundos sem comandos (opcional)
+        """
+        self.path = path
+        self.idle_exit = idle_exit
+        self.parser = parser
+        self.run_command = run_command
+        self.sender = WebhookSender(pool_size=pool_size, timeout=timeout)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.handled = 0
+        self.last_command = time.monotonic()
+        self.stopping: Optional[asyncio.Event] = None
+    
+    def execute(self, argv: List[str]) -> Tuple[int, str]:
+        """Executa um comando de evento capturando a saída; retorna (código de saída, saída)"""
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+            if not argv or argv[0] not in EVENT_COMMANDS:
+                print(f"❌ O daemon aceita apenas {', '.join(EVENT_COMMANDS)}; "
+                      f"use python simulate_webhook.py para os demais subcomandos")
+                return 2, buffer.getvalue()
+            try:
+                args = self.parser.parse_args(argv)
+                code = self.run_command(args, args.url or DEFAULT_WEBHOOK_URL, sender=self.sender)
+            except SystemExit as e:
+                # Erros e --help do argparse
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        return code, buffer.getvalue()
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await read_message(reader)
+            if request is None:
+                return
+            if request.get("command") == "stop":
+                await send_message(writer, {"exit_code": 0, "output": "🛑 Daemon encerrado\n"})
+                self.stopping.set()
+                return
+            argv = request.get("argv")
+            if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+                await send_message(writer, {"exit_code": 2, "output": "❌ Requisição inválida: argv ausente\n"})
+                return
+            started = time.perf_counter()
+            code, output = await asyncio.get_running_loop().run_in_executor(self.executor, self.execute, argv)
+            self.handled += 1
+            self.last_command = time.monotonic()
+            await send_message(writer, {"exit_code": code, "output": output})
+            self._log(f"   {'✅' if code == 0 else '⚠️ '} {argv[0]} → {code} "
+                      f"em {(time.perf_counter() - started) * 1000:.1f}ms")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    @staticmethod
+    def _log(message: str) -> None:
+        # sys.stdout pode estar redirecionado para a saída de um comando em execução
+        print(message, file=sys.__stdout__, flush=True)
+    
+    def _in_use(self) -> bool:
+        """True se outro daemon já responde no socket (um arquivo órfão é removido)"""
+        if not os.path.exists(self.path):
+            return False
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.path)
+                return True
+            except OSError:
+                os.unlink(self.path)
+                return False
+    
+    async def serve(self) -> None:
+        """Escuta no socket até receber "stop", Ctrl+C ou ficar ocioso por idle_exit segundos"""
+        if self._in_use():
+            raise OSError(f"já existe um daemon escutando em {self.path}")
+        self.stopping = asyncio.Event()
+        server = await asyncio.start_unix_server(self._handle, self.path, limit=CONTROL_MESSAGE_LIMIT)
+        # Os comandos trazem a chave secreta: só o dono do processo pode conectar
+        os.chmod(self.path, 0o600)
+        try:
+            while not self.stopping.is_set():
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    if self.idle_exit and time.monotonic() - self.last_command >= self.idle_exit:
+                        self._log(f"💤 Sem comandos há {self.idle_exit:g}s; encerrando")
+                        break
+        finally:
+            server.close()
+            await server.wait_closed()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.executor.shutdown(wait=True)
+            self.sender.close()
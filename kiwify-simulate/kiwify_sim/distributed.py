@@ -0,0 +1,363 @@
+"""
+Carga distribuída: coordenador e agentes ligados por um protocolo de linhas JSON
+"""
+
+import json
+import asyncio
+import argparse
+import hmac
+import ipaddress
+from typing import Dict, Any, Optional, List, Tuple
+
+from .scenarios import load_email
+from .senders import AsyncWebhookSender, create_sender
+from .stats import LoadStats
+from .loadgen import Pacing, run_load
+from .runner import (
+    build_scenario_events, run_with_sender, sender_options, pacing_from_args, model_options, faults_from_args,
+    describe_pacing,
+)
+
+
+# Faixa de índices de clientes/emails reservada a cada agente da carga distribuída
+AGENT_ID_STRIDE = 10_000_000
+
+# Tamanho máximo de uma mensagem do protocolo coordenador/agente (estatísticas com histogramas)
+CONTROL_MESSAGE_LIMIT = 64 * 1024 * 1024
+
+# Opções do coordenador que não são repassadas aos agentes
+COORDINATOR_ONLY_OPTIONS = (
+    "event", "listen", "agents", "token", "start_delay", "agent_timeout", "progress_interval",
+    "secret_key", "tiktok_secret",
+    "report_json", "output", "events_log", "metrics_port", "metrics_host", "metrics_linger",
+    "stage_timings", "cpu_profile", "cpu_profiler", "cpu_profile_interval",
+)
+
+
+def is_loopback_address(host: str) -> bool:
+    """Se o endereço de escuta só aceita conexões da própria máquina"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_address(spec: str, default_port: int) -> Tuple[str, int]:
+    """Interpreta "host:porta", "host" ou ":porta" """
+    host, _, port = spec.rpartition(":") if ":" in spec else (spec, "", "")
+    return host or "127.0.0.1", int(port) if port else default_port
+
+
+def shard_agent_options(args: argparse.Namespace, index: int, agents: int) -> Dict[str, Any]:
+    """
+    Opções da carga enviadas ao agente `index` de `agents`
+    
+    As requisições (ou os clientes do cenário lifecycle) são divididas entre os
+    agentes; cada um recebe uma faixa própria de índices de email e uma semente
+    derivada, para que emails e ids nunca colidam. A taxa do perfil é dividida
+    pelo próprio agente ao montar o ritmo.
+    """
+    options = {key: value for key, value in vars(args).items() if key not in COORDINATOR_ONLY_OPTIONS}
+    total = args.requests
+    if total is None and not args.duration and args.scenario == "random":
+        total = 100
+    if total is not None:
+        options["requests"] = total // agents + (1 if index < total % agents else 0)
+    if args.scenario == "lifecycle":
+        options["customers"] = args.customers // agents + (1 if index < args.customers % agents else 0)
+    if args.seed is not None:
+        options["seed"] = args.seed + index
+    options["start_index"] = index * AGENT_ID_STRIDE
+    return options
+
+
+async def send_message(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    writer.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Próxima mensagem JSON da conexão, ou None se ela foi fechada"""
+    try:
+        line = await reader.readline()
+    except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+        return None
+    if not line:
+        return None
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) else None
+
+
+class LoadCoordinator:
+    """
+    Coordenador da carga distribuída entre agentes conectados por TCP
+    
+    Protocolo (uma mensagem JSON por linha): o agente envia "hello" (com o token,
+    se exigido) e recebe "assign" com o seu shard; responde "ready" depois de
+    preparar eventos e conexões. Quando todos estão prontos o coordenador envia
+    "start" com o atraso até o início, igual para todos, e os agentes passam a
+    enviar "stats" periódicos e um "done" final com as estatísticas completas.
+    """
+    
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        url: str,
+        agents: int,
+        token: Optional[str] = None,
+        start_delay: float = 2.0,
+    ):
+        """
+        Args:
+            args: Opções da carga (cenário, ritmo, envio) repartidas entre os agentes
+            url: URL do webhook
+            agents: Número de agentes aguardados
+            token: Token exigido no "hello" dos agentes (opcional)
+            start_delay: Segundos entre o "start" e o início dos envios
+        """
+        self.args = args
+        self.url = url
+        self.expected = agents
+        self.token = token
+        self.start_delay = start_delay
+        self.names: List[str] = []
+        self.snapshots: Dict[int, Dict[str, Any]] = {}
+        self.finals: Dict[int, Dict[str, Any]] = {}
+        self.lost: List[int] = []
+        self.failure: Optional[str] = None
+        self.ready = 0
+        self.finished = 0
+        self.all_ready: Optional[asyncio.Event] = None
+        self.started: Optional[asyncio.Event] = None
+        self.all_done: Optional[asyncio.Event] = None
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            hello = await read_message(reader)
+            if hello is None or hello.get("type") != "hello":
+                return
+            if self.token and not hmac.compare_digest(str(hello.get("token") or ""), self.token):
+                await send_message(writer, {"type": "error", "message": "Token inválido"})
+                return
+            if len(self.names) >= self.expected or self.started.is_set():
+                await send_message(writer, {"type": "error", "message": "Todos os agentes já foram conectados"})
+                return
+            
+            index = len(self.names)
+            peer = writer.get_extra_info("peername")
+            self.names.append(hello.get("name") or (f"{peer[0]}:{peer[1]}" if peer else f"agente {index}"))
+            await send_message(writer, {
+                "type": "assign",
+                "index": index,
+                "agents": self.expected,
+                "url": self.url,
+                "options": shard_agent_options(self.args, index, self.expected),
+            })
+            message = await read_message(reader)
+            if message is None or message.get("type") != "ready":
+                self.failure = f"{self.names[index]}: " + (
+                    message.get("message", "resposta inesperada") if message else "desconectou antes de começar"
+                )
+                self.all_ready.set()
+                return
+            print(f"   🤝 Agente {index} pronto: {self.names[index]}")
+            self.ready += 1
+            if self.ready == self.expected:
+                self.all_ready.set()
+            
+            await self.started.wait()
+            if self.failure:
+                await send_message(writer, {"type": "stop"})
+                return
+            await send_message(writer, {"type": "start", "delay": self.start_delay})
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    self.lost.append(index)
+                    break
+                if message.get("type") == "stats":
+                    self.snapshots[index] = message["stats"]
+                elif message.get("type") == "done":
+                    self.finals[index] = message["stats"]
+                    break
+            self.finished += 1
+            if self.finished == self.expected:
+                self.all_done.set()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    def merged(self) -> LoadStats:
+        """Estatísticas combinadas: finais de quem terminou, último parcial de quem caiu"""
+        stats = LoadStats()
+        for index in range(len(self.names)):
+            data = self.finals.get(index) or self.snapshots.get(index)
+            if data is not None:
+                stats.merge(LoadStats.from_dict(data))
+        return stats
+    
+    async def run(self, host: str, port: int, agent_timeout: float = 60.0,
+                  progress_interval: float = 5.0, on_progress=None) -> Optional[LoadStats]:
+        """
+        Aguarda os agentes, dispara o início sincronizado e combina as estatísticas
+        
+        Args:
+            host: Endereço de escuta
+            port: Porta de escuta
+            agent_timeout: Segundos aguardando todos os agentes ficarem prontos
+            progress_interval: Segundos entre as chamadas de on_progress
+            on_progress: Função chamada com as estatísticas parciais combinadas (opcional)
+        
+        Returns:
+            Estatísticas combinadas, ou None se os agentes não ficaram prontos
+        """
+        self.all_ready = asyncio.Event()
+        self.started = asyncio.Event()
+        self.all_done = asyncio.Event()
+        server = await asyncio.start_server(self._handle, host, port, limit=CONTROL_MESSAGE_LIMIT)
+        try:
+            try:
+                await asyncio.wait_for(self.all_ready.wait(), agent_timeout)
+            except asyncio.TimeoutError:
+                self.failure = f"apenas {self.ready} de {self.expected} agentes prontos após {agent_timeout:g}s"
+            self.started.set()
+            if self.failure:
+                print(f"❌ Carga distribuída abortada: {self.failure}")
+                return None
+            
+            print(f"   🏁 Início sincronizado em {self.start_delay:g}s")
+            await asyncio.sleep(self.start_delay)
+            stats = LoadStats()
+            stats.start()
+            while not self.all_done.is_set():
+                try:
+                    await asyncio.wait_for(self.all_done.wait(), progress_interval)
+                except asyncio.TimeoutError:
+                    if on_progress is not None:
+                        on_progress(self.merged(), stats.elapsed)
+            stats.stop()
+            stats.merge(self.merged())
+            for index in self.lost:
+                print(f"⚠️  Agente {index} ({self.names[index]}) desconectou; usando suas últimas estatísticas parciais")
+            return stats
+        finally:
+            server.close()
+            await server.wait_closed()
+
+
+async def run_load_agent(
+    host: str,
+    port: int,
+    name: str = "",
+    token: Optional[str] = None,
+    stats_interval: float = 2.0,
+    secret_key: str = "",
+    tiktok_secret: Optional[str] = None,
+) -> int:
+    """
+    Conecta ao coordenador, executa o shard recebido e transmite as estatísticas
+    
+    As chaves de assinatura não trafegam na conexão: cada agente usa as suas.
+    
+    Args:
+        host: Endereço do coordenador
+        port: Porta do coordenador
+        name: Nome do agente nos relatórios (default: endereço da conexão)
+        token: Token exigido pelo coordenador (opcional)
+        stats_interval: Segundos entre os envios de estatísticas parciais
+        secret_key: Chave secreta da Kiwify para assinar os eventos
+        tiktok_secret: TIKTOK_WEBHOOK_SECRET para assinar os eventos do TikTok (opcional)
+    
+    Returns:
+        Código de saída (0 se o shard foi executado até o fim)
+    """
+    try:
+        reader, writer = await asyncio.open_connection(host, port, limit=CONTROL_MESSAGE_LIMIT)
+    except OSError as e:
+        print(f"❌ Não foi possível conectar ao coordenador {host}:{port}: {e}")
+        return 1
+    try:
+        await send_message(writer, {"type": "hello", "name": name, "token": token})
+        assign = await read_message(reader)
+        if assign is None or assign.get("type") != "assign":
+            print(f"❌ Recusado pelo coordenador: {(assign or {}).get('message', 'conexão encerrada')}")
+            return 1
+        
+        index, agents, url = assign["index"], assign["agents"], assign["url"]
+        args = argparse.Namespace(**assign["options"], secret_key=secret_key, tiktok_secret=tiktok_secret)
+        try:
+            events = build_scenario_events(args, total=args.requests, start_index=args.start_index)
+            pacing = pacing_from_args(args)
+            if pacing.profile is not None:
+                seed = pacing.profile.seed + index if pacing.profile.seed is not None else None
+                pacing = Pacing(profile=pacing.profile.scaled(1.0 / agents, seed=seed), compress=pacing.compress)
+            elif pacing.original:
+                # Todos os agentes medem o tempo a partir do início do cenário
+                pacing = Pacing(original=True, compress=pacing.compress, origin=0.0)
+            options = model_options(args, pacing)
+            sender = create_sender(**sender_options(args, options["open_model"]))
+        except (RuntimeError, ValueError) as e:
+            await send_message(writer, {"type": "error", "message": str(e)})
+            print(f"❌ {e}")
+            return 1
+        
+        print(f"🤝 Agente {index + 1}/{agents} conectado a {host}:{port} | emails a partir de "
+              f"{load_email('loadtest', args.start_index, args.email_domain, args.run_id)} | ritmo: 1/{agents} de {describe_pacing(pacing)}")
+        await send_message(writer, {"type": "ready"})
+        start = await read_message(reader)
+        if start is None or start.get("type") != "start":
+            if isinstance(sender, AsyncWebhookSender):
+                await sender.aclose()
+            else:
+                sender.close()
+            print("⏹️  O coordenador encerrou antes do início")
+            return 1
+        await asyncio.sleep(start.get("delay", 0.0))
+        
+        stats = LoadStats()
+        run = asyncio.ensure_future(run_with_sender(sender, run_load(
+            url,
+            events,
+            sender,
+            concurrency=args.concurrency,
+            pacing=pacing,
+            duration=args.duration,
+            faults=faults_from_args(args),
+            stats=stats,
+            **options,
+        )))
+        
+        async def listen() -> None:
+            # Um "stop" ou a queda do coordenador interrompem o shard
+            while True:
+                message = await read_message(reader)
+                if message is None or message.get("type") == "stop":
+                    run.cancel()
+                    return
+        
+        listener = asyncio.ensure_future(listen())
+        while not run.done():
+            await asyncio.wait({run}, timeout=stats_interval)
+            if not run.done():
+                await send_message(writer, {"type": "stats", "stats": stats.to_dict()})
+        listener.cancel()
+        if run.cancelled():
+            stats.stop()
+            print(f"⏹️  Interrompido pelo coordenador após {stats.sent} requisições")
+            return 1
+        run.result()
+        await send_message(writer, {"type": "done", "stats": stats.to_dict()})
+        print(f"✅ Shard concluído: {stats.sent} requisições em {stats.elapsed:.1f}s "
+              f"({stats.achieved_rps:.1f} req/s, erros {stats.error_rate:.2%})")
+        return 0
+    except ConnectionError as e:
+        print(f"❌ Conexão com o coordenador perdida: {e}")
+        return 1
+    finally:
+        writer.close()
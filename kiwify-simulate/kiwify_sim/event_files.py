@@ -0,0 +1,314 @@
+"""
+Arquivos NDJSON de eventos assinados: gravação, leitura em shards e verificação
+"""
+
+import json
+import math
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Iterator, Iterable
+
+from .payloads import encode_payload, SignatureVerifier, PreparedEvent
+
+
+# Separador entre o cabeçalho e o corpo em cada linha do arquivo de eventos
+_BODY_MARKER = b',"body":'
+
+
+def format_event_line(event: PreparedEvent) -> bytes:
+    """
+    Formata o evento como uma linha NDJSON
+    
+    O corpo é gravado por último e byte a byte como foi assinado, de modo que
+    parse_event_line o recupera sem desserializar e reserializar o JSON:
+    {"event":"...","signature":"...","subscription_id":"...","at":123.4,"body":{...}}
+    
+    Eventos de outros provedores levam também "provider" no cabeçalho.
+    """
+    header_fields: Dict[str, Any] = {
+        "event": event.event_type,
+        "signature": event.signature,
+        "subscription_id": event.subscription_id,
+    }
+    if event.at is not None:
+        header_fields["at"] = round(event.at, 3)
+    if event.provider != "kiwify":
+        header_fields["provider"] = event.provider
+    header = json.dumps(header_fields, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
+    return header[:-1] + _BODY_MARKER + event.body + b"}\n"
+
+
+def parse_event_line(line: bytes) -> PreparedEvent:
+    """
+    Lê uma linha gerada por format_event_line
+    
+    Linhas em que "body" não é o último campo são aceitas, mas o corpo precisa
+    ser reserializado por encode_payload.
+    """
+    line = line.rstrip(b"\r\n")
+    marker = line.find(_BODY_MARKER)
+    if marker != -1 and line.endswith(b"}"):
+        header = json.loads(line[:marker] + b"}")
+        body = line[marker + len(_BODY_MARKER):-1]
+    else:
+        record = json.loads(line)
+        header = record
+        body = encode_payload(record["body"])
+    return PreparedEvent(
+        event_type=header.get("event", ""),
+        body=body,
+        signature=header["signature"],
+        subscription_id=header.get("subscription_id") or "",
+        at=header.get("at"),
+        provider=header.get("provider") or "kiwify",
+    )
+
+
+def write_event_file(path: str, events: Iterable[PreparedEvent]) -> int:
+    """Grava os eventos em NDJSON, um por linha, retornando a quantidade gravada"""
+    count = 0
+    with open(path, "wb") as f:
+        for event in events:
+            f.write(format_event_line(event))
+            count += 1
+    return count
+
+
+def iter_event_file(path: str) -> Iterator[PreparedEvent]:
+    """Lê os eventos de um arquivo NDJSON linha a linha, sem carregá-lo na memória"""
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield parse_event_line(line)
+
+
+def iter_event_file_range(path: str, start: int, end: int) -> Iterator[PreparedEvent]:
+    """
+    Lê os eventos cujas linhas começam no intervalo de bytes [start, end)
+    
+    Intervalos contíguos cobrem o arquivo inteiro sem repetir nem perder linhas,
+    mesmo que os limites caiam no meio de uma linha.
+    """
+    for _, line in iter_file_lines_range(path, start, end):
+        yield parse_event_line(line)
+
+
+def iter_file_lines_range(path: str, start: int, end: int) -> Iterator[Tuple[int, bytes]]:
+    """Lê as linhas não vazias que começam no intervalo de bytes [start, end), com o offset de cada uma"""
+    with open(path, "rb") as f:
+        if start > 0:
+            # Descarta o restante da linha que começou antes do intervalo
+            f.seek(start - 1)
+            f.readline()
+        offset = f.tell()
+        while offset < end:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                yield offset, line
+            offset += len(line)
+
+
+def iter_event_file_shard(path: str, index: int, count: int) -> Iterator[PreparedEvent]:
+    """
+    Lê apenas os eventos cujo subscription_id pertence ao shard `index` de `count`
+    
+    Todos os eventos de uma mesma assinatura caem no mesmo shard e mantêm a
+    ordem do arquivo. Eventos sem subscription_id são distribuídos pela linha.
+    Só as linhas do shard são desserializadas: a chave sai do cabeçalho bruto.
+    """
+    with open(path, "rb") as f:
+        line_number = 0
+        for line in f:
+            if not line.strip():
+                continue
+            key = event_line_subscription_id(line) or str(line_number).encode("ascii")
+            line_number += 1
+            if zlib.crc32(key) % count == index:
+                yield parse_event_line(line)
+
+
+# Campo do cabeçalho lido por event_line_subscription_id
+_SUBSCRIPTION_ID_FIELD = b'"subscription_id":"'
+
+
+def event_line_subscription_id(line: bytes) -> bytes:
+    """
+    subscription_id (em UTF-8) de uma linha do arquivo de eventos, sem desserializar o corpo
+    
+    Procura o campo apenas no cabeçalho gravado por format_event_line, antes de
+    "body"; linhas em outro formato ou com escapes no valor são desserializadas.
+    """
+    marker = line.find(_BODY_MARKER)
+    if marker != -1:
+        start = line.find(_SUBSCRIPTION_ID_FIELD, 0, marker)
+        if start != -1:
+            start += len(_SUBSCRIPTION_ID_FIELD)
+            end = line.find(b'"', start, marker)
+            if end != -1 and b"\\" not in line[start:end]:
+                return line[start:end]
+    return parse_event_line(line).subscription_id.encode("utf-8")
+
+
+def split_file_ranges(path: str, count: int) -> List[Tuple[int, int]]:
+    """Divide o arquivo em `count` intervalos de bytes de tamanho aproximado"""
+    size = Path(path).stat().st_size
+    step = math.ceil(size / count) if size else 0
+    return [(min(i * step, size), min((i + 1) * step, size)) for i in range(count)]
+
+
+class VerificationReport:
+    """Resultado da verificação em lote das assinaturas de um arquivo de eventos"""
+    
+    def __init__(self, max_samples: int = 20):
+        self.valid = 0
+        self.invalid = 0
+        self.malformed = 0
+        self.skipped = 0  # Eventos de outros provedores (sem assinatura Kiwify)
+        self.by_event: Dict[str, List[int]] = {}  # Tipo de evento -> [válidas, inválidas]
+        self.samples: List[Dict[str, Any]] = []  # Primeiras linhas com problema
+        self.max_samples = max_samples
+        self.bytes_verified = 0
+        self.elapsed = 0.0
+    
+    @property
+    def total(self) -> int:
+        return self.valid + self.invalid + self.malformed
+    
+    def record(self, event_type: str, valid: bool, size: int) -> None:
+        counts = self.by_event.setdefault(event_type, [0, 0])
+        if valid:
+            self.valid += 1
+            counts[0] += 1
+        else:
+            self.invalid += 1
+            counts[1] += 1
+        self.bytes_verified += size
+    
+    def add_sample(self, offset: int, reason: str, event_type: str = "") -> None:
+        if len(self.samples) < self.max_samples:
+            self.samples.append({"offset": offset, "event": event_type, "reason": reason})
+    
+    def merge(self, other: "VerificationReport") -> None:
+        self.valid += other.valid
+        self.invalid += other.invalid
+        self.malformed += other.malformed
+        self.skipped += other.skipped
+        self.bytes_verified += other.bytes_verified
+        for event_type, (valid, invalid) in other.by_event.items():
+            counts = self.by_event.setdefault(event_type, [0, 0])
+            counts[0] += valid
+            counts[1] += invalid
+        room = max(0, self.max_samples - len(self.samples))
+        self.samples.extend(other.samples[:room])
+        self.samples.sort(key=lambda sample: sample["offset"])
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "valid": self.valid,
+            "invalid": self.invalid,
+            "malformed": self.malformed,
+            "skipped": self.skipped,
+            "bytes_verified": self.bytes_verified,
+            "elapsed_s": round(self.elapsed, 3),
+            "events_per_s": round(self.total / self.elapsed, 1) if self.elapsed > 0 else 0.0,
+            "by_event": {
+                event_type: {"valid": valid, "invalid": invalid}
+                for event_type, (valid, invalid) in sorted(self.by_event.items())
+            },
+            "samples": self.samples,
+        }
+    
+    def print_summary(self) -> None:
+        rate = self.total / self.elapsed if self.elapsed > 0 else 0.0
+        print("\n🔏 Verificação de assinaturas")
+        print(f"   Eventos: {self.total} em {self.elapsed:.2f}s ({rate:.0f} eventos/s, "
+              f"{self.bytes_verified / max(self.elapsed, 1e-9) / 1e6:.1f} MB/s)")
+        print(f"   ✅ Válidas: {self.valid} | ❌ Inválidas: {self.invalid} | ⚠️  Linhas malformadas: {self.malformed}")
+        if self.skipped:
+            print(f"   ⏭️  Ignorados (outros provedores): {self.skipped}")
+        for event_type, (valid, invalid) in sorted(self.by_event.items()):
+            print(f"   📋 {event_type or '(sem tipo)'}: {valid} válidas, {invalid} inválidas")
+        for sample in self.samples:
+            print(f"   🔎 byte {sample['offset']}: {sample['reason']} {sample['event']}".rstrip())
+
+
+def verify_event_range(
+    path: str,
+    secret_key: str,
+    start: int,
+    end: int,
+    reserialize: bool = False,
+    max_samples: int = 20,
+) -> VerificationReport:
+    """
+    Verifica as assinaturas das linhas que começam no intervalo de bytes [start, end)
+    
+    Args:
+        path: Arquivo NDJSON de eventos (formato de format_event_line)
+        secret_key: Chave secreta da Kiwify
+        start: Byte inicial do intervalo
+        end: Byte final do intervalo (exclusivo)
+        reserialize: Verifica o JSON reserializado, como o backend
+        max_samples: Quantidade máxima de linhas com problema guardadas no relatório
+    """
+    verifier = SignatureVerifier(secret_key)
+    report = VerificationReport(max_samples=max_samples)
+    started = time.perf_counter()
+    for offset, line in iter_file_lines_range(path, start, end):
+        try:
+            event = parse_event_line(line)
+            if event.provider != "kiwify":
+                report.skipped += 1
+                continue
+            valid = verifier.verify_event(event, reserialize=reserialize)
+        except (ValueError, KeyError, TypeError) as e:
+            report.malformed += 1
+            report.add_sample(offset, f"linha malformada ({type(e).__name__})")
+            continue
+        report.record(event.event_type, valid, len(event.body))
+        if not valid:
+            report.add_sample(offset, "assinatura inválida", event.event_type)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def verify_event_file(
+    path: str,
+    secret_key: str,
+    processes: int = 1,
+    reserialize: bool = False,
+    max_samples: int = 20,
+) -> VerificationReport:
+    """
+    Verifica as assinaturas de todos os eventos de um arquivo NDJSON
+    
+    Com `processes` > 1 o arquivo é dividido em intervalos de bytes verificados
+    em paralelo, e os relatórios são combinados.
+    
+    Args:
+        path: Arquivo NDJSON de eventos
+        secret_key: Chave secreta da Kiwify
+        processes: Número de processos
+        reserialize: Verifica o JSON reserializado, como o backend
+        max_samples: Quantidade máxima de linhas com problema guardadas no relatório
+    """
+    started = time.perf_counter()
+    ranges = split_file_ranges(path, max(1, processes))
+    if processes <= 1:
+        report = verify_event_range(path, secret_key, *ranges[0], reserialize=reserialize, max_samples=max_samples)
+    else:
+        report = VerificationReport(max_samples=max_samples)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(verify_event_range, path, secret_key, start, end, reserialize, max_samples)
+                for start, end in ranges
+            ]
+            for future in futures:
+                report.merge(future.result())
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -0,0 +1,439 @@
+"""
+Laço de carga: ritmo de chegada, modelo aberto ou fechado e injeção de falhas de entrega
+"""
+
+import json
+import math
+import random
+import asyncio
+import itertools
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, List, Tuple, Iterator, Iterable
+
+from .payloads import EventType, PayloadFactory, PreparedEvent, prepare_event
+from .senders import AsyncWebhookSender
+from .stats import EventLog, result_record, LoadStats
+from .metrics import LiveMetrics
+
+
+@dataclass
+class FaultInjection:
+    """
+    Injeção de entregas duplicadas e fora de ordem, como nas retentativas da Kiwify
+    
+    Cada evento sorteia no máximo uma falha: duplicata posterior (mesmo corpo e
+    mesma assinatura), cópias simultâneas ou reordenação com o próximo evento da
+    mesma assinatura. Sem evento seguinte da assinatura (ex: cenário random), uma
+    compra adiada é precedida por um cancelamento sintetizado quando há chave
+    secreta para assiná-lo.
+    """
+    duplicate: float = 0.0  # Probabilidade de reenviar o evento mais tarde
+    concurrent: float = 0.0  # Probabilidade de disparar cópias simultâneas
+    reorder: float = 0.0  # Probabilidade de entregar o evento depois do seguinte da assinatura
+    copies: int = 2  # Total de entregas de cada evento duplicado
+    gap: int = 10  # Eventos entre as entregas de uma duplicata
+    window: int = 1000  # Eventos aguardados pelo próximo evento da assinatura
+    secret_key: Optional[str] = None  # Assina os cancelamentos sintetizados
+    seed: Optional[int] = None
+    
+    @property
+    def enabled(self) -> bool:
+        return self.duplicate > 0 or self.concurrent > 0 or self.reorder > 0
+    
+    def _synthesize_cancel(self, factory: PayloadFactory, event: PreparedEvent) -> Optional[PreparedEvent]:
+        """Cria um cancelamento da mesma assinatura de uma compra aprovada"""
+        if not self.secret_key or event.event_type != EventType.ORDER_APPROVED.value:
+            return None
+        payload = json.loads(event.body)
+        email = (payload.get("Customer") or {}).get("email")
+        if not email:
+            return None
+        cancel = factory.build(
+            EventType.SUBSCRIPTION_CANCELED,
+            email,
+            subscription_id=event.subscription_id or None,
+        )
+        return prepare_event(cancel, self.secret_key, at=event.at)
+    
+    def apply(self, events: Iterable[PreparedEvent]) -> Iterator[PreparedEvent]:
+        """Gera o fluxo de eventos com as falhas injetadas"""
+        rng = random.Random(self.seed)
+        factory = PayloadFactory(seed=self.seed) if self.secret_key else None
+        groups = itertools.count()
+        sequence = itertools.count()
+        delayed: List[Tuple[int, int, PreparedEvent]] = []  # (posição de liberação, ordem, evento)
+        held: Dict[str, PreparedEvent] = {}  # subscription_id -> evento adiado
+        deadlines: List[Tuple[int, str]] = []  # (posição limite, subscription_id), em ordem crescente
+        
+        def release(event: PreparedEvent) -> Iterator[PreparedEvent]:
+            cancel = self._synthesize_cancel(factory, event) if factory else None
+            if cancel is None:
+                yield event
+                return
+            tag = f"reorder:{next(groups)}"
+            yield replace(cancel, tag=tag)
+            yield replace(event, tag=tag)
+        
+        position = 0
+        for event in events:
+            position += 1
+            partner = held.pop(event.subscription_id, None) if event.subscription_id else None
+            if partner is not None:
+                tag = f"reorder:{next(groups)}"
+                yield replace(event, tag=tag)
+                yield replace(partner, tag=tag)
+            else:
+                roll = rng.random()
+                if roll < self.reorder:
+                    if event.subscription_id:
+                        held[event.subscription_id] = event
+                        deadlines.append((position + self.window, event.subscription_id))
+                    else:
+                        yield from release(event)
+                elif roll < self.reorder + self.concurrent:
+                    yield replace(event, tag=f"concurrent:{next(groups)}", copies=self.copies)
+                elif roll < self.reorder + self.concurrent + self.duplicate:
+                    tagged = replace(event, tag=f"duplicate:{next(groups)}")
+                    yield tagged
+                    for copy in range(1, self.copies):
+                        heapq.heappush(delayed, (position + copy * self.gap, next(sequence), tagged))
+                else:
+                    yield event
+            
+            while delayed and delayed[0][0] <= position:
+                yield heapq.heappop(delayed)[2]
+            while deadlines and deadlines[0][0] <= position:
+                _, subscription_id = deadlines.pop(0)
+                expired = held.pop(subscription_id, None)
+                if expired is not None:
+                    yield from release(expired)
+        
+        for _, subscription_id in deadlines:
+            expired = held.pop(subscription_id, None)
+            if expired is not None:
+                yield from release(expired)
+        while delayed:
+            yield heapq.heappop(delayed)[2]
+
+
+class RateProfile:
+    """
+    Perfil de taxa de chegada formado por segmentos (duração, taxa)
+    
+    Durações e taxas são em tempo de cenário; ao gerar os instantes de envio
+    eles são divididos pelo fator de compressão, preservando o formato das
+    rajadas. O último segmento pode ter duração infinita.
+    """
+    
+    def __init__(
+        self,
+        segments: List[Tuple[float, float]],
+        poisson: bool = False,
+        seed: Optional[int] = None,
+        name: str = "",
+    ):
+        """
+        Args:
+            segments: Lista de (duração em segundos, requisições por segundo)
+            poisson: Sorteia intervalos exponenciais em vez de espaçamento uniforme
+            seed: Semente do gerador usado no modo Poisson
+            name: Descrição do perfil exibida nos relatórios
+        """
+        self.segments = segments
+        self.poisson = poisson
+        self.seed = seed
+        self.name = name
+    
+    def scaled(self, factor: float, seed: Optional[int] = None) -> "RateProfile":
+        """Cópia do perfil com as taxas multiplicadas por `factor` (ex: fração de um shard)"""
+        return RateProfile(
+            [(duration, rate * factor) for duration, rate in self.segments],
+            poisson=self.poisson,
+            seed=seed if seed is not None else self.seed,
+            name=self.name,
+        )
+    
+    def rate_at(self, at: float) -> float:
+        """Taxa do perfil no instante `at` (tempo de cenário)"""
+        elapsed = 0.0
+        for duration, rate in self.segments:
+            elapsed += duration
+            if at < elapsed:
+                return rate
+        return 0.0
+    
+    def arrivals(self, compress: float = 1.0) -> Iterator[float]:
+        """
+        Gera os instantes de envio em segundos de relógio desde o início
+        
+        O n-ésimo envio acontece quando a integral da taxa atinge n (ou, no modo
+        Poisson, a soma de n sorteios exponenciais de média 1).
+        """
+        rng = random.Random(self.seed)
+        
+        def increment() -> float:
+            return rng.expovariate(1.0) if self.poisson else 1.0
+        
+        at = 0.0
+        expected = 0.0
+        target = increment()
+        for duration, rate in self.segments:
+            segment_end = at + duration
+            while rate > 0 and at + (target - expected) / rate <= segment_end + 1e-9:
+                at += (target - expected) / rate
+                expected = target
+                yield at / compress
+                target = expected + increment()
+            if rate > 0:
+                expected += rate * (segment_end - at)
+            at = segment_end
+            if math.isinf(at):
+                return
+
+
+def parse_rate_profile(spec: str, seed: Optional[int] = None) -> RateProfile:
+    """
+    Interpreta um perfil de taxa
+    
+    Formatos aceitos:
+        constant:RATE                    taxa constante
+        poisson:RATE                     chegadas Poisson com taxa média RATE
+        step:RATE@SEG,RATE@SEG,...       degraus de RATE req/s por SEG segundos
+        spike:BASE,PEAK,INICIO,LARGURA   taxa BASE com pico PEAK entre INICIO e INICIO+LARGURA
+        curve:ARQUIVO                    curva gravada com uma contagem por minuto por linha
+                                         (CSV "minuto,contagem" também é aceito)
+    """
+    kind, _, value = spec.partition(":")
+    kind = kind.strip().lower()
+    try:
+        if kind in ("constant", "poisson"):
+            rate = float(value)
+            return RateProfile([(math.inf, rate)], poisson=kind == "poisson", seed=seed, name=spec)
+        if kind == "step":
+            segments = []
+            for item in value.split(","):
+                rate, _, seconds = item.partition("@")
+                segments.append((float(seconds), float(rate)))
+            return RateProfile(segments, seed=seed, name=spec)
+        if kind == "spike":
+            base, peak, start, width = (float(item) for item in value.split(","))
+            return RateProfile([(start, base), (width, peak), (math.inf, base)], seed=seed, name=spec)
+        if kind == "curve":
+            segments = []
+            with open(value, encoding="utf-8") as f:
+                for line in f:
+                    cells = [cell.strip() for cell in line.split(",") if cell.strip()]
+                    try:
+                        count = float(cells[-1]) if cells else None
+                    except ValueError:
+                        continue  # Cabeçalho
+                    if count is not None:
+                        segments.append((60.0, count / 60.0))
+            if not segments:
+                raise ValueError(f"Curva vazia: {value}")
+            return RateProfile(segments, seed=seed, name=spec)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Perfil de taxa inválido '{spec}': {e}")
+    raise ValueError(f"Perfil de taxa desconhecido: {kind} (use constant, poisson, step, spike ou curve)")
+
+
+@dataclass
+class Pacing:
+    """
+    Define quando cada evento deve ser enviado
+    
+    Sem perfil e sem `original`, os eventos são enviados o mais rápido possível.
+    """
+    profile: Optional[RateProfile] = None
+    original: bool = False  # Usa o instante simulado `at` gravado em cada evento
+    compress: float = 1.0  # Fator de compressão do tempo de cenário
+    origin: Optional[float] = None  # Instante `at` que corresponde ao início (default: o do 1º evento)
+    
+    def schedule(
+        self,
+        events: Iterable[PreparedEvent],
+        until: Optional[float] = None,
+        elapsed=None,
+    ) -> Iterator[Tuple[Optional[float], PreparedEvent]]:
+        """
+        Associa a cada evento o instante de envio em segundos de relógio (None = imediato)
+        
+        Args:
+            events: Eventos a enviar
+            until: Encerra antes de consumir o evento cujo envio cairia após este
+                instante, deixando-o no iterador (ex: para o próximo degrau do capacity)
+            elapsed: Função que retorna os segundos desde o início (sem perfil de taxa)
+        """
+        events = iter(events)
+        if self.original:
+            origin = self.origin
+            for event in events:
+                if event.at is None:
+                    yield None, event
+                    continue
+                if origin is None:
+                    origin = event.at
+                yield max(0.0, (event.at - origin) / self.compress), event
+        elif self.profile is not None:
+            for offset in self.profile.arrivals(self.compress):
+                if until is not None and offset >= until:
+                    return
+                event = next(events, None)
+                if event is None:
+                    return
+                yield offset, event
+        else:
+            while until is None or elapsed is None or elapsed() < until:
+                event = next(events, None)
+                if event is None:
+                    return
+                yield None, event
+
+
+async def run_load(
+    url: str,
+    events: Iterable[PreparedEvent],
+    sender,
+    concurrency: int = 10,
+    pacing: Optional[Pacing] = None,
+    duration: Optional[float] = None,
+    faults: Optional[FaultInjection] = None,
+    open_model: bool = False,
+    max_in_flight: int = 256,
+    event_log: Optional[EventLog] = None,
+    metrics: Optional[LiveMetrics] = None,
+    stats: Optional[LoadStats] = None,
+) -> LoadStats:
+    """
+    Dispara os eventos contra o webhook
+    
+    No modelo fechado (padrão) um pool de `concurrency` workers consome os eventos:
+    se o backend fica lento, os envios seguintes atrasam junto e a latência medida
+    esconde a fila (omissão coordenada). No modelo aberto cada evento é disparado
+    no seu instante previsto pelo `pacing`, independentemente das respostas
+    pendentes, e a latência também é medida a partir desse instante (etapa
+    "scheduled").
+    
+    Com WebhookSender as requisições bloqueantes rodam em um pool de threads;
+    com AsyncWebhookSender são aguardadas diretamente no event loop.
+    
+    Args:
+        url: URL do endpoint do webhook
+        events: Eventos já serializados e assinados (consumidos sob demanda)
+        sender: WebhookSender ou AsyncWebhookSender usado nos envios
+        concurrency: Número máximo de requisições simultâneas
+        pacing: Espaçamento dos envios no tempo (None para sem limite de taxa)
+        duration: Duração máxima da execução em segundos (opcional)
+        faults: Duplicatas e reordenações a injetar no fluxo (opcional)
+        open_model: Dispara nos instantes previstos em vez de usar workers
+        max_in_flight: Máximo de requisições em andamento no modelo aberto (as
+            demais aguardam uma vaga, e a espera entra na latência "scheduled")
+        event_log: Registro JSON lines com o resultado de cada requisição (opcional)
+        metrics: Métricas atualizadas a cada resposta, para o exportador Prometheus (opcional)
+        stats: Acumulador a usar, para acompanhar a execução em andamento (default: novo LoadStats)
+    
+    Returns:
+        Estatísticas agregadas da execução
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = stats if stats is not None else LoadStats()
+    is_async = isinstance(sender, AsyncWebhookSender)
+    if faults is not None and faults.enabled:
+        events = faults.apply(events)
+    # Cópias simultâneas precisam de threads próprias para saírem ao mesmo tempo
+    max_copies = faults.copies if faults is not None and faults.concurrent > 0 else 1
+    workers = max_in_flight if open_model else concurrency
+    executor = None if is_async else ThreadPoolExecutor(max_workers=workers * max_copies)
+    
+    async def producer() -> None:
+        start = loop.time()
+        for offset, item in (pacing or Pacing()).schedule(events, duration, lambda: loop.time() - start):
+            if duration is not None and (offset if offset is not None else loop.time() - start) >= duration:
+                break
+            if offset is not None:
+                delay = start + offset - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(None)
+    
+    async def send(item: PreparedEvent, intended: Optional[float] = None) -> None:
+        accepted = False
+        if metrics is not None:
+            metrics.request_started()
+        try:
+            if is_async:
+                response, timing = await sender.send_event(url, item)
+            else:
+                response, timing = await loop.run_in_executor(executor, sender.send_event, url, item)
+            if intended is not None:
+                timing.scheduled = loop.time() - intended
+            stats.record(item.event_type, status_code=response.status_code, timing=timing)
+            accepted = 200 <= response.status_code < 300
+            if event_log is not None:
+                event_log.write(result_record(item, status_code=response.status_code, timing=timing))
+            if metrics is not None:
+                metrics.request_finished(item.event_type, status_code=response.status_code, timing=timing)
+        except Exception as e:
+            stats.record(item.event_type, error=type(e).__name__)
+            if event_log is not None:
+                event_log.write(result_record(item, error=type(e).__name__))
+            if metrics is not None:
+                metrics.request_finished(item.event_type, error=type(e).__name__)
+        if item.tag:
+            stats.record_injected(item.tag, accepted)
+    
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if item.copies > 1:
+                await asyncio.gather(*(send(item) for _ in range(item.copies)))
+            else:
+                await send(item)
+    
+    async def dispatch(item: PreparedEvent, intended: float, slots: asyncio.Semaphore) -> None:
+        if slots.locked():
+            stats.client_waits += 1
+        async with slots:
+            if item.copies > 1:
+                await asyncio.gather(*(send(item, intended) for _ in range(item.copies)))
+            else:
+                await send(item, intended)
+    
+    async def open_producer() -> None:
+        slots = asyncio.Semaphore(max_in_flight)
+        pending: set = set()
+        start = loop.time()
+        for offset, item in (pacing or Pacing()).schedule(events, duration, lambda: loop.time() - start):
+            now = loop.time()
+            if duration is not None and (offset if offset is not None else now - start) >= duration:
+                break
+            intended = start + offset if offset is not None else now
+            if intended > now:
+                await asyncio.sleep(intended - now)
+            task = loop.create_task(dispatch(item, intended, slots))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            # Cede o loop para as tarefas recém-criadas mesmo quando o envio está atrasado
+            if intended <= now:
+                await asyncio.sleep(0)
+        if pending:
+            await asyncio.gather(*pending)
+    
+    stats.start()
+    try:
+        if open_model:
+            await open_producer()
+        else:
+            await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+    stats.stop()
+    return stats
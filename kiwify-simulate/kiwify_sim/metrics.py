@@ -0,0 +1,414 @@
+"""
+Métricas ao vivo (Prometheus) e amostragem de recursos do simulador no soak
+"""
+
+import sys
+import time
+import asyncio
+import gc
+import os
+import statistics
+import tracemalloc
+import bisect
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+from .senders import RequestTiming
+from .stats import LatencyHistogram, LoadStats
+
+
+class LiveMetrics:
+    """
+    Métricas da execução em andamento no formato de exposição do Prometheus
+    
+    Atualizadas a cada resposta pelo próprio event loop da carga; render() gera
+    o texto no formato do Prometheus (0.0.4) ou do OpenMetrics.
+    """
+    
+    PREFIX = "kiwify_sim"
+    # Limites dos buckets de latência em segundos
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0)
+    LATENCY_STAGES = ("total", "ttfb", "scheduled")
+    
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str], int] = {}  # (evento, status) -> requisições
+        self.errors: Dict[Tuple[str, str], int] = {}  # (evento, erro) -> requisições
+        self.in_flight = 0
+        # (evento, etapa) -> [contagens por bucket..., +Inf], soma
+        self.histograms: Dict[Tuple[str, str], Tuple[List[int], List[float]]] = {}
+        self.started_at = time.time()
+    
+    def request_started(self) -> None:
+        self.in_flight += 1
+    
+    def request_finished(
+        self,
+        event_type: str,
+        status_code: Optional[int] = None,
+        error: Optional[str] = None,
+        timing: Optional[RequestTiming] = None,
+    ) -> None:
+        self.in_flight -= 1
+        status = str(status_code) if status_code is not None else "error"
+        key = (event_type, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        if error is not None:
+            error_key = (event_type, error)
+            self.errors[error_key] = self.errors.get(error_key, 0) + 1
+        if timing is not None:
+            for stage in self.LATENCY_STAGES:
+                value = getattr(timing, stage)
+                if value is not None:
+                    self._observe(event_type, stage, value)
+    
+    def _observe(self, event_type: str, stage: str, seconds: float) -> None:
+        histogram = self.histograms.get((event_type, stage))
+        if histogram is None:
+            histogram = self.histograms[(event_type, stage)] = ([0] * (len(self.LATENCY_BUCKETS) + 1), [0.0])
+        counts, total = histogram
+        counts[bisect.bisect_left(self.LATENCY_BUCKETS, seconds)] += 1
+        total[0] += seconds
+    
+    def render(self, openmetrics: bool = False) -> bytes:
+        """Texto de exposição das métricas"""
+        p = self.PREFIX
+        lines = [
+            f"# HELP {p}_requests Requisições concluídas por evento e status HTTP (status=error quando não houve resposta)",
+            f"# TYPE {p}_requests counter",
+        ]
+        for (event_type, status), count in sorted(self.requests.items()):
+            lines.append(f'{p}_requests_total{{event="{event_type}",status="{status}"}} {count}')
+        lines += [
+            f"# HELP {p}_errors Requisições sem resposta por evento e tipo de erro",
+            f"# TYPE {p}_errors counter",
+        ]
+        for (event_type, error), count in sorted(self.errors.items()):
+            lines.append(f'{p}_errors_total{{event="{event_type}",error="{error}"}} {count}')
+        lines += [
+            f"# HELP {p}_in_flight Requisições em andamento",
+            f"# TYPE {p}_in_flight gauge",
+            f"{p}_in_flight {self.in_flight}",
+            f"# HELP {p}_start_time_seconds Início da execução (epoch)",
+            f"# TYPE {p}_start_time_seconds gauge",
+            f"{p}_start_time_seconds {self.started_at:.3f}",
+            f"# HELP {p}_request_duration_seconds Latência das requisições por evento e etapa "
+            f"(total, ttfb e scheduled, desde o instante previsto)",
+            f"# TYPE {p}_request_duration_seconds histogram",
+        ]
+        for (event_type, stage), (counts, total) in sorted(self.histograms.items()):
+            labels = f'event="{event_type}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(self.LATENCY_BUCKETS, counts):
+                cumulative += count
+                lines.append(f'{p}_request_duration_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{p}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"{p}_request_duration_seconds_count{{{labels}}} {cumulative}")
+            lines.append(f"{p}_request_duration_seconds_sum{{{labels}}} {total[0]:.6f}")
+        if openmetrics:
+            lines.append("# EOF")
+        else:
+            # O formato 0.0.4 usa o nome do contador com o sufixo _total também no TYPE
+            lines = [
+                line.replace(f"{p}_requests ", f"{p}_requests_total ").replace(f"{p}_errors ", f"{p}_errors_total ")
+                if line.startswith("# ") else line
+                for line in lines
+            ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class MetricsServer:
+    """Endpoint HTTP local (GET /metrics) que expõe as LiveMetrics durante a execução"""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 9464, linger: float = 0.0):
+        """
+        Args:
+            host: Endereço de escuta
+            port: Porta de escuta
+            linger: Segundos que o endpoint continua no ar após o fim da execução,
+                para a última coleta do Prometheus
+        """
+        self.host = host
+        self.port = port
+        self.linger = linger
+        self.metrics = LiveMetrics()
+        self._server = None
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, _, header_block = head.decode("latin-1").partition("\r\n")
+            path = (request_line.split(" ") + ["", ""])[1]
+            openmetrics = "application/openmetrics-text" in header_block.lower()
+            if path.split("?")[0] in ("/metrics", "/"):
+                body = self.metrics.render(openmetrics=openmetrics)
+                content_type = (
+                    "application/openmetrics-text; version=1.0.0; charset=utf-8" if openmetrics
+                    else "text/plain; version=0.0.4; charset=utf-8"
+                )
+                status = "200 OK"
+            else:
+                body, content_type, status = b"not found\n", "text/plain", "404 Not Found"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+    
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        if self.linger > 0:
+            await asyncio.sleep(self.linger)
+        self._server.close()
+        await self._server.wait_closed()
+
+
+def _process_rss_bytes() -> Optional[int]:
+    """Memória residente atual do processo (None se não for possível medir)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Fora do Linux só há o pico (ru_maxrss, em bytes no macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _open_descriptors() -> Tuple[Optional[int], Optional[int]]:
+    """(descritores abertos, sockets abertos) do processo, via /proc (None se indisponível)"""
+    try:
+        names = os.listdir("/proc/self/fd")
+    except OSError:
+        return None, None
+    sockets = 0
+    for name in names:
+        try:
+            if os.readlink(f"/proc/self/fd/{name}").startswith("socket:"):
+                sockets += 1
+        except OSError:
+            continue  # Descritor fechado durante a listagem
+    return len(names), sockets
+
+
+class SoakMonitor:
+    """
+    Amostrador de recursos do próprio simulador em execuções longas (soak)
+    
+    Roda no mesmo event loop da carga: a cada `interval` segundos registra RSS,
+    descritores e sockets abertos, atraso do event loop, coletas e pausas do GC
+    (e, opcionalmente, a memória rastreada pelo tracemalloc), junto com a vazão e
+    a latência da janela. drift() compara o início com o fim da execução para
+    separar degradação do backend de artefatos do cliente.
+    """
+    
+    # Medidas do cliente verificadas por drift(): chave -> (descrição, acréscimo mínimo)
+    CLIENT_SIGNALS = {
+        "rss_mb": ("RSS do simulador (MB)", 5.0),
+        "sockets": ("sockets abertos", 2.0),
+        "loop_lag_p99_ms": ("atraso p99 do event loop (ms)", 5.0),
+        "gc_pause_ms": ("pausa do GC por janela (ms)", 10.0),
+        "traced_mb": ("memória rastreada pelo tracemalloc (MB)", 1.0),
+    }
+    BACKEND_SIGNALS = {
+        "p99_ms": ("latência p99 das respostas (ms)", 20.0),
+        "error_rate": ("taxa de erro", 0.005),
+    }
+    
+    def __init__(
+        self,
+        interval: float = 30.0,
+        drift_threshold: float = 0.2,
+        trace_memory: bool = False,
+        lag_interval: float = 0.1,
+        on_sample: Optional[Any] = None,
+    ):
+        """
+        Args:
+            interval: Segundos entre amostras
+            drift_threshold: Aumento relativo (ex: 0.2 = 20%) entre o início e o fim
+                da execução a partir do qual uma medida é sinalizada
+            trace_memory: Ativa o tracemalloc (custo de CPU considerável) e reporta
+                as linhas com maior crescimento de memória
+            lag_interval: Período do relógio que mede o atraso do event loop
+            on_sample: Função chamada com cada amostra (dict)
+        """
+        self.interval = interval
+        self.drift_threshold = drift_threshold
+        self.trace_memory = trace_memory
+        self.lag_interval = lag_interval
+        self.on_sample = on_sample
+        self.stats = LoadStats()
+        self.samples: List[Dict[str, Any]] = []
+        self.top_growth: List[Dict[str, Any]] = []
+        self._lag = LatencyHistogram()
+        self._gc_pause = 0.0
+        self._gc_collections = [0, 0, 0]
+        self._gc_started: Optional[float] = None
+        self._tasks: List[asyncio.Task] = []
+        self._first_snapshot = None
+        self._previous: Dict[str, Any] = {}
+    
+    def _gc_callback(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            self._gc_pause += time.perf_counter() - self._gc_started
+            self._gc_collections[info.get("generation", 0)] += 1
+            self._gc_started = None
+    
+    def start(self) -> None:
+        """Inicia a amostragem (deve ser chamado dentro do event loop)"""
+        gc.callbacks.append(self._gc_callback)
+        if self.trace_memory:
+            tracemalloc.start()
+            self._first_snapshot = tracemalloc.take_snapshot()
+        self._previous = {"time": time.perf_counter(), "sent": 0, "failed": 0, "latency": LatencyHistogram()}
+        self._tasks = [asyncio.create_task(self._measure_lag()), asyncio.create_task(self._sample_periodically())]
+    
+    async def stop(self) -> None:
+        """Encerra a amostragem, registrando uma última amostra"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.sample()
+        if self._gc_callback in gc.callbacks:
+            gc.callbacks.remove(self._gc_callback)
+        if self.trace_memory and tracemalloc.is_tracing():
+            stats = tracemalloc.take_snapshot().compare_to(self._first_snapshot, "lineno")
+            self.top_growth = [
+                {"location": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1),
+                 "count_diff": stat.count_diff}
+                for stat in stats[:10] if stat.size_diff > 0
+            ]
+            self._first_snapshot = None
+            tracemalloc.stop()
+    
+    async def _measure_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self._lag.record(max(0.0, loop.time() - expected))
+    
+    async def _sample_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sample()
+    
+    def sample(self) -> Dict[str, Any]:
+        """Registra uma amostra dos recursos e da janela desde a amostra anterior"""
+        now = time.perf_counter()
+        window = max(now - self._previous["time"], 1e-9)
+        latency = self.stats.response_latency
+        window_latency = latency.difference(self._previous["latency"])
+        sent = self.stats.sent - self._previous["sent"]
+        failed = (self.stats.sent - self.stats.succeeded) - self._previous["failed"]
+        rss = _process_rss_bytes()
+        descriptors, sockets = _open_descriptors()
+        
+        sample: Dict[str, Any] = {
+            "elapsed_s": round(self.stats.elapsed, 1),
+            "rss_mb": round(rss / 1_048_576, 1) if rss is not None else None,
+            "fds": descriptors,
+            "sockets": sockets,
+            "threads": threading.active_count(),
+            "loop_lag_p99_ms": round(self._lag.percentile_ms(99.0), 2),
+            "loop_lag_max_ms": round(self._lag.max_us / 1000.0, 2),
+            "gc_collections": list(self._gc_collections),
+            "gc_pause_ms": round(self._gc_pause * 1000.0, 2),
+            "gc_tracked": sum(gc.get_count()),
+            "rps": round(sent / window, 1),
+            "p99_ms": round(window_latency.percentile_ms(99.0), 1) if window_latency.total_count else None,
+            "error_rate": round(failed / sent, 4) if sent else 0.0,
+        }
+        if self.trace_memory and tracemalloc.is_tracing():
+            sample["traced_mb"] = round(tracemalloc.get_traced_memory()[0] / 1_048_576, 2)
+        
+        self.samples.append(sample)
+        snapshot = LatencyHistogram()
+        snapshot.merge(latency)
+        self._previous = {
+            "time": now, "sent": self.stats.sent, "failed": self.stats.sent - self.stats.succeeded, "latency": snapshot,
+        }
+        self._lag = LatencyHistogram()
+        self._gc_pause = 0.0
+        self._gc_collections = [0, 0, 0]
+        if self.on_sample is not None:
+            self.on_sample(sample)
+        return sample
+    
+    def _baseline_and_recent(self, key: str) -> Optional[Tuple[float, float]]:
+        """Medianas do primeiro e do último terço das amostras (a primeira é o aquecimento)"""
+        values = [s[key] for s in self.samples[1:] if s.get(key) is not None]
+        if len(values) < 3:
+            return None
+        third = max(1, len(values) // 3)
+        return statistics.median(values[:third]), statistics.median(values[-third:])
+    
+    def _drifted(self, signals: Dict[str, Tuple[str, float]]) -> List[Dict[str, Any]]:
+        flagged = []
+        for key, (label, minimum) in signals.items():
+            measured = self._baseline_and_recent(key)
+            if measured is None:
+                continue
+            baseline, recent = measured
+            increase = recent - baseline
+            if increase >= minimum and increase > baseline * self.drift_threshold:
+                flagged.append({"signal": key, "label": label, "baseline": baseline, "recent": recent})
+        return flagged
+    
+    def drift(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Medidas que cresceram entre o início e o fim da execução
+        
+        Returns:
+            {"client": [...], "backend": [...]} com baseline (mediana do primeiro
+            terço) e recent (mediana do último terço) de cada medida sinalizada
+        """
+        return {"client": self._drifted(self.CLIENT_SIGNALS), "backend": self._drifted(self.BACKEND_SIGNALS)}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "interval_s": self.interval,
+            "drift_threshold": self.drift_threshold,
+            "samples": self.samples,
+            "drift": self.drift(),
+            "tracemalloc_top_growth": self.top_growth,
+        }
+    
+    def print_report(self) -> None:
+        """Exibe o diagnóstico de deriva da execução"""
+        print("\n🩺 Soak: recursos do simulador")
+        if len(self.samples) < 4:
+            print("   Amostras insuficientes para avaliar deriva (aumente --duration ou reduza --sample-interval)")
+            return
+        first, last = self.samples[1], self.samples[-1]
+        for key in ("rss_mb", "sockets", "loop_lag_p99_ms", "p99_ms", "rps"):
+            if first.get(key) is not None and last.get(key) is not None:
+                print(f"   {key:<18}{first[key]:>10} → {last[key]}")
+        drift = self.drift()
+        for side, title in (("client", "cliente"), ("backend", "backend")):
+            for item in drift[side]:
+                print(f"   ⚠️  Deriva no {title}: {item['label']} {item['baseline']:g} → {item['recent']:g}")
+        if drift["client"]:
+            print("   ❗ O simulador degradou durante a execução; mudanças de latência podem ser artefato do cliente")
+        elif drift["backend"]:
+            print("   ✅ Cliente estável: a degradação observada vem do backend")
+        else:
+            print("   ✅ Sem deriva no cliente nem no backend")
+        for item in self.top_growth[:5]:
+            print(f"   📈 {item['location']}: +{item['size_diff_kb']} KB ({item['count_diff']:+d} objetos)")
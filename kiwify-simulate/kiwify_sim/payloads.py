@@ -0,0 +1,986 @@
+"""
+Payloads da Kiwify: tipos de evento, builders, PayloadFactory e assinatura HMAC
+"""
+
+import json
+import math
+import time
+import random
+import uuid
+import hmac
+import hashlib
+import base64
+import contextlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Union
+from enum import Enum
+from urllib.parse import urlencode, urlparse, urlunparse, parse_qs
+
+
+class EventType(Enum):
+    """Tipos de eventos suportados (formato real da Kiwify)"""
+    ORDER_APPROVED = "order_approved"
+    SUBSCRIPTION_RENEWED = "subscription_renewed"
+    SUBSCRIPTION_CANCELED = "subscription_canceled"
+    CHARGEBACK = "chargeback"
+
+
+# URL padrão do webhook (ambiente DEV na nuvem)
+DEFAULT_WEBHOOK_URL = "https://us-central1-minerx-app-login.cloudfunctions.net/kiwifyWebhook"
+
+
+# Nome do subcomando na CLI -> tipo de evento
+EVENT_COMMANDS = {
+    "approved": EventType.ORDER_APPROVED,
+    "renewed": EventType.SUBSCRIPTION_RENEWED,
+    "canceled": EventType.SUBSCRIPTION_CANCELED,
+    "chargeback": EventType.CHARGEBACK,
+}
+
+
+# Mapeamento de planos
+PLAN_MAPPING = {
+    "STARTER": {
+        "name": "Iniciante",
+        "product_id": "kiwify-product-starter-id",
+    },
+    "SCALING": {
+        "name": "Escalando",
+        "product_id": "kiwify-product-scaling-id",
+    },
+    "SCALED": {
+        "name": "Escalado",
+        "product_id": "kiwify-product-scaled-id",
+    },
+}
+
+
+# Preços padrão dos planos em centavos
+PLAN_PRICES_CENTS = {
+    "STARTER": 4700,
+    "SCALING": 6700,
+    "SCALED": 9700,
+}
+
+
+# Capturas reais de webhooks da Kiwify usadas como esqueleto pela PayloadFactory
+KIWIFY_SAMPLES_DIR = Path(__file__).resolve().parents[2] / "backend" / "kiwify_requests"
+
+SAMPLE_FILES = {
+    EventType.ORDER_APPROVED: "approved_order.json",
+    EventType.SUBSCRIPTION_RENEWED: "renew_signature.json",
+    EventType.SUBSCRIPTION_CANCELED: "canceled_signature.json",
+    EventType.CHARGEBACK: "chargeback.json",
+}
+
+
+def generate_order_id() -> str:
+    """Gera um ID de pedido simulado no formato UUID"""
+    return str(uuid.uuid4())
+
+
+def generate_customer_id() -> str:
+    """Gera um ID de cliente simulado no formato UUID"""
+    return str(uuid.uuid4())
+
+
+def create_order_approved_payload(
+    email: str,
+    plan_id: str = "STARTER",
+    order_id: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    product_id: Optional[str] = None,
+    product_name: Optional[str] = None,
+    amount: Optional[float] = None,
+    subscription_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Cria payload para evento order_approved (formato real da Kiwify)
+    
+    Args:
+        email: Email do cliente
+        plan_id: ID do plano (STARTER, SCALING, SCALED)
+        order_id: ID do pedido (opcional, será gerado se não fornecido)
+        customer_id: ID do cliente (opcional, será gerado se não fornecido)
+        product_id: ID do produto na Kiwify (opcional)
+        product_name: Nome do produto (opcional)
+        amount: Valor do pedido em centavos (opcional, será convertido)
+        subscription_id: ID da assinatura (opcional)
+    """
+    plan = PLAN_MAPPING.get(plan_id, PLAN_MAPPING["STARTER"])
+    
+    amount_cents = int((amount * 100) if amount else PLAN_PRICES_CENTS.get(plan_id, 4700))
+    order_id_val = order_id or generate_order_id()
+    customer_id_val = customer_id or generate_customer_id()
+    subscription_id_val = subscription_id or str(uuid.uuid4())
+    product_id_val = product_id or plan["product_id"]
+    
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
+    iso_now = datetime.now().isoformat() + "Z"
+    
+    return {
+        "order_id": order_id_val,
+        "order_ref": f"REF{datetime.now().strftime('%Y%m%d%H%M%S')}",
+        "order_status": "paid",
+        "product_type": "membership",
+        "payment_method": "credit_card",
+        "store_id": "test_store_id",
+        "payment_merchant_id": 12345678,
+        "installments": 1,
+        "card_type": "mastercard",
+        "card_last4digits": "1234",
+        "card_rejection_reason": None,
+        "boleto_URL": None,
+        "boleto_barcode": None,
+        "boleto_expiry_date": None,
+        "pix_code": None,
+        "pix_expiration": None,
+        "sale_type": "producer",
+        "created_at": now_str,
+        "updated_at": now_str,
+        "approved_date": now_str,
+        "refunded_at": None,
+        "webhook_event_type": EventType.ORDER_APPROVED.value,
+        "Product": {
+            "product_id": product_id_val,
+            "product_name": product_name or plan["name"],
+        },
+        "Customer": {
+            "full_name": email.split("@")[0].title(),
+            "first_name": email.split("@")[0].split(".")[0].title(),
+            "email": email,
+            "mobile": "+5511999999999",
+            "cnpj": None,
+            "ip": "192.168.1.1",
+            "instagram": None,
+            "street": None,
+            "number": None,
+            "complement": None,
+            "neighborhood": None,
+            "city": None,
+            "state": None,
+            "zipcode": None,
+        },
+        "Commissions": {
+            "charge_amount": amount_cents,
+            "product_base_price": amount_cents,
+            "product_base_price_currency": "BRL",
+            "kiwify_fee": int(amount_cents * 0.11),
+            "kiwify_fee_currency": "BRL",
+            "settlement_amount": amount_cents,
+            "settlement_amount_currency": "BRL",
+            "sale_tax_rate": 0,
+            "sale_tax_amount": 0,
+            "currency": "BRL",
+            "my_commission": int(amount_cents * 0.89),
+        },
+        "TrackingParameters": {},
+        "Subscription": {
+            "id": subscription_id_val,
+            "start_date": iso_now,
+            "next_payment": iso_now,
+            "status": "active",
+            "plan": {
+                "id": str(uuid.uuid4()),
+                "name": plan["name"],
+                "frequency": "monthly",
+                "qty_charges": 0,
+            },
+            "charges": {
+                "completed": [
+                    {
+                        "order_id": order_id_val,
+                        "amount": amount_cents,
+                        "status": "paid",
+                        "installments": 1,
+                        "card_type": "mastercard",
+                        "card_last_digits": "1234",
+                        "card_first_digits": "123456",
+                        "created_at": iso_now,
+                    }
+                ],
+                "future": [],
+            },
+        },
+        "subscription_id": subscription_id_val,
+        "access_url": None,
+    }
+
+
+def create_subscription_canceled_payload(
+    email: str,
+    order_id: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    subscription_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Cria payload para evento subscription_canceled (formato real da Kiwify)
+    
+    Args:
+        email: Email do cliente
+        order_id: ID do pedido (opcional)
+        customer_id: ID do cliente (opcional)
+        subscription_id: ID da assinatura (opcional)
+    """
+    order_id_val = order_id or generate_order_id()
+    customer_id_val = customer_id or generate_customer_id()
+    subscription_id_val = subscription_id or str(uuid.uuid4())
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
+    iso_now = datetime.now().isoformat() + "Z"
+    
+    return {
+        "order_id": order_id_val,
+        "order_ref": f"REF{datetime.now().strftime('%Y%m%d%H%M%S')}",
+        "order_status": "refunded",
+        "product_type": "membership",
+        "payment_method": "credit_card",
+        "store_id": "test_store_id",
+        "payment_merchant_id": 12345678,
+        "installments": 1,
+        "card_type": "mastercard",
+        "card_last4digits": "1234",
+        "card_rejection_reason": None,
+        "boleto_URL": None,
+        "boleto_barcode": None,
+        "boleto_expiry_date": None,
+        "pix_code": None,
+        "pix_expiration": None,
+        "sale_type": "producer",
+        "created_at": now_str,
+        "updated_at": now_str,
+        "approved_date": None,
+        "refunded_at": now_str,
+        "webhook_event_type": EventType.SUBSCRIPTION_CANCELED.value,
+        "Product": {
+            "product_id": str(uuid.uuid4()),
+            "product_name": "Example product",
+        },
+        "Customer": {
+            "full_name": email.split("@")[0].title(),
+            "first_name": email.split("@")[0].split(".")[0].title(),
+            "email": email,
+            "mobile": "+5511999999999",
+        },
+        "Commissions": {
+            "charge_amount": 0,
+            "currency": "BRL",
+        },
+        "TrackingParameters": {},
+        "Subscription": {
+            "id": subscription_id_val,
+            "start_date": iso_now,
+            "next_payment": iso_now,
+            "status": "canceled",
+            "plan": {
+                "id": str(uuid.uuid4()),
+                "name": "Example plan",
+                "frequency": "monthly",
+                "qty_charges": 0,
+            },
+            "charges": {
+                "completed": [],
+                "future": [
+                    {
+                        "charge_date": iso_now,
+                    }
+                ],
+            },
+        },
+        "subscription_id": subscription_id_val,
+    }
+
+
+def create_subscription_renewed_payload(
+    email: str,
+    order_id: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    subscription_id: Optional[str] = None,
+    amount: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Cria payload para evento subscription_renewed (formato real da Kiwify)
+    
+    Args:
+        email: Email do cliente
+        order_id: ID do pedido (opcional)
+        customer_id: ID do cliente (opcional)
+        subscription_id: ID da assinatura (opcional)
+        amount: Valor do pedido em reais (opcional, será convertido para centavos)
+    """
+    order_id_val = order_id or generate_order_id()
+    customer_id_val = customer_id or generate_customer_id()
+    subscription_id_val = subscription_id or str(uuid.uuid4())
+    amount_cents = int((amount * 100) if amount else 4700)
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
+    iso_now = datetime.now().isoformat() + "Z"
+    
+    return {
+        "order_id": order_id_val,
+        "order_ref": f"REF{datetime.now().strftime('%Y%m%d%H%M%S')}",
+        "order_status": "paid",
+        "product_type": "membership",
+        "payment_method": "credit_card",
+        "store_id": "test_store_id",
+        "payment_merchant_id": 12345678,
+        "installments": 1,
+        "card_type": "mastercard",
+        "card_last4digits": "1234",
+        "card_rejection_reason": None,
+        "boleto_URL": None,
+        "boleto_barcode": None,
+        "boleto_expiry_date": None,
+        "pix_code": None,
+        "pix_expiration": None,
+        "sale_type": "producer",
+        "created_at": now_str,
+        "updated_at": now_str,
+        "approved_date": None,
+        "refunded_at": None,
+        "webhook_event_type": EventType.SUBSCRIPTION_RENEWED.value,
+        "Product": {
+            "product_id": str(uuid.uuid4()),
+            "product_name": "Example product",
+        },
+        "Customer": {
+            "full_name": email.split("@")[0].title(),
+            "first_name": email.split("@")[0].split(".")[0].title(),
+            "email": email,
+            "mobile": "+5511999999999",
+        },
+        "Commissions": {
+            "charge_amount": amount_cents,
+            "product_base_price": amount_cents,
+            "product_base_price_currency": "BRL",
+            "kiwify_fee": int(amount_cents * 0.11),
+            "currency": "BRL",
+            "my_commission": int(amount_cents * 0.89),
+        },
+        "TrackingParameters": {},
+        "Subscription": {
+            "id": subscription_id_val,
+            "start_date": iso_now,
+            "next_payment": iso_now,
+            "status": "active",
+            "plan": {
+                "id": str(uuid.uuid4()),
+                "name": "Example plan",
+                "frequency": "monthly",
+                "qty_charges": 0,
+            },
+            "charges": {
+                "completed": [
+                    {
+                        "order_id": order_id_val,
+                        "amount": amount_cents,
+                        "status": "paid",
+                        "installments": 1,
+                        "card_type": "mastercard",
+                        "card_last_digits": "1234",
+                        "card_first_digits": "123456",
+                        "created_at": iso_now,
+                    }
+                ],
+                "future": [
+                    {
+                        "charge_date": iso_now,
+                    }
+                ],
+            },
+        },
+        "subscription_id": subscription_id_val,
+    }
+
+
+def create_chargeback_payload(
+    email: str,
+    order_id: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    subscription_id: Optional[str] = None,
+    amount: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Cria payload para evento chargeback (formato real da Kiwify)
+    
+    Args:
+        email: Email do cliente
+        order_id: ID do pedido (opcional)
+        customer_id: ID do cliente (opcional)
+        subscription_id: ID da assinatura (opcional)
+        amount: Valor do pedido em reais (opcional, será convertido para centavos)
+    """
+    order_id_val = order_id or generate_order_id()
+    customer_id_val = customer_id or generate_customer_id()
+    subscription_id_val = subscription_id or str(uuid.uuid4())
+    amount_cents = int((amount * 100) if amount else 4700)
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
+    iso_now = datetime.now().isoformat() + "Z"
+    
+    return {
+        "order_id": order_id_val,
+        "order_ref": f"REF{datetime.now().strftime('%Y%m%d%H%M%S')}",
+        "order_status": "chargedback",
+        "product_type": "membership",
+        "payment_method": "credit_card",
+        "store_id": "test_store_id",
+        "payment_merchant_id": 12345678,
+        "installments": 1,
+        "card_type": "mastercard",
+        "card_last4digits": "1234",
+        "card_rejection_reason": None,
+        "boleto_URL": None,
+        "boleto_barcode": None,
+        "boleto_expiry_date": None,
+        "pix_code": None,
+        "pix_expiration": None,
+        "sale_type": "producer",
+        "created_at": now_str,
+        "updated_at": now_str,
+        "approved_date": None,
+        "refunded_at": None,
+        "webhook_event_type": EventType.CHARGEBACK.value,
+        "Product": {
+            "product_id": str(uuid.uuid4()),
+            "product_name": "Example product",
+        },
+        "Customer": {
+            "full_name": email.split("@")[0].title(),
+            "first_name": email.split("@")[0].split(".")[0].title(),
+            "email": email,
+            "mobile": "+5511999999999",
+        },
+        "Commissions": {
+            "charge_amount": amount_cents,
+            "product_base_price": amount_cents,
+            "currency": "BRL",
+        },
+        "TrackingParameters": {},
+        "Subscription": {
+            "id": subscription_id_val,
+            "start_date": iso_now,
+            "next_payment": iso_now,
+            "status": "active",
+            "plan": {
+                "id": str(uuid.uuid4()),
+                "name": "Example plan",
+                "frequency": "monthly",
+                "qty_charges": 0,
+            },
+            "charges": {
+                "completed": [
+                    {
+                        "order_id": order_id_val,
+                        "amount": amount_cents,
+                        "status": "paid",
+                        "installments": 1,
+                        "card_type": "mastercard",
+                        "card_last_digits": "1234",
+                        "created_at": iso_now,
+                    }
+                ],
+                "future": [
+                    {
+                        "charge_date": iso_now,
+                    }
+                ],
+            },
+        },
+        "subscription_id": subscription_id_val,
+    }
+
+
+def build_payload(event_type: EventType, email: str, **kwargs: Any) -> Dict[str, Any]:
+    """
+    Cria o payload do evento usando o builder correspondente ao tipo
+
+    Args:
+        event_type: Tipo do evento
+        email: Email do cliente
+        **kwargs: Argumentos opcionais repassados ao builder (order_id, amount, etc.)
+    """
+    if event_type == EventType.ORDER_APPROVED:
+        return create_order_approved_payload(email=email, **kwargs)
+    if event_type == EventType.SUBSCRIPTION_RENEWED:
+        return create_subscription_renewed_payload(email=email, **kwargs)
+    if event_type == EventType.SUBSCRIPTION_CANCELED:
+        return create_subscription_canceled_payload(email=email, **kwargs)
+    if event_type == EventType.CHARGEBACK:
+        return create_chargeback_payload(email=email, **kwargs)
+    raise ValueError(f"Tipo de evento não suportado: {event_type}")
+
+
+class PayloadFactory:
+    """
+    Fábrica de payloads baseada em esqueletos pré-computados
+    
+    Carrega uma vez, por tipo de evento, o payload real capturado em
+    backend/kiwify_requests (ou, na ausência dele, o gerado pelo builder) e, a
+    cada evento, troca apenas os campos variáveis: ids, email, valores e datas.
+    As partes que não mudam (TrackingParameters, commissioned_stores, plano da
+    assinatura, etc.) são compartilhadas entre os payloads gerados, que portanto
+    devem ser tratados como somente leitura.
+    """
+    
+    def __init__(self, samples_dir: Optional[Path] = KIWIFY_SAMPLES_DIR, seed: Optional[int] = None):
+        """
+        Args:
+            samples_dir: Diretório com as capturas reais (None para usar os builders)
+            seed: Semente do gerador de ids (torna a geração reprodutível)
+        """
+        self.rng = random.Random(seed)
+        self.skeletons = {
+            event_type: self._load_skeleton(event_type, samples_dir) for event_type in EventType
+        }
+        self._stamp_key: Any = None
+        self._stamps: Tuple[str, str] = ("", "")
+    
+    @staticmethod
+    def _load_skeleton(event_type: EventType, samples_dir: Optional[Path]) -> Dict[str, Any]:
+        path = samples_dir / SAMPLE_FILES[event_type] if samples_dir else None
+        if path is not None and path.is_file():
+            with open(path, encoding="utf-8") as f:
+                skeleton = json.load(f)
+        else:
+            skeleton = build_payload(event_type, "skeleton@example.com")
+        skeleton["webhook_event_type"] = event_type.value
+        return skeleton
+    
+    # Bits de versão (4) e variante (RFC 4122) de um UUID v4
+    _UUID4_CLEAR_MASK = ~((0xF << 76) | (0xC << 60))
+    _UUID4_SET_BITS = (0x4 << 76) | (0x8 << 60)
+    
+    def new_id(self) -> str:
+        """Gera um UUID v4 a partir do gerador da fábrica (mais barato que uuid.uuid4())"""
+        value = (self.rng.getrandbits(128) & self._UUID4_CLEAR_MASK) | self._UUID4_SET_BITS
+        h = "%032x" % value
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+    
+    def new_order_ref(self) -> str:
+        """Gera uma referência curta de pedido com 7 caracteres"""
+        return base64.b64encode(self.rng.randbytes(6), altchars=b"xZ").decode("ascii")[:7]
+    
+    def _timestamps(self, now: Optional[datetime]) -> Tuple[str, str]:
+        """Retorna (data "YYYY-MM-DD HH:MM", data ISO), recalculando só quando a data muda"""
+        key = now if now is not None else int(time.time())
+        if key != self._stamp_key:
+            current = now if now is not None else datetime.now()
+            self._stamps = (current.strftime("%Y-%m-%d %H:%M"), current.isoformat() + "Z")
+            self._stamp_key = key
+        return self._stamps
+    
+    def build(
+        self,
+        event_type: EventType,
+        email: str,
+        plan_id: str = "STARTER",
+        order_id: Optional[str] = None,
+        subscription_id: Optional[str] = None,
+        amount_cents: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Cria o payload de um evento a partir do esqueleto
+        
+        Args:
+            event_type: Tipo do evento
+            email: Email do cliente
+            plan_id: ID do plano (STARTER, SCALING, SCALED)
+            order_id: ID do pedido (opcional, será gerado se não fornecido)
+            subscription_id: ID da assinatura (opcional, será gerado se não fornecido)
+            amount_cents: Valor em centavos (opcional, usa o preço do plano)
+            now: Data do evento (opcional, usa a data atual)
+        """
+        skeleton = self.skeletons[event_type]
+        now_str, iso_now = self._timestamps(now)
+        order_id_val = order_id or self.new_id()
+        subscription_id_val = subscription_id or self.new_id()
+        if event_type == EventType.SUBSCRIPTION_CANCELED:
+            amount_val = 0
+        else:
+            amount_val = amount_cents if amount_cents is not None else PLAN_PRICES_CENTS.get(plan_id, 4700)
+        
+        payload = dict(skeleton)
+        payload["order_id"] = order_id_val
+        payload["order_ref"] = self.new_order_ref()
+        payload["created_at"] = now_str
+        payload["updated_at"] = now_str
+        payload["subscription_id"] = subscription_id_val
+        if event_type == EventType.ORDER_APPROVED:
+            plan = PLAN_MAPPING.get(plan_id, PLAN_MAPPING["STARTER"])
+            payload["approved_date"] = now_str
+            payload["Product"] = {"product_id": plan["product_id"], "product_name": plan["name"]}
+        elif event_type == EventType.SUBSCRIPTION_CANCELED:
+            payload["refunded_at"] = now_str
+        
+        local_part = email.split("@")[0]
+        customer = dict(skeleton["Customer"])
+        customer["email"] = email
+        customer["full_name"] = local_part.title()
+        customer["first_name"] = local_part.split(".")[0].title()
+        payload["Customer"] = customer
+        
+        commissions = dict(skeleton["Commissions"])
+        for key in ("charge_amount", "product_base_price", "settlement_amount"):
+            if key in commissions:
+                commissions[key] = amount_val
+        if "kiwify_fee" in commissions:
+            commissions["kiwify_fee"] = int(amount_val * 0.11)
+        if "my_commission" in commissions:
+            commissions["my_commission"] = int(amount_val * 0.89)
+        payload["Commissions"] = commissions
+        
+        subscription = dict(skeleton["Subscription"])
+        subscription["id"] = subscription_id_val
+        subscription["start_date"] = iso_now
+        subscription["next_payment"] = iso_now
+        charges = skeleton["Subscription"]["charges"]
+        subscription["charges"] = {
+            "completed": [
+                dict(charge, order_id=order_id_val, amount=amount_val, created_at=iso_now)
+                for charge in charges["completed"]
+            ],
+            "future": [dict(charge, charge_date=iso_now) for charge in charges["future"]],
+        }
+        payload["Subscription"] = subscription
+        return payload
+    
+    def build_batch(
+        self,
+        event_type: EventType,
+        count: int,
+        email_domain: str = "example.com",
+        start_index: int = 0,
+        plan_id: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Cria `count` payloads do mesmo tipo de uma vez
+        
+        Args:
+            event_type: Tipo do evento
+            count: Quantidade de payloads
+            email_domain: Domínio dos emails gerados (loadtest+<n>@<domínio>)
+            start_index: Índice do primeiro email
+            plan_id: ID do plano (opcional, sorteado por evento se omitido)
+            now: Data dos eventos (opcional, usa a data atual)
+        """
+        plans = list(PLAN_MAPPING)
+        now = now or datetime.now()
+        return [
+            self.build(
+                event_type,
+                f"loadtest+{index}@{email_domain}",
+                plan_id=plan_id or self.rng.choice(plans),
+                now=now,
+            )
+            for index in range(start_index, start_index + count)
+        ]
+
+
+# Hooks chamados com (etapa, segundos) a cada etapa do caminho quente; vazio = sem medição
+_stage_hooks: List = []
+
+# Etapas medidas: montagem do payload, json.dumps, HMAC, montagem da URL e requisição HTTP
+HOT_PATH_STAGES = ("build", "encode", "sign", "url", "network")
+
+
+def add_stage_hook(hook) -> None:
+    """Registra uma função hook(etapa, segundos) chamada ao fim de cada etapa do caminho quente"""
+    _stage_hooks.append(hook)
+
+
+def remove_stage_hook(hook) -> None:
+    if hook in _stage_hooks:
+        _stage_hooks.remove(hook)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Repassa a duração de uma etapa medida externamente (ex: a requisição HTTP) aos hooks"""
+    for hook in _stage_hooks:
+        hook(stage, seconds)
+
+
+class _TimedStage:
+    __slots__ = ("stage", "started")
+    
+    def __init__(self, stage: str):
+        self.stage = stage
+    
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        record_stage(self.stage, time.perf_counter() - self.started)
+
+
+_NO_STAGE = contextlib.nullcontext()
+
+
+def timed_stage(stage: str):
+    """
+    Mede o bloco como uma etapa do caminho quente
+    
+    Sem hooks registrados retorna um contexto vazio compartilhado, de modo que a
+    instrumentação não custa nada além de uma checagem de lista.
+    """
+    return _TimedStage(stage) if _stage_hooks else _NO_STAGE
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """
+    Serializa o payload no formato compacto usado na assinatura
+    
+    Equivale ao JSON.stringify do backend (sem espaços, caracteres não ASCII
+    preservados). Os bytes retornados são exatamente os assinados e enviados.
+    
+    Args:
+        payload: Payload JSON
+    
+    Returns:
+        Corpo da requisição em UTF-8
+    """
+    with timed_stage("encode"):
+        return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class SignatureVerifier:
+    """
+    Assinatura e verificação HMAC com o estado da chave pré-calculado
+    
+    hmac.new processa a chave (padding e o primeiro bloco dos hashes interno e
+    externo) a cada chamada; aqui isso é feito uma vez e cada mensagem parte de
+    uma cópia desse estado.
+    """
+    
+    def __init__(self, secret_key: str, digestmod: Any = hashlib.sha1):
+        """
+        Args:
+            secret_key: Chave secreta
+            digestmod: Hash do HMAC (SHA1 na Kiwify, SHA256 no TikTok)
+        """
+        self._hmac = hmac.new(secret_key.encode('utf-8'), digestmod=digestmod)
+    
+    def sign(self, body: bytes) -> str:
+        """Retorna a assinatura hexadecimal do corpo"""
+        mac = self._hmac.copy()
+        mac.update(body)
+        return mac.hexdigest()
+    
+    def verify(self, body: bytes, signature: str) -> bool:
+        """Confere a assinatura em tempo constante"""
+        return hmac.compare_digest(self.sign(body), signature)
+    
+    def verify_event(self, event: "PreparedEvent", reserialize: bool = False) -> bool:
+        """
+        Confere a assinatura de um evento
+        
+        Args:
+            event: Evento com corpo e assinatura
+            reserialize: Assina o JSON reserializado (como JSON.stringify no backend)
+                em vez dos bytes recebidos
+        """
+        body = encode_payload(json.loads(event.body)) if reserialize else event.body
+        return self.verify(body, event.signature)
+
+
+# Verificadores por chave usados por calculate_signature (e por ("sha256", chave) no TikTok)
+_signers: Dict[Any, SignatureVerifier] = {}
+
+
+def signature_verifier(secret_key: str, sha256: bool = False) -> SignatureVerifier:
+    """Verificador da chave criado uma vez e reaproveitado (HMAC SHA1 da Kiwify ou SHA256 do TikTok)"""
+    key = ("sha256", secret_key) if sha256 else secret_key
+    signer = _signers.get(key)
+    if signer is None:
+        signer = _signers[key] = SignatureVerifier(secret_key, digestmod=hashlib.sha256 if sha256 else hashlib.sha1)
+    return signer
+
+
+def calculate_signature(payload: Union[Dict[str, Any], bytes], secret_key: str) -> str:
+    """
+    Calcula a assinatura HMAC SHA1 do payload
+    
+    Args:
+        payload: Corpo já serializado por encode_payload ou payload JSON
+        secret_key: Chave secreta da Kiwify
+    
+    Returns:
+        Assinatura hexadecimal
+    """
+    body = payload if isinstance(payload, bytes) else encode_payload(payload)
+    signer = signature_verifier(secret_key)
+    with timed_stage("sign"):
+        return signer.sign(body)
+
+
+def sign_url(url: str, signature: str) -> str:
+    """
+    Adiciona a assinatura como query parameter "signature" na URL
+
+    Args:
+        url: URL do endpoint do webhook
+        signature: Assinatura hexadecimal calculada
+    
+    Returns:
+        URL assinada
+    """
+    with timed_stage("url"):
+        parsed_url = urlparse(url)
+        query_params = parse_qs(parsed_url.query)
+        query_params['signature'] = signature
+        new_query = urlencode(query_params, doseq=True)
+        return urlunparse((
+            parsed_url.scheme,
+            parsed_url.netloc,
+            parsed_url.path,
+            parsed_url.params,
+            new_query,
+            parsed_url.fragment
+        ))
+
+
+@dataclass
+class PreparedEvent:
+    """Evento pronto para envio: corpo já serializado e assinatura já calculada"""
+    event_type: str
+    body: bytes
+    signature: str
+    subscription_id: str = ""  # Chave de agrupamento: assinatura (Kiwify) ou usuário (venda e TikTok)
+    at: Optional[float] = None  # Instante simulado do evento, em segundos desde o início do cenário
+    tag: str = ""  # Grupo de injeção de falhas ("duplicate:12", "reorder:3"...), vazio se não injetado
+    copies: int = 1  # Cópias idênticas disparadas simultaneamente
+    provider: str = "kiwify"  # Chave em PROVIDERS (endpoint e forma de autenticação)
+
+
+def prepare_event(payload: Dict[str, Any], secret_key: str, at: Optional[float] = None) -> PreparedEvent:
+    """
+    Serializa e assina um payload
+    
+    Args:
+        payload: Payload JSON
+        secret_key: Chave secreta da Kiwify
+        at: Instante simulado do evento em segundos (opcional)
+    """
+    body = encode_payload(payload)
+    return PreparedEvent(
+        event_type=payload.get("webhook_event_type", ""),
+        body=body,
+        signature=calculate_signature(body, secret_key),
+        subscription_id=payload.get("subscription_id") or "",
+        at=at,
+    )
+
+
+def endpoint_url(url: str, endpoint: str) -> str:
+    """
+    URL de outro webhook do backend a partir da URL do kiwifyWebhook
+    
+    As Cloud Functions ficam lado a lado (https://<região>-<projeto>.cloudfunctions.net/<nome>),
+    então basta trocar o último segmento do caminho pelo nome da função.
+    """
+    parsed_url = urlparse(url)
+    base, _, _ = parsed_url.path.rstrip("/").rpartition("/")
+    return urlunparse(parsed_url._replace(path=f"{base}/{endpoint}"))
+
+
+def js_number(value: float) -> Union[int, float]:
+    """
+    Valor monetário com 2 casas serializado como no JSON.stringify
+    
+    Valores inteiros viram int para que o json.dumps produza "10" e não "10.0":
+    backends que reserializam o corpo antes de validar o HMAC (tiktokWebhook)
+    chegariam a outra string.
+    """
+    value = round(value, 2)
+    return int(value) if value == int(value) else value
+
+
+def inflate_payload(payload: Dict[str, Any], target_bytes: int) -> Dict[str, Any]:
+    """
+    Aumenta o payload repetindo cobranças em Subscription.charges até atingir `target_bytes`
+    
+    Simula assinaturas com longo histórico de cobranças, o maior campo variável do webhook.
+    """
+    size = len(encode_payload(payload))
+    charges = ((payload.get("Subscription") or {}).get("charges") or {}).get("completed") or []
+    if size >= target_bytes or not charges:
+        return payload
+    
+    charge_size = len(encode_payload(charges[0])) + 1
+    repeats = math.ceil((target_bytes - size) / charge_size)
+    subscription = dict(payload["Subscription"])
+    subscription["charges"] = dict(subscription["charges"], completed=charges + [dict(charges[0])] * repeats)
+    return dict(payload, Subscription=subscription)
+
+
+# Trecho repetido nos nomes longos: acentos, emoji (fora do BMP), CJK e U+2028, que o
+# JSON.stringify do backend precisa reproduzir byte a byte para a assinatura bater
+NON_ASCII_NAME = "José Conceição Müller Ñandú 山田太郎 🚀 “Açaí” \u2028 "
+
+# Chaves de TrackingParameters enviadas pela Kiwify
+TRACKING_KEYS = ("src", "sck", "utm_source", "utm_medium", "utm_campaign", "utm_content", "utm_term")
+
+
+def _repeat_text(text: str, length: int) -> str:
+    return (text * math.ceil(length / len(text)))[:length]
+
+
+def scale_payload(
+    payload: Dict[str, Any],
+    charges: int = 1,
+    tracking: int = 0,
+    name_length: int = 0,
+    rng: Optional[random.Random] = None,
+) -> Dict[str, Any]:
+    """
+    Aumenta o payload nas dimensões que crescem em produção
+    
+    Diferente de inflate_payload, as cobranças são distintas (ids, datas e cartões
+    próprios) e os textos misturam caracteres fora do ASCII, que pesam no
+    JSON.stringify(req.body) refeito pelo validateKiwifyWebhook.
+    
+    Args:
+        payload: Payload de referência (não é alterado)
+        charges: Cobranças passadas em Subscription.charges.completed
+        tracking: Total aproximado de caracteres nos valores de TrackingParameters
+        name_length: Caracteres de Customer.full_name e Product.product_name (0 mantém os originais)
+        rng: Gerador aleatório dos ids e cartões (opcional)
+    """
+    rng = rng or random.Random(0)
+    payload = dict(payload)
+    
+    subscription = payload.get("Subscription")
+    if subscription is not None:
+        amount = (payload.get("Commissions") or {}).get("charge_amount") or 4700
+        start = datetime.now()
+        completed = []
+        for index in range(charges):
+            card_type = rng.choice(("mastercard", "visa", "elo", "amex"))
+            completed.append({
+                "order_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "amount": amount,
+                "status": "paid",
+                "installments": rng.choice((1, 1, 1, 3, 12)),
+                "card_type": card_type,
+                "card_last_digits": f"{rng.randrange(10000):04d}",
+                "card_first_digits": f"{rng.randrange(100000, 1000000)}",
+                "created_at": (start - timedelta(days=30 * index)).isoformat() + "Z",
+            })
+        subscription = dict(subscription)
+        subscription["charges"] = dict(subscription.get("charges") or {}, completed=completed)
+        payload["Subscription"] = subscription
+    
+    if tracking > 0:
+        per_key = max(1, tracking // len(TRACKING_KEYS))
+        payload["TrackingParameters"] = {
+            key: _repeat_text(f"{key}-campanha-promoção-{rng.randrange(1000)}-", per_key) for key in TRACKING_KEYS
+        }
+    
+    if name_length > 0:
+        full_name = _repeat_text(NON_ASCII_NAME, name_length)
+        payload["Customer"] = dict(payload.get("Customer") or {}, full_name=full_name,
+                                   first_name=full_name.split(" ")[0])
+        payload["Product"] = dict(payload.get("Product") or {},
+                                  product_name=_repeat_text("Plano " + NON_ASCII_NAME, name_length))
+    return payload
@@ -0,0 +1,189 @@
+"""
+Tempo por etapa do caminho quente e perfis de CPU do simulador
+"""
+
+import sys
+import time
+import os
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from .payloads import HOT_PATH_STAGES, add_stage_hook, remove_stage_hook
+
+
+class StageTimings:
+    """
+    Totais por etapa do caminho quente (montagem, json.dumps, HMAC, URL, rede)
+    
+    Registra-se como hook de timed_stage/record_stage entre start() e stop() e mede
+    também o tempo de CPU do processo. As etapas locais são CPU pura: se elas (ou o
+    processo inteiro) ocupam perto de um núcleo, o limite é o próprio simulador e
+    mais processos (replay --processes, coordinator) aumentam a vazão; se não, a
+    vazão é limitada pela rede ou pelo backend.
+    """
+    
+    LOCAL_STAGES = ("build", "encode", "sign", "url")
+    # Fração de um núcleo a partir da qual o cliente é considerado saturado (GIL)
+    SATURATION = 0.7
+    
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._lock = threading.Lock()
+        self._started: Optional[Tuple[float, float]] = None
+    
+    def __call__(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+    
+    def start(self) -> None:
+        self._started = (time.perf_counter(), time.process_time())
+        add_stage_hook(self)
+    
+    def stop(self) -> None:
+        remove_stage_hook(self)
+        if self._started is not None:
+            self.wall += time.perf_counter() - self._started[0]
+            self.cpu += time.process_time() - self._started[1]
+            self._started = None
+    
+    def local_seconds(self) -> float:
+        return sum(self.totals.get(stage, 0.0) for stage in self.LOCAL_STAGES)
+    
+    def client_bound(self) -> bool:
+        """True se o simulador usou CPU suficiente para ser o gargalo da execução"""
+        if not self.wall:
+            return False
+        return max(self.cpu, self.local_seconds()) / self.wall >= self.SATURATION
+    
+    def to_dict(self) -> Dict[str, Any]:
+        stages = {}
+        for stage in HOT_PATH_STAGES:
+            count = self.counts.get(stage, 0)
+            if count:
+                total = self.totals[stage]
+                stages[stage] = {
+                    "count": count,
+                    "total_s": round(total, 4),
+                    "mean_us": round(total / count * 1e6, 1),
+                }
+        return {
+            "stages": stages,
+            "wall_s": round(self.wall, 3),
+            "cpu_s": round(self.cpu, 3),
+            "cpu_utilization": round(self.cpu / self.wall, 3) if self.wall else None,
+            "local_s": round(self.local_seconds(), 4),
+            "client_bound": self.client_bound(),
+        }
+    
+    def print_report(self) -> None:
+        """Exibe os totais por etapa e o diagnóstico cliente x backend"""
+        print("\n⏱️  Tempo por etapa do caminho quente")
+        local = self.local_seconds()
+        for stage in HOT_PATH_STAGES:
+            count = self.counts.get(stage, 0)
+            if not count:
+                continue
+            total = self.totals[stage]
+            share = f"{total / local:>6.1%} do local" if stage != "network" and local else ""
+            print(f"   {stage:<8}{count:>9} x {total / count * 1e6:>10.1f} µs = {total:>9.3f} s  {share}")
+        if not self.wall:
+            return
+        print(f"   CPU do processo: {self.cpu:.2f} s em {self.wall:.2f} s ({self.cpu / self.wall:.0%} de um núcleo) | "
+              f"etapas locais: {local / self.wall:.0%} do tempo")
+        if self.client_bound():
+            print("   ❗ O simulador está no limite de CPU: use mais processos (replay --processes, coordinator/agent)")
+        else:
+            print("   ✅ O simulador tem folga de CPU: a vazão é limitada pela rede ou pelo backend")
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem de todas as threads do processo
+    
+    Uma thread lê sys._current_frames() a cada `interval` segundos e conta as
+    pilhas vistas. write() grava as pilhas no formato "collapsed" (uma linha
+    "thread;função (arquivo:linha);... contagem"), aceito por flamegraph.pl,
+    speedscope e inferno para gerar flamegraphs.
+    """
+    
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                parts.append(names.get(ident, str(ident)))
+                stack = ";".join(reversed(parts))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+    
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class CpuProfile:
+    """
+    Captura de CPU da execução para gerar flamegraphs
+    
+    sampling (padrão) amostra todas as threads, inclusive as do cliente HTTP, e
+    grava pilhas "collapsed". cprofile usa o cProfile da biblioteca padrão no
+    thread do event loop e grava um arquivo pstats (snakeviz, flameprof ou
+    python -m pstats); requisições enviadas por threads do cliente síncrono ficam
+    de fora.
+    """
+    
+    def __init__(self, path: str, kind: str = "sampling", interval: float = 0.005):
+        self.path = path
+        self.kind = kind
+        self._profiler: Any = SamplingProfiler(interval) if kind == "sampling" else None
+    
+    def start(self) -> None:
+        if self.kind == "cprofile":
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler.start()
+    
+    def stop(self) -> None:
+        """Encerra a captura e grava o arquivo"""
+        if self.kind == "cprofile":
+            self._profiler.disable()
+            self._profiler.dump_stats(self.path)
+        else:
+            self._profiler.stop()
+            self._profiler.write(self.path)
+    
+    def describe(self) -> str:
+        if self.kind == "cprofile":
+            return f"pstats (cProfile) em: {self.path} (ex: snakeviz {self.path})"
+        return (f"{self._profiler.samples} amostras em pilhas collapsed em: {self.path} "
+                f"(ex: flamegraph.pl {self.path} > flame.svg)")
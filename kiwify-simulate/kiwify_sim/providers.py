@@ -0,0 +1,288 @@
+"""
+Provedores de webhook (Kiwify, TikTok e vendas de afiliados) e a mistura entre eles
+"""
+
+import time
+import random
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Iterable
+from abc import ABC, abstractmethod
+
+from .payloads import timed_stage, encode_payload, signature_verifier, sign_url, PreparedEvent, endpoint_url, js_number
+from .scenarios import DEFAULT_EVENT_MIX, parse_event_mix, generate_load_events
+
+
+class WebhookProvider(ABC):
+    """
+    Provedor de webhooks atendido pelo backend
+    
+    Cada provedor define a função que recebe os eventos, como gerar payloads
+    realistas e como a requisição é autenticada (assinatura na URL, em header
+    ou identificação do usuário). Novos provedores entram em PROVIDERS.
+    """
+    
+    name = ""
+    endpoint = ""
+    
+    def __init__(self):
+        self._targets: Dict[str, str] = {}
+    
+    def target(self, url: str) -> str:
+        """URL do endpoint deste provedor a partir da URL do kiwifyWebhook informada na CLI"""
+        target = self._targets.get(url)
+        if target is None:
+            target = self._targets[url] = endpoint_url(url, self.endpoint)
+        return target
+    
+    @abstractmethod
+    def delivery(self, url: str, event: PreparedEvent) -> Tuple[str, Optional[Dict[str, str]]]:
+        """
+        Como enviar um evento deste provedor
+        
+        Args:
+            url: URL do kiwifyWebhook informada na CLI
+            event: Evento deste provedor
+        
+        Returns:
+            (URL de destino, headers adicionais ou None)
+        """
+    
+    @abstractmethod
+    def events(self, secret_key: Optional[str], users: int, seed: Optional[int] = None) -> Iterator[PreparedEvent]:
+        """Gera indefinidamente eventos deste provedor para `users` usuários simulados"""
+
+
+class KiwifyProvider(WebhookProvider):
+    """kiwifyWebhook: HMAC SHA1 do corpo no query parameter "signature" (eventos dos cenários random e lifecycle)"""
+    
+    name = "kiwify"
+    endpoint = "kiwifyWebhook"
+    
+    def target(self, url: str) -> str:
+        # A URL da CLI é a do kiwifyWebhook (mantida como está, inclusive em receptores locais)
+        return url
+    
+    def delivery(self, url: str, event: PreparedEvent) -> Tuple[str, Optional[Dict[str, str]]]:
+        return sign_url(url, event.signature), None
+    
+    def events(self, secret_key: Optional[str], users: int, seed: Optional[int] = None) -> Iterator[PreparedEvent]:
+        # Os clientes da Kiwify são identificados por email, não pelos usuários simulados
+        return generate_load_events(parse_event_mix(DEFAULT_EVENT_MIX), secret_key, seed=seed)
+
+
+# Usuários simulados de saleWebhook e tiktokWebhook (o índice vira o shop_id do TikTok)
+def loadtest_user_id(index: int) -> str:
+    return f"loadtest-user-{index:05d}"
+
+
+# Produtos de afiliado usados nos payloads de venda: (nome, preço em reais, comissão em %)
+AFFILIATE_PRODUCTS = [
+    ("Fone Bluetooth TWS Pro", 89.90, 12.0),
+    ("Kit Skincare Vitamina C", 129.90, 15.0),
+    ("Garrafa Térmica 1L", 59.90, 10.0),
+    ("Smartwatch Fitness", 199.90, 8.0),
+    ("Organizador de Maquiagem", 39.90, 18.0),
+]
+
+
+class TikTokProvider(WebhookProvider):
+    """
+    tiktokWebhook: HMAC SHA256 hexadecimal do JSON no header x-tiktok-signature
+    
+    O backend só valida a assinatura se TIKTOK_WEBHOOK_SECRET estiver definido,
+    e sempre sobre o JSON.stringify do corpo recebido. Sem chave os eventos vão
+    sem o header.
+    """
+    
+    name = "tiktok"
+    endpoint = "tiktokWebhook"
+    # Status do pedido e pesos (convertTikTokPayloadToSaleData procura "pending",
+    # "processing", "refund" e "cancel" no texto)
+    ORDER_STATUSES = (("completed", 75), ("pending", 10), ("processing", 5), ("cancelled", 6), ("refunded", 4))
+    
+    def delivery(self, url: str, event: PreparedEvent) -> Tuple[str, Optional[Dict[str, str]]]:
+        return self.target(url), ({"x-tiktok-signature": event.signature} if event.signature else None)
+    
+    def build_payload(
+        self,
+        user_index: int,
+        order_id: str,
+        status: str,
+        product: Tuple[str, float, float],
+        quantity: int = 1,
+    ) -> Dict[str, Any]:
+        """Payload de order.status.update como o tiktokWebhook espera (comissão no nível raiz)"""
+        name, price, commission_rate = product
+        amount = price * quantity
+        return {
+            "event_type": "order.status.update",
+            "shop_id": f"shop-{user_index:05d}",
+            "timestamp": int(time.time()),
+            "commission": js_number(amount * commission_rate / 100),
+            "data": {
+                "order_id": order_id,
+                "order_status": status,
+                "order_amount": {"amount": f"{amount:.2f}", "currency": "BRL"},
+                "items": [{
+                    "product_name": name,
+                    "quantity": quantity,
+                    "price": {"amount": f"{price:.2f}", "currency": "BRL"},
+                }],
+                "userId": loadtest_user_id(user_index),
+            },
+        }
+    
+    def prepare(self, payload: Dict[str, Any], secret_key: Optional[str]) -> PreparedEvent:
+        body = encode_payload(payload)
+        signature = ""
+        if secret_key:
+            signer = signature_verifier(secret_key, sha256=True)
+            with timed_stage("sign"):
+                signature = signer.sign(body)
+        return PreparedEvent(
+            event_type=f"tiktok:{payload['data']['order_status']}",
+            body=body,
+            signature=signature,
+            subscription_id=payload["data"]["userId"],
+            provider=self.name,
+        )
+    
+    def events(self, secret_key: Optional[str], users: int, seed: Optional[int] = None) -> Iterator[PreparedEvent]:
+        rng = random.Random(seed)
+        statuses = [status for status, _ in self.ORDER_STATUSES]
+        weights = [weight for _, weight in self.ORDER_STATUSES]
+        while True:
+            with timed_stage("build"):
+                payload = self.build_payload(
+                    rng.randrange(users),
+                    str(rng.randrange(10 ** 17, 10 ** 18)),
+                    rng.choices(statuses, weights)[0],
+                    rng.choice(AFFILIATE_PRODUCTS),
+                    quantity=rng.choice((1, 1, 1, 2, 3)),
+                )
+            yield self.prepare(payload, secret_key)
+
+
+class SaleProvider(WebhookProvider):
+    """
+    saleWebhook: venda genérica sem assinatura, com o usuário no header x-user-id
+    
+    Cada venda passa pela transação de comissão acumulada do usuário e enfileira
+    uma notificação no Cloud Tasks (enqueueSaleNotification ou
+    enqueueAccumulatedCommissionNotification).
+    """
+    
+    name = "sale"
+    endpoint = "saleWebhook"
+    STATUSES = (("completed", 85), ("pending", 10), ("refunded", 5))
+    
+    def delivery(self, url: str, event: PreparedEvent) -> Tuple[str, Optional[Dict[str, str]]]:
+        return self.target(url), {"x-user-id": event.subscription_id}
+    
+    def build_payload(self, order_id: str, status: str, product: Tuple[str, float, float]) -> Dict[str, Any]:
+        """Payload do saleWebhook (orderId obrigatório; userId vai no header)"""
+        name, price, commission_rate = product
+        return {
+            "orderId": order_id,
+            "productName": name,
+            "amount": js_number(price),
+            "currency": "BRL",
+            "status": status,
+            "commission": js_number(price * commission_rate / 100),
+        }
+    
+    def prepare(self, payload: Dict[str, Any], user_id: str) -> PreparedEvent:
+        return PreparedEvent(
+            event_type=f"sale:{payload['status']}",
+            body=encode_payload(payload),
+            signature="",
+            subscription_id=user_id,
+            provider=self.name,
+        )
+    
+    def events(self, secret_key: Optional[str], users: int, seed: Optional[int] = None) -> Iterator[PreparedEvent]:
+        rng = random.Random(seed)
+        statuses = [status for status, _ in self.STATUSES]
+        weights = [weight for _, weight in self.STATUSES]
+        while True:
+            with timed_stage("build"):
+                payload = self.build_payload(
+                    f"SALE-{rng.getrandbits(40):010X}",
+                    rng.choices(statuses, weights)[0],
+                    rng.choice(AFFILIATE_PRODUCTS),
+                )
+            yield self.prepare(payload, loadtest_user_id(rng.randrange(users)))
+
+
+PROVIDERS: Dict[str, WebhookProvider] = {
+    provider.name: provider for provider in (KiwifyProvider(), TikTokProvider(), SaleProvider())
+}
+
+DEFAULT_PROVIDER_MIX = "kiwify"
+
+
+def parse_provider_mix(spec: str) -> List[Tuple[str, float]]:
+    """
+    Interpreta a mistura de provedores no formato "kiwify=70,tiktok=20,sale=10"
+    
+    Returns:
+        Lista de (nome do provedor, peso)
+    """
+    mix = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in PROVIDERS:
+            raise ValueError(f"Provedor desconhecido na mistura: {name} (disponíveis: {', '.join(PROVIDERS)})")
+        value = float(weight) if weight else 1.0
+        if value < 0:
+            raise ValueError(f"Peso negativo na mistura: {item}")
+        mix.append((name, value))
+    
+    if not mix or sum(weight for _, weight in mix) <= 0:
+        raise ValueError("Mistura de provedores vazia")
+    return mix
+
+
+def mix_provider_events(
+    kiwify_events: Iterable[PreparedEvent],
+    mix: List[Tuple[str, float]],
+    secret_keys: Dict[str, Optional[str]],
+    users: int = 100,
+    seed: Optional[int] = None,
+) -> Iterator[PreparedEvent]:
+    """
+    Intercala os eventos da Kiwify com os dos demais provedores segundo os pesos
+    
+    Termina quando os eventos da Kiwify acabam (se a Kiwify estiver na mistura).
+    Os eventos dos outros provedores herdam o instante simulado ("at") do último
+    evento da Kiwify, mantendo a ordem no --timing original.
+    
+    Args:
+        kiwify_events: Eventos do cenário da Kiwify
+        mix: Lista de (provedor, peso)
+        secret_keys: Chave de assinatura por provedor (None para não assinar)
+        users: Usuários simulados nos provedores de venda
+        seed: Semente do gerador aleatório (opcional)
+    """
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    sources: Dict[str, Iterator[PreparedEvent]] = {
+        name: iter(kiwify_events) if name == "kiwify"
+        else PROVIDERS[name].events(secret_keys.get(name), users, seed=rng.getrandbits(32))
+        for name in names
+    }
+    last_at: Optional[float] = None
+    while True:
+        name = rng.choices(names, weights)[0]
+        event = next(sources[name], None)
+        if event is None:
+            return
+        if name == "kiwify":
+            last_at = event.at
+        elif last_at is not None:
+            event.at = last_at
+        yield event
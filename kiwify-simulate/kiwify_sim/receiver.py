@@ -0,0 +1,798 @@
+"""
+Receptor local que reproduz o kiwifyWebhook, o tiktokWebhook e o saleWebhook do backend
+"""
+
+import json
+import time
+import random
+import asyncio
+import hashlib
+import zlib
+from typing import Dict, Any, Optional, List, Tuple
+from urllib.parse import parse_qs
+
+from .payloads import EventType, PLAN_MAPPING, encode_payload, SignatureVerifier
+from .providers import loadtest_user_id, TikTokProvider, SaleProvider
+
+
+class WebhookError(Exception):
+    """Erro do receptor local, com o nome e o status HTTP usados em utils/errors.ts do backend"""
+    name = "InternalServerError"
+    status_code = 500
+
+
+class WebhookValidationError(WebhookError):
+    name = "ValidationError"
+    status_code = 400
+
+
+class WebhookUnauthorizedError(WebhookError):
+    name = "UnauthorizedError"
+    status_code = 401
+
+
+class WebhookNotFoundError(WebhookError):
+    name = "NotFoundError"
+    status_code = 404
+
+
+# Caracteres do access_token (generateAccessToken em signature.service.ts)
+ACCESS_TOKEN_CHARS = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+
+class InMemorySignatureStore:
+    """
+    Substituto em memória do Firestore, do Auth, do envio de emails e do Cloud Tasks usados pelos webhooks
+    
+    Cada operação aguarda uma ida e volta simulada antes de acessar os dados, de
+    modo que a corrida entre findSignatureByEmail e createSignature acontece como
+    no backend real. Outro armazenamento pode ser usado implementando os mesmos
+    métodos assíncronos.
+    """
+    
+    # Fração dos usuários simulados com notificação por comissão acumulada, e o limite usado
+    ACCUMULATED_COMMISSION_SHARE = 0.25
+    ACCUMULATED_COMMISSION_THRESHOLD = 100.0
+    
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: Optional[int] = None,
+        task_latency: Optional[float] = None,
+    ):
+        """
+        Args:
+            latency: Latência de cada operação em segundos
+            jitter: Variação aleatória da latência, como fração dela (0 a 1)
+            seed: Semente do gerador de latências e access_tokens
+            task_latency: Latência de cada tarefa enfileirada no Cloud Tasks em segundos
+                (default: a mesma das demais operações)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.task_latency = latency if task_latency is None else task_latency
+        self.rng = random.Random(seed)
+        self.signatures: Dict[str, Dict[str, Any]] = {}
+        self.access_tokens: set = set()
+        self.operations = 0
+        self.overwrites = 0  # Assinaturas gravadas sobre outra já existente (corrida na criação)
+        self.revocations = 0
+        self.activation_emails: Dict[str, int] = {}
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.user_locks: Dict[str, asyncio.Lock] = {}
+        self.sales = 0
+        self.transaction_waits = 0  # Transações que aguardaram outra no mesmo usuário
+        self.shop_lookup_reads = 0  # Documentos lidos por findUserByShopId (varredura de usuários)
+        self.notifications: Dict[str, int] = {}
+    
+    async def _round_trip(self, latency: Optional[float] = None) -> None:
+        self.operations += 1
+        latency = self.latency if latency is None else latency
+        if latency > 0:
+            spread = latency * self.jitter
+            await asyncio.sleep(max(0.0, latency + self.rng.uniform(-spread, spread)))
+    
+    def new_access_token(self) -> str:
+        return "".join(self.rng.choice(ACCESS_TOKEN_CHARS) for _ in range(10))
+    
+    async def find_signature_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        await self._round_trip()
+        return self.signatures.get(email)
+    
+    async def access_token_exists(self, token: str) -> bool:
+        await self._round_trip()
+        return token in self.access_tokens
+    
+    async def set_signature(self, email: str, signature: Dict[str, Any]) -> None:
+        await self._round_trip()
+        if email in self.signatures:
+            self.overwrites += 1
+        self.signatures[email] = signature
+        self.access_tokens.add(signature["access_token"])
+    
+    async def update_signature_status(self, email: str, status: str) -> None:
+        await self._round_trip()
+        signature = self.signatures.get(email)
+        if signature is None:
+            raise WebhookNotFoundError("Assinatura não encontrada")
+        signature["status"] = status
+    
+    async def revoke_user_tokens(self, email: str) -> None:
+        await self._round_trip()
+        self.revocations += 1
+    
+    async def send_activation_email(self, email: str, access_token: str, plan_name: str) -> None:
+        await self._round_trip()
+        self.activation_emails[email] = self.activation_emails.get(email, 0) + 1
+    
+    def _user(self, user_id: str) -> Dict[str, Any]:
+        """
+        Documento do usuário, criado no primeiro acesso
+        
+        Todo userId é tratado como existente; o tipo de notificação é sorteado de
+        forma determinística pelo id (ACCUMULATED_COMMISSION_SHARE dos usuários
+        acumulam comissão até ACCUMULATED_COMMISSION_THRESHOLD).
+        """
+        user = self.users.get(user_id)
+        if user is None:
+            accumulated = (zlib.crc32(user_id.encode("utf-8")) % 1000) < self.ACCUMULATED_COMMISSION_SHARE * 1000
+            user = self.users[user_id] = {
+                "accumulatedCommission": 0.0,
+                "notificationSettings": {
+                    "type": "accumulated_commission" if accumulated else "sale",
+                    "accumulatedCommissionThreshold": self.ACCUMULATED_COMMISSION_THRESHOLD,
+                },
+            }
+        return user
+    
+    async def find_user_by_shop_id(self, shop_id: str) -> Optional[str]:
+        """Equivalente a findUserByShopId: varre os usuários com perfil do TikTok conectado"""
+        await self._round_trip()
+        self.shop_lookup_reads += max(1, len(self.users))
+        prefix, _, index = shop_id.partition("-")
+        if prefix == "shop" and index.isdigit():
+            return loadtest_user_id(int(index))
+        return None
+    
+    async def process_sale(self, user_id: str, sale: Dict[str, Any], commission: float) -> Dict[str, Any]:
+        """
+        Equivalente a processSaleWithAccumulatedCommission
+        
+        A transação no documento do usuário é serializada por um lock por usuário
+        (o Admin SDK bloqueia o documento lido durante a transação), de modo que
+        vendas simultâneas do mesmo usuário disputam o documento como no Firestore.
+        """
+        lock = self.user_locks.get(user_id)
+        if lock is None:
+            lock = self.user_locks[user_id] = asyncio.Lock()
+        if lock.locked():
+            self.transaction_waits += 1
+        async with lock:
+            await self._round_trip()  # transaction.get(userRef)
+            user = self._user(user_id)
+            current = user["accumulatedCommission"]
+            settings = user["notificationSettings"]
+            result: Dict[str, Any] = {"shouldNotify": False, "notificationType": settings["type"]}
+            if settings["type"] == "accumulated_commission":
+                threshold = settings["accumulatedCommissionThreshold"]
+                accumulated = current + commission
+                if threshold > 0 and accumulated >= threshold:
+                    result["shouldNotify"] = True
+                    result["notificationData"] = {"accumulatedAmount": accumulated, "threshold": threshold}
+                    accumulated -= threshold
+            else:
+                accumulated = current
+            await self._round_trip()  # commit: update do usuário + set da venda
+            user["accumulatedCommission"] = accumulated
+            self.sales += 1
+        await self._round_trip()  # saleRef.get()
+        result["newAccumulated"] = accumulated
+        result["sale"] = {**sale, "commission": commission, "notificationSent": result["shouldNotify"]}
+        return result
+    
+    async def enqueue_notification(self, kind: str, user_id: str) -> str:
+        """Equivalente a enqueueNotification (createTask no Cloud Tasks)"""
+        await self._round_trip(self.task_latency)
+        self.notifications[kind] = self.notifications.get(kind, 0) + 1
+        return f"task-{sum(self.notifications.values())}"
+    
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de efeitos colaterais, incluindo os duplicados"""
+        statuses: Dict[str, int] = {}
+        for signature in self.signatures.values():
+            statuses[signature["status"]] = statuses.get(signature["status"], 0) + 1
+        return {
+            "signatures": len(self.signatures),
+            "signature_status": dict(sorted(statuses.items())),
+            "signature_overwrites": self.overwrites,
+            "activation_emails": sum(self.activation_emails.values()),
+            "duplicate_activation_emails": sum(
+                count - 1 for count in self.activation_emails.values() if count > 1
+            ),
+            "token_revocations": self.revocations,
+            "sales": self.sales,
+            "sale_users": len(self.users),
+            "transaction_waits": self.transaction_waits,
+            "shop_lookup_reads": self.shop_lookup_reads,
+            "notifications_enqueued": dict(sorted(self.notifications.items())),
+            "store_operations": self.operations,
+        }
+
+
+def extract_commission(payload: Dict[str, Any]) -> float:
+    """Comissão do webhook nos mesmos campos que extractCommissionFromWebhook (0 se ausente)"""
+    for field in ("commission", "my_commission", "Commissions.my_commission", "Commissions.charge_amount",
+                  "commission_amount"):
+        value: Any = payload
+        for key in field.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0:
+            return float(value)
+    return 0.0
+
+
+def sale_status(status: str) -> str:
+    """Status da venda a partir do status do pedido do TikTok (convertTikTokPayloadToSaleData)"""
+    if "pending" in status or "processing" in status:
+        return "pending"
+    if "refund" in status or "cancel" in status:
+        return "refunded"
+    return "completed"
+
+
+def infer_plan_id(payload: Dict[str, Any]) -> Optional[str]:
+    """Determina o plano pelo product_id ou pelo nome do produto, como handleOrderApproved"""
+    product = payload.get("Product") or {}
+    product_id = product.get("product_id")
+    for plan_id, plan in PLAN_MAPPING.items():
+        if product_id and plan["product_id"] == product_id:
+            return plan_id
+    
+    name = (product.get("product_name") or "").lower()
+    if "iniciante" in name or "starter" in name:
+        return "STARTER"
+    if "escalando" in name or "scaling" in name:
+        return "SCALING"
+    if "escalado" in name or "scaled" in name:
+        return "SCALED"
+    return None
+
+
+class InstancePool:
+    """
+    Instâncias simuladas do Cloud Functions para o receptor local
+    
+    Cada instância atende uma requisição por vez, como na 1ª geração. Uma requisição
+    que não encontra instância ociosa sobe outra e paga o cold start; instâncias
+    ociosas há mais de `idle_timeout` segundos são recolhidas.
+    """
+    
+    def __init__(self, cold_start: float, idle_timeout: float, jitter: float = 0.0,
+                 rng: Optional[random.Random] = None):
+        """
+        Args:
+            cold_start: Tempo de inicialização de uma instância nova em segundos
+            idle_timeout: Ociosidade em segundos a partir da qual a instância é recolhida
+            jitter: Variação aleatória do cold start, como fração dele (0 a 1)
+            rng: Gerador aleatório do jitter (opcional)
+        """
+        self.cold_start = cold_start
+        self.idle_timeout = idle_timeout
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.idle: List[float] = []  # Instante em que cada instância ociosa foi liberada
+        self.busy = 0
+        self.cold_starts = 0
+        self.reclaimed = 0
+        self.peak = 0
+    
+    async def acquire(self) -> bool:
+        """Reserva uma instância e retorna True se foi preciso subir uma nova (cold start)"""
+        now = time.monotonic()
+        alive = [released for released in self.idle if now - released <= self.idle_timeout]
+        self.reclaimed += len(self.idle) - len(alive)
+        self.idle = alive
+        self.busy += 1
+        self.peak = max(self.peak, self.busy + len(self.idle))
+        if self.idle:
+            self.idle.pop()
+            return False
+        self.cold_starts += 1
+        spread = self.cold_start * self.jitter
+        await asyncio.sleep(max(0.0, self.cold_start + self.rng.uniform(-spread, spread)))
+        return True
+    
+    def release(self) -> None:
+        self.busy -= 1
+        self.idle.append(time.monotonic())
+    
+    def stats(self) -> Dict[str, int]:
+        return {"cold_starts": self.cold_starts, "reclaimed": self.reclaimed, "peak_instances": self.peak}
+
+
+class KiwifyReceiver:
+    """
+    Réplica local do kiwifyWebhook para benchmarks sem rede
+    
+    Valida a assinatura HMAC SHA1 do JSON reserializado (como validateKiwifyWebhook)
+    e despacha pelo webhook_event_type para handlers equivalentes aos do backend,
+    usando um InMemorySignatureStore no lugar do Firestore. Caminhos terminados
+    em /tiktokWebhook e /saleWebhook seguem os handlers desses webhooks (transação
+    de comissão acumulada e notificação enfileirada).
+    """
+    
+    def __init__(
+        self,
+        secret_key: str,
+        store: Optional[InMemorySignatureStore] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: Optional[int] = None,
+        tiktok_secret: Optional[str] = None,
+        instances: Optional[InstancePool] = None,
+    ):
+        """
+        Args:
+            secret_key: Chave secreta da Kiwify
+            store: Armazenamento dos dados (default: InMemorySignatureStore sem latência)
+            latency: Latência artificial de cada requisição em segundos
+            jitter: Variação aleatória da latência, como fração dela (0 a 1)
+            seed: Semente do gerador de latências
+            tiktok_secret: TIKTOK_WEBHOOK_SECRET (sem ela a assinatura do TikTok não é validada)
+            instances: Instâncias simuladas com cold start (default: sempre quentes)
+        """
+        self.verifier = SignatureVerifier(secret_key)
+        self.tiktok_verifier = SignatureVerifier(tiktok_secret, digestmod=hashlib.sha256) if tiktok_secret else None
+        self.unsigned_tiktok = 0
+        self.store = store if store is not None else InMemorySignatureStore()
+        self.instances = instances
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.status_counts: Dict[int, int] = {}
+        self.events: Dict[str, int] = {}
+        self.handlers = {
+            EventType.ORDER_APPROVED.value: self.handle_order_approved,
+            EventType.SUBSCRIPTION_RENEWED.value: self.handle_subscription_renewed,
+            EventType.SUBSCRIPTION_CANCELED.value: self.handle_subscription_canceled,
+            EventType.CHARGEBACK.value: self.handle_chargeback,
+        }
+    
+    def validate_signature(self, payload: Dict[str, Any], signature: str) -> None:
+        """
+        Valida a assinatura como validateKiwifyWebhook
+        
+        Raises:
+            WebhookUnauthorizedError: Se a assinatura estiver ausente ou não conferir
+        """
+        if not signature:
+            raise WebhookUnauthorizedError("Assinatura do webhook não fornecida")
+        if not self.verifier.verify(encode_payload(payload), signature):
+            raise WebhookUnauthorizedError("Assinatura do webhook inválida")
+    
+    @staticmethod
+    def _customer_email(payload: Dict[str, Any]) -> str:
+        email = (payload.get("Customer") or {}).get("email")
+        if not email:
+            raise WebhookValidationError("Email do cliente não encontrado no payload")
+        return email.lower().strip()
+    
+    async def handle_order_approved(self, payload: Dict[str, Any]) -> None:
+        email = self._customer_email(payload)
+        
+        existing = await self.store.find_signature_by_email(email)
+        if existing:
+            await self.store.update_signature_status(email, "active")
+            return
+        
+        plan_id = infer_plan_id(payload)
+        if not plan_id:
+            raise WebhookValidationError("Não foi possível determinar o plano do produto")
+        plan_name = PLAN_MAPPING[plan_id]["name"]
+        
+        # createSignature verifica de novo antes de gerar o token e gravar
+        if await self.store.find_signature_by_email(email):
+            raise WebhookValidationError("Já existe uma assinatura para este email")
+        access_token = self.store.new_access_token()
+        while await self.store.access_token_exists(access_token):
+            access_token = self.store.new_access_token()
+        await self.store.set_signature(email, {
+            "email": email,
+            "status": "active",
+            "plan": {"id": plan_id, "name": plan_name},
+            "access_token": access_token,
+            "kiwify_order_id": payload.get("order_id"),
+            "kiwify_customer_id": payload.get("subscription_id") or (payload.get("Subscription") or {}).get("id"),
+        })
+        
+        await self.store.send_activation_email(email, access_token, plan_name)
+    
+    async def handle_subscription_renewed(self, payload: Dict[str, Any]) -> None:
+        await self.store.update_signature_status(self._customer_email(payload), "active")
+    
+    async def handle_subscription_canceled(self, payload: Dict[str, Any]) -> None:
+        email = self._customer_email(payload)
+        await self.store.update_signature_status(email, "cancelled")
+        await self.store.revoke_user_tokens(email)
+    
+    async def handle_chargeback(self, payload: Dict[str, Any]) -> None:
+        email = self._customer_email(payload)
+        await self.store.update_signature_status(email, "refunded")
+        await self.store.revoke_user_tokens(email)
+    
+    async def _process_sale(self, user_id: str, sale: Dict[str, Any], commission: float) -> Dict[str, Any]:
+        """Transação de comissão acumulada e notificação enfileirada, comum a saleWebhook e tiktokWebhook"""
+        result = await self.store.process_sale(user_id, sale, commission)
+        # Falhas ao enfileirar são apenas logadas pelo backend; aqui o enfileiramento não falha
+        if result["shouldNotify"] and result.get("notificationData"):
+            await self.store.enqueue_notification("accumulated_commission", user_id)
+        elif result["notificationType"] == "sale":
+            await self.store.enqueue_notification("sale", user_id)
+        return {
+            "saleId": f"sale-{self.store.sales}",
+            "shouldNotify": result["shouldNotify"],
+            "newAccumulated": result["newAccumulated"],
+        }
+    
+    async def handle_sale(self, payload: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        """Equivalente ao saleWebhook: userId no payload ou no header x-user-id"""
+        if not payload.get("orderId"):
+            raise WebhookValidationError("orderId é obrigatório no payload")
+        user_id = payload.get("userId") if isinstance(payload.get("userId"), str) else None
+        user_id = user_id or headers.get("x-user-id")
+        if not user_id:
+            raise WebhookValidationError(
+                "ID do usuário não encontrado no payload ou headers. Forneça 'userId' no payload ou "
+                "'x-user-id' no header."
+            )
+        status = payload.get("status")
+        sale = {
+            "userId": user_id,
+            "orderId": payload["orderId"],
+            "productName": payload.get("productName") or "Produto não especificado",
+            "amount": payload.get("amount") or 0,
+            "currency": payload.get("currency") or "BRL",
+            "status": status if status in ("pending", "refunded") else "completed",
+        }
+        self._count_event(f"sale:{sale['status']}")
+        return {
+            "success": True,
+            "message": "Venda processada com sucesso",
+            "data": await self._process_sale(user_id, sale, extract_commission(payload)),
+        }
+    
+    async def handle_tiktok(self, payload: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        """Equivalente ao tiktokWebhook: assinatura SHA256 opcional e usuário pelo shop_id"""
+        if self.tiktok_verifier is not None:
+            signature = headers.get("x-tiktok-signature")
+            if not signature:
+                self.unsigned_tiktok += 1  # O backend apenas loga um aviso
+            elif not self.tiktok_verifier.verify(encode_payload(payload), signature):
+                raise WebhookUnauthorizedError("Assinatura inválida")
+        
+        data = payload.get("data") if isinstance(payload.get("data"), dict) else {}
+        user_id = await self.store.find_user_by_shop_id(payload["shop_id"]) if payload.get("shop_id") else None
+        user_id = user_id or data.get("userId")
+        if not user_id:
+            raise WebhookValidationError(
+                "ID do usuário não encontrado no payload. shopId não corresponde a nenhum perfil conectado."
+            )
+        order_amount = data.get("order_amount") or {}
+        items = data.get("items") or []
+        status = sale_status(data.get("order_status") or payload.get("event_type") or "")
+        sale = {
+            "userId": user_id,
+            "orderId": str(data.get("order_id") or payload.get("order_id") or "unknown"),
+            "productName": (items[0].get("product_name") if items else None) or "Produto não especificado",
+            "amount": float(order_amount.get("amount") or 0),
+            "currency": order_amount.get("currency") or data.get("currency") or "BRL",
+            "status": status,
+        }
+        self._count_event(f"tiktok:{data.get('order_status') or payload.get('event_type') or ''}")
+        return {
+            "success": True,
+            "message": "Webhook processado com sucesso",
+            "data": await self._process_sale(user_id, sale, extract_commission(payload)),
+        }
+    
+    def _count_event(self, event_type: str) -> None:
+        self.events[event_type] = self.events.get(event_type, 0) + 1
+    
+    async def handle(
+        self,
+        method: str,
+        query: str,
+        body: bytes,
+        path: str = "/kiwifyWebhook",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Processa uma requisição do webhook
+        
+        Args:
+            method: Método HTTP
+            query: Query string da URL (contém a assinatura da Kiwify)
+            body: Corpo da requisição
+            path: Caminho da URL (escolhe entre kiwifyWebhook, tiktokWebhook e saleWebhook)
+            headers: Headers da requisição com nomes em minúsculas
+        
+        Returns:
+            (status HTTP, corpo JSON da resposta), como o webhook correspondente
+        """
+        if self.instances is None:
+            status, response = await self._dispatch(method, query, body, path, headers or {})
+        else:
+            await self.instances.acquire()
+            try:
+                status, response = await self._dispatch(method, query, body, path, headers or {})
+            finally:
+                self.instances.release()
+        self.requests += 1
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        return status, response
+    
+    async def _dispatch(
+        self,
+        method: str,
+        query: str,
+        body: bytes,
+        path: str,
+        headers: Dict[str, str],
+    ) -> Tuple[int, Dict[str, Any]]:
+        if method != "POST":
+            return 405, {
+                "success": False,
+                "error": "MethodNotAllowed",
+                "message": "Método não permitido. Use POST.",
+            }
+        if self.latency > 0:
+            spread = self.latency * self.jitter
+            await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-spread, spread)))
+        
+        try:
+            try:
+                payload = json.loads(body) if body else None
+            except ValueError:
+                payload = None
+            if not isinstance(payload, dict):
+                raise WebhookValidationError("Corpo da requisição inválido")
+            
+            endpoint = path.rstrip("/").rpartition("/")[2]
+            if endpoint == SaleProvider.endpoint:
+                return 200, await self.handle_sale(payload, headers)
+            if endpoint == TikTokProvider.endpoint:
+                return 200, await self.handle_tiktok(payload, headers)
+            
+            signature = parse_qs(query).get("signature", [""])[0]
+            self.validate_signature(payload, signature)
+            
+            event_type = payload.get("webhook_event_type")
+            if not event_type:
+                raise WebhookValidationError("Tipo de evento (webhook_event_type) não especificado no payload")
+            self.events[event_type] = self.events.get(event_type, 0) + 1
+            
+            handler = self.handlers.get(event_type)
+            if handler is None:
+                return 200, {
+                    "success": True,
+                    "message": "Evento recebido mas não processado",
+                    "event": event_type,
+                }
+            await handler(payload)
+            return 200, {
+                "success": True,
+                "message": "Webhook processado com sucesso",
+                "event": event_type,
+            }
+        except WebhookError as e:
+            # Os webhooks só mapeiam 401 e 400; os demais erros viram 500
+            status = e.status_code if e.status_code in (400, 401) else 500
+            return status, {"success": False, "error": e.name, "message": str(e)}
+    
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de requisições e efeitos colaterais do armazenamento"""
+        return {
+            "requests": self.requests,
+            "status_counts": {str(code): count for code, count in sorted(self.status_counts.items())},
+            "events": dict(sorted(self.events.items())),
+            "unsigned_tiktok": self.unsigned_tiktok,
+            "instances": self.instances.stats() if self.instances is not None else None,
+            "store": self.store.stats(),
+        }
+    
+    def print_summary(self) -> None:
+        stats = self.stats()
+        store = stats["store"]
+        print("\n📊 Resumo do receptor local")
+        print(f"   Requisições: {stats['requests']}")
+        for event_type, count in stats["events"].items():
+            print(f"   📋 {event_type}: {count}")
+        for code, count in stats["status_counts"].items():
+            print(f"   🔢 HTTP {code}: {count}")
+        print(f"   🗂️  Assinaturas: {store['signatures']} {store['signature_status']}")
+        print(f"   ✉️  Emails de ativação: {store['activation_emails']} "
+              f"(duplicados: {store['duplicate_activation_emails']})")
+        print(f"   ⚠️  Assinaturas sobrescritas por corrida na criação: {store['signature_overwrites']}")
+        print(f"   🔒 Revogações de tokens: {store['token_revocations']}")
+        if store["sales"]:
+            print(f"   💰 Vendas: {store['sales']} de {store['sale_users']} usuários | transações que aguardaram "
+                  f"o mesmo usuário: {store['transaction_waits']}")
+            print(f"   📨 Notificações enfileiradas: {store['notifications_enqueued']}")
+        if store["shop_lookup_reads"]:
+            print(f"   🔎 Documentos lidos na busca por shop_id: {store['shop_lookup_reads']}")
+        if stats["unsigned_tiktok"]:
+            print(f"   ⚠️  Webhooks do TikTok sem assinatura: {stats['unsigned_tiktok']}")
+        if stats["instances"] is not None:
+            instances = stats["instances"]
+            print(f"   🧊 Cold starts: {instances['cold_starts']} | instâncias recolhidas por ociosidade: "
+                  f"{instances['reclaimed']} | pico de instâncias: {instances['peak_instances']}")
+
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+                 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+                 502: "Bad Gateway"}
+
+# Maior corpo aceito pelo receptor e pelo proxy (o limite de requisição do Cloud Functions)
+MAX_HTTP_BODY = 10 * 1024 * 1024
+
+
+class HttpRequestError(ValueError):
+    """Requisição HTTP malformada (400) ou com corpo acima do limite (413)"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_http_request(
+    reader: asyncio.StreamReader,
+    max_body: int = MAX_HTTP_BODY,
+) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+    """
+    Lê uma requisição HTTP/1.1 (corpo com Content-Length ou chunked)
+    
+    Args:
+        reader: Stream da conexão
+        max_body: Tamanho máximo do corpo em bytes
+    
+    Returns:
+        (método, alvo, versão, headers com nomes em minúsculas, corpo) ou None
+        se a conexão foi encerrada
+    
+    Raises:
+        HttpRequestError: Se os headers ou os chunks forem inválidos (400) ou o
+            corpo passar de `max_body` (413)
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpRequestError(400, "Headers grandes demais")
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, version = (lines[0].split(" ", 2) + ["", ""])[:3]
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = []
+        received = 0
+        while True:
+            try:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0].strip() or b"0", 16)
+            except (ValueError, asyncio.LimitOverrunError):
+                raise HttpRequestError(400, "Tamanho de chunk inválido")
+            if size < 0:
+                raise HttpRequestError(400, "Tamanho de chunk inválido")
+            if size == 0:
+                await reader.readuntil(b"\r\n")  # Fim dos chunks (sem trailers)
+                break
+            received += size
+            if received > max_body:
+                raise HttpRequestError(413, f"Corpo maior que {max_body} bytes")
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b"".join(chunks)
+    else:
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HttpRequestError(400, "Content-Length inválido")
+        if length < 0:
+            raise HttpRequestError(400, "Content-Length inválido")
+        if length > max_body:
+            raise HttpRequestError(413, f"Corpo maior que {max_body} bytes")
+        body = await reader.readexactly(length)
+    return method, target, version, headers, body
+
+
+async def write_http_error(writer: asyncio.StreamWriter, error: HttpRequestError) -> None:
+    """Responde a uma requisição rejeitada por read_http_request e encerra a conexão"""
+    data = json.dumps({"success": False, "error": HTTP_REASONS[error.status].replace(" ", ""),
+                       "message": str(error)}, ensure_ascii=False).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {error.status} {HTTP_REASONS[error.status]}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: close\r\n\r\n".encode("latin-1") + data
+    )
+    await writer.drain()
+
+
+def http_keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    """Se a conexão deve continuar aberta após a resposta"""
+    connection = headers.get("connection", "").lower()
+    return connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+
+
+async def _serve_connection(
+    receiver: KiwifyReceiver,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    """Atende as requisições HTTP/1.1 de uma conexão (com keep-alive)"""
+    try:
+        while True:
+            try:
+                request = await read_http_request(reader)
+            except HttpRequestError as e:
+                await write_http_error(writer, e)
+                return
+            if request is None:
+                return
+            method, target, version, headers, body = request
+            
+            path, _, query = target.partition("?")
+            if method == "GET" and path.rstrip("/").endswith("/__stats"):
+                status, response = 200, receiver.stats()
+            else:
+                status, response = await receiver.handle(method, query, body, path, headers)
+            
+            keep_alive = http_keep_alive(version, headers)
+            data = json.dumps(response, ensure_ascii=False).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+            if not keep_alive:
+                return
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return
+    finally:
+        writer.close()
+
+
+async def run_receiver(
+    receiver: KiwifyReceiver,
+    host: str = "127.0.0.1",
+    port: int = 8787,
+    duration: Optional[float] = None,
+) -> None:
+    """
+    Atende o receptor local em HTTP até ser interrompido (ou por `duration` segundos)
+    
+    Args:
+        receiver: Receptor que processa as requisições
+        host: Endereço de escuta
+        port: Porta de escuta
+        duration: Tempo máximo de execução em segundos (opcional)
+    """
+    server = await asyncio.start_server(
+        lambda reader, writer: _serve_connection(receiver, reader, writer),
+        host,
+        port,
+        backlog=1024,
+    )
+    async with server:
+        if duration is None:
+            await server.serve_forever()
+        else:
+            await asyncio.sleep(duration)
@@ -0,0 +1,611 @@
+"""
+Execução comum dos subcomandos de carga (load, replay, soak) a partir dos argumentos da CLI
+"""
+
+import json
+import sys
+import math
+import asyncio
+import argparse
+import uuid
+import itertools
+import requests
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Iterable
+from urllib.parse import urlparse, urlunparse
+
+from .payloads import DEFAULT_WEBHOOK_URL, PreparedEvent
+from .scenarios import parse_event_mix, generate_load_events, parse_plan_mix, simulate_lifecycle
+from .providers import DEFAULT_PROVIDER_MIX, parse_provider_mix, mix_provider_events
+from .event_files import iter_event_file, iter_event_file_range, iter_event_file_shard, split_file_ranges
+from .senders import AsyncWebhookSender, create_sender
+from .stats import EventLog, LoadStats
+from .metrics import MetricsServer, SoakMonitor
+from .profiling import StageTimings, CpuProfile
+from .loadgen import FaultInjection, RateProfile, parse_rate_profile, Pacing, run_load
+
+
+def build_scenario_events(
+    args: argparse.Namespace,
+    total: Optional[int] = None,
+    start_index: int = 0,
+) -> Iterator[PreparedEvent]:
+    """
+    Cria o iterador de eventos do cenário escolhido na CLI (random ou lifecycle)
+    
+    Com --providers, os eventos da Kiwify são intercalados com os de tiktokWebhook
+    e saleWebhook nas proporções pedidas.
+    
+    Args:
+        args: Argumentos com as opções de cenário
+        total: Quantidade máxima de eventos (None para sem limite)
+        start_index: Índice do primeiro cliente/email gerado
+    """
+    if args.run_id is None:
+        # Sorteado uma vez e guardado nos argumentos, para que os shards de um
+        # coordinator e as etapas de um capacity usem a mesma execução
+        args.run_id = uuid.uuid4().hex[:8]
+    providers = parse_provider_mix(args.providers)
+    if any(name != "kiwify" for name, _ in providers):
+        if args.users < 1:
+            raise ValueError("--users deve ser maior ou igual a 1")
+        kiwify_args = argparse.Namespace(**{**vars(args), "providers": DEFAULT_PROVIDER_MIX})
+        events = mix_provider_events(
+            build_scenario_events(kiwify_args, start_index=start_index),
+            providers,
+            {"tiktok": args.tiktok_secret},
+            users=args.users,
+            seed=args.seed,
+        )
+        return itertools.islice(events, total) if total is not None else events
+    
+    if args.scenario == "lifecycle":
+        events = simulate_lifecycle(
+            args.secret_key,
+            customers=args.customers,
+            months=args.months,
+            plan_mix=parse_plan_mix(args.plan_mix) if args.plan_mix else None,
+            churn=args.churn,
+            renewal=args.renewal,
+            chargeback=args.chargeback,
+            signup_days=args.signup_days,
+            email_domain=args.email_domain,
+            seed=args.seed,
+            start_index=start_index,
+            run_id=args.run_id,
+        )
+        return itertools.islice(events, total) if total is not None else events
+    
+    mix = parse_event_mix(args.mix)
+    return generate_load_events(
+        mix,
+        args.secret_key,
+        total=total,
+        email_domain=args.email_domain,
+        seed=args.seed,
+        start_index=start_index,
+        run_id=args.run_id,
+        lag=_purchase_lag(args),
+    )
+
+
+# Segundos após o envio em que uma compra é considerada processada no modelo aberto
+PURCHASE_SETTLE_SECONDS = 1.0
+
+# Concorrência padrão do load e do replay, usada pelo generate para espaçar as compras
+DEFAULT_CONCURRENCY = 10
+
+
+def _purchase_lag(args: argparse.Namespace) -> int:
+    """
+    Eventos entre a compra de um cliente e o primeiro evento que o referencia
+    
+    No modelo fechado são as --concurrency requisições em andamento. No modelo
+    aberto, o que é enviado em PURCHASE_SETTLE_SECONDS (ou no --timeout, se menor)
+    na taxa de pico, até o --max-in-flight: usar o limite inteiro faria as primeiras
+    centenas de eventos virarem compras. O generate usa a concorrência padrão.
+    """
+    if not hasattr(args, "concurrency"):
+        return DEFAULT_CONCURRENCY
+    # O capacity não tem --model nem --rps: sempre dispara no máximo --concurrency de cada vez
+    if not hasattr(args, "model") or args.model != "open" or not (args.rps or args.profile):
+        return args.concurrency
+    try:
+        rate = max(rate for _, rate in parse_rate_profile(args.profile).segments) if args.profile else args.rps
+    except (OSError, ValueError):
+        return args.max_in_flight  # O perfil inválido é recusado depois, por pacing_from_args
+    settle = min(PURCHASE_SETTLE_SECONDS, args.timeout)
+    return max(1, min(args.max_in_flight, math.ceil(rate * args.compress * settle)))
+
+
+def mix_deviation(spec: str, counts: Dict[str, int]) -> List[Tuple[str, float, float]]:
+    """
+    Eventos cuja fração enviada se afasta da pedida em --mix
+    
+    A tolerância é de 5 pontos percentuais ou três desvios padrão da amostra, o
+    que for maior, para que execuções curtas não acusem o sorteio.
+    
+    Returns:
+        Lista de (tipo de evento, fração pedida, fração enviada)
+    """
+    sent = sum(counts.values())
+    if not sent:
+        return []
+    mix = parse_event_mix(spec)
+    total_weight = sum(weight for _, weight in mix)
+    wanted: Dict[str, float] = {}
+    for event_type, weight in mix:
+        wanted[event_type.value] = wanted.get(event_type.value, 0.0) + weight / total_weight
+    deviations = []
+    for name in sorted(set(wanted) | set(counts)):
+        share, actual = wanted.get(name, 0.0), counts.get(name, 0) / sent
+        if abs(actual - share) > max(0.05, 3 * math.sqrt(share * (1 - share) / sent)):
+            deviations.append((name, share, actual))
+    return deviations
+
+
+def warn_mix_deviation(args: argparse.Namespace, counts: Dict[str, int]) -> None:
+    """Avisa quando a mistura enviada no cenário random difere de --mix"""
+    if getattr(args, "scenario", None) != "random":
+        return
+    if getattr(args, "providers", DEFAULT_PROVIDER_MIX) != DEFAULT_PROVIDER_MIX:
+        return
+    deviations = mix_deviation(args.mix, counts)
+    if deviations:
+        print("⚠️  A mistura enviada difere de --mix: " + ", ".join(
+            f"{name} {actual:.0%} (pedido {share:.0%})" for name, share, actual in deviations
+        ))
+        print("   Renovações, cancelamentos e chargebacks só vão para clientes com a compra já processada; "
+              "enquanto não houver nenhum, os eventos viram compras (execuções curtas pendem para order_approved)")
+
+
+def write_report_json(path: str, report: Dict[str, Any]) -> None:
+    """Grava o relatório em JSON ("-" escreve na saída padrão)"""
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if path == "-":
+        print(text)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+    print(f"\n💾 Relatório JSON salvo em: {path}")
+
+
+async def run_with_sender(sender, coroutine):
+    """Aguarda a corrotina e fecha o sender ao final"""
+    try:
+        return await coroutine
+    finally:
+        if isinstance(sender, AsyncWebhookSender):
+            await sender.aclose()
+        else:
+            sender.close()
+
+
+async def run_load_with_sender(
+    sender,
+    metrics_server: Optional[MetricsServer] = None,
+    monitor: Optional[SoakMonitor] = None,
+    **kwargs: Any,
+) -> LoadStats:
+    """
+    Executa run_load e fecha o sender ao final
+    
+    Se pedido, expõe as métricas (metrics_server) e amostra os recursos do
+    simulador (monitor) durante a execução.
+    """
+    if metrics_server is not None:
+        kwargs["metrics"] = metrics_server.metrics
+        await metrics_server.start()
+    if monitor is not None:
+        kwargs["stats"] = monitor.stats
+        monitor.start()
+    try:
+        return await run_with_sender(sender, run_load(sender=sender, **kwargs))
+    finally:
+        if monitor is not None:
+            await monitor.stop()
+        if metrics_server is not None:
+            await metrics_server.stop()
+
+
+def metrics_server_from_args(args: argparse.Namespace, index: int = 0) -> Optional[MetricsServer]:
+    """Cria o MetricsServer de --metrics-port (a porta é somada ao índice do processo)"""
+    if not args.metrics_port:
+        return None
+    return MetricsServer(args.metrics_host, args.metrics_port + index, linger=args.metrics_linger)
+
+
+def sender_options(args: argparse.Namespace, open_model: bool = False) -> Dict[str, Any]:
+    """Opções de create_sender a partir dos argumentos de execução"""
+    return {
+        "pool_size": args.pool_size or (args.max_in_flight if open_model else args.concurrency),
+        "keep_alive": not args.no_keep_alive,
+        "retries": args.retries,
+        "timeout": args.timeout,
+        "http2": args.http2,
+    }
+
+
+def say(args: argparse.Namespace, message: str) -> None:
+    """Exibe uma mensagem de progresso, exceto no modo de saída quiet"""
+    if getattr(args, "output", "summary") != "quiet":
+        print(message)
+
+
+def event_log_path(args: argparse.Namespace) -> Optional[str]:
+    """Destino do registro por requisição: --events-log, ou a saída padrão no modo verbose"""
+    if args.events_log:
+        return args.events_log
+    return "-" if args.output == "verbose" else None
+
+
+def run_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    """Identificação da execução no relatório JSON (a chave secreta é omitida)"""
+    argv = list(sys.argv[1:])
+    for index, arg in enumerate(argv):
+        if arg.startswith("--secret-key="):
+            argv[index] = "--secret-key=***"
+        elif arg == "--secret-key" and index + 1 < len(argv):
+            argv[index + 1] = "***"
+    return {
+        "command": args.event,
+        "url": getattr(args, "url", None) or DEFAULT_WEBHOOK_URL,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "argv": argv,
+    }
+
+
+RECEIVER_SIDE_EFFECTS = ("duplicate_activation_emails", "signature_overwrites")
+
+
+def fetch_receiver_store(url: str, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+    """
+    Contadores do armazenamento do receptor local (serve) em GET /__stats
+    
+    Args:
+        url: URL do webhook; o /__stats é pedido na raiz do mesmo host
+        timeout: Timeout da requisição em segundos
+    
+    Returns:
+        O campo "store" do /__stats, ou None se o destino não for o receptor local
+    """
+    parsed = urlparse(url)
+    try:
+        response = requests.get(urlunparse((parsed.scheme, parsed.netloc, "/__stats", "", "", "")), timeout=timeout)
+        store = response.json().get("store") if response.status_code == 200 else None
+    except (requests.RequestException, ValueError, AttributeError):
+        return None
+    if not isinstance(store, dict) or not all(key in store for key in RECEIVER_SIDE_EFFECTS):
+        return None
+    return store
+
+
+def measure_receiver_side_effects(stats: LoadStats, url: str, before: Optional[Dict[str, Any]]) -> None:
+    """Guarda em stats os efeitos colaterais da execução no receptor local (deltas do /__stats)"""
+    if before is None:
+        return
+    after = fetch_receiver_store(url)
+    if after is not None:
+        stats.receiver_side_effects = {key: after[key] - before[key] for key in RECEIVER_SIDE_EFFECTS}
+
+
+def finish_run(
+    args: argparse.Namespace,
+    stats: LoadStats,
+    monitor: Optional[SoakMonitor] = None,
+    stages: Optional[StageTimings] = None,
+) -> int:
+    """Exibe o relatório da execução e retorna o código de saída"""
+    if args.output != "quiet":
+        stats.print_summary()
+        warn_mix_deviation(args, stats.events)
+        if monitor is not None:
+            monitor.print_report()
+        if stages is not None:
+            stages.print_report()
+    if args.report_json:
+        report = {"run": run_metadata(args), **stats.to_dict()}
+        if monitor is not None:
+            report["soak"] = monitor.to_dict()
+        if stages is not None:
+            report["stages"] = stages.to_dict()
+        write_report_json(args.report_json, report)
+    if monitor is not None and monitor.drift()["client"]:
+        return 1
+    return 0 if stats.sent and stats.succeeded == stats.sent else 1
+
+
+def pacing_from_args(args: argparse.Namespace) -> Pacing:
+    """
+    Cria o Pacing a partir de --rps, --profile, --timing e --compress
+    
+    Raises:
+        ValueError: Se as opções forem inválidas ou conflitantes
+    """
+    if args.compress <= 0:
+        raise ValueError("--compress deve ser maior que zero")
+    if args.rps and args.profile:
+        raise ValueError("Use apenas uma das opções --rps ou --profile")
+    if args.timing == "original":
+        if args.rps or args.profile:
+            raise ValueError("--timing original não pode ser combinado com --rps ou --profile")
+        return Pacing(original=True, compress=args.compress)
+    
+    profile = None
+    if args.profile:
+        profile = parse_rate_profile(args.profile, seed=getattr(args, "seed", None))
+    elif args.rps:
+        profile = RateProfile([(math.inf, args.rps)], name=f"constant:{args.rps:g}")
+    return Pacing(profile=profile, compress=args.compress)
+
+
+def model_options(args: argparse.Namespace, pacing: Pacing) -> Dict[str, Any]:
+    """Opções de run_load do modelo de carga (o modelo aberto só se aplica com ritmo definido)"""
+    return {
+        "open_model": args.model == "open" and (pacing.original or pacing.profile is not None),
+        "max_in_flight": args.max_in_flight,
+    }
+
+
+def faults_from_args(args: argparse.Namespace) -> FaultInjection:
+    """Cria a FaultInjection a partir das opções --duplicate-rate, --concurrent-rate e --reorder-rate"""
+    return FaultInjection(
+        duplicate=args.duplicate_rate,
+        concurrent=args.concurrent_rate,
+        reorder=args.reorder_rate,
+        copies=args.copies,
+        gap=args.duplicate_gap,
+        window=args.reorder_window,
+        secret_key=getattr(args, "secret_key", None),
+        seed=getattr(args, "seed", None),
+    )
+
+
+def validate_faults(args: argparse.Namespace) -> Optional[str]:
+    """Retorna a mensagem de erro das opções de injeção de falhas, ou None se forem válidas"""
+    rates = (args.duplicate_rate, args.concurrent_rate, args.reorder_rate)
+    if any(rate < 0 for rate in rates) or sum(rates) > 1:
+        return "--duplicate-rate, --concurrent-rate e --reorder-rate devem ser positivas e somar no máximo 1"
+    if args.copies < 2:
+        return "--copies deve ser maior ou igual a 2"
+    if args.duplicate_gap < 1 or args.reorder_window < 1:
+        return "--duplicate-gap e --reorder-window devem ser maiores ou iguais a 1"
+    return None
+
+
+def describe_faults(faults: FaultInjection) -> str:
+    parts = []
+    if faults.duplicate:
+        parts.append(f"duplicatas {faults.duplicate:.1%} (a cada {faults.gap} eventos)")
+    if faults.concurrent:
+        parts.append(f"simultâneas {faults.concurrent:.1%}")
+    if faults.reorder:
+        parts.append(f"reordenação {faults.reorder:.1%}")
+    return f"{', '.join(parts)} | {faults.copies} entregas por evento duplicado"
+
+
+def describe_pacing(pacing: Pacing) -> str:
+    compress = f" (compressão {pacing.compress:g}x)" if pacing.compress != 1 else ""
+    if pacing.original:
+        return f"instantes originais dos eventos{compress}"
+    if pacing.profile is not None:
+        return f"perfil {pacing.profile.name}{compress}"
+    return "sem limite de taxa"
+
+
+def execute_run(
+    args: argparse.Namespace,
+    url: str,
+    events: Iterable[PreparedEvent],
+    monitor: Optional[SoakMonitor] = None,
+) -> int:
+    """
+    Envia os eventos com as opções de execução comuns (load, replay, soak) e exibe o relatório
+    
+    Args:
+        monitor: Amostrador de recursos do simulador (subcomando soak)
+    
+    Returns:
+        Código de saída (0 apenas se todas as requisições retornarem 2xx e, no
+        soak, sem deriva no cliente)
+    """
+    if args.concurrency < 1 or args.max_in_flight < 1:
+        print("❌ --concurrency e --max-in-flight devem ser maiores ou iguais a 1")
+        return 1
+    if args.cpu_profile_interval <= 0:
+        print("❌ --cpu-profile-interval deve ser maior que zero")
+        return 1
+    fault_error = validate_faults(args)
+    if fault_error:
+        print(f"❌ {fault_error}")
+        return 1
+    
+    try:
+        pacing = pacing_from_args(args)
+        options = model_options(args, pacing)
+        sender = create_sender(**sender_options(args, options["open_model"]))
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    
+    faults = faults_from_args(args)
+    if options["open_model"]:
+        say(args, f"   Modelo aberto (até {args.max_in_flight} em andamento) | Ritmo: {describe_pacing(pacing)}")
+    else:
+        say(args, f"   Concorrência: {args.concurrency} | Ritmo: {describe_pacing(pacing)}")
+    if faults.enabled:
+        say(args, f"   Falhas injetadas: {describe_faults(faults)}")
+    log_path = event_log_path(args)
+    event_log = None
+    if log_path:
+        # No modo verbose sem --events-log, cada resultado aparece assim que chega
+        event_log = EventLog(log_path, buffer_size=1 if not args.events_log else 256 * 1024)
+    metrics_server = metrics_server_from_args(args)
+    if metrics_server is not None:
+        say(args, f"   📈 Métricas em: http://{metrics_server.host}:{metrics_server.port}/metrics")
+    stages = StageTimings() if args.stage_timings else None
+    profile = CpuProfile(args.cpu_profile, args.cpu_profiler, args.cpu_profile_interval) if args.cpu_profile else None
+    receiver_before = fetch_receiver_store(url) if faults.enabled else None
+    if stages is not None:
+        stages.start()
+    if profile is not None:
+        profile.start()
+    try:
+        stats = asyncio.run(run_load_with_sender(
+            sender,
+            metrics_server=metrics_server,
+            monitor=monitor,
+            url=url,
+            events=events,
+            concurrency=args.concurrency,
+            pacing=pacing,
+            duration=args.duration,
+            faults=faults,
+            event_log=event_log,
+            **options,
+        ))
+    finally:
+        if profile is not None:
+            profile.stop()
+        if stages is not None:
+            stages.stop()
+        if event_log is not None:
+            event_log.close()
+    measure_receiver_side_effects(stats, url, receiver_before)
+    if args.events_log:
+        say(args, f"\n🧾 {event_log.records} resultados gravados em: {args.events_log}")
+    if profile is not None:
+        say(args, f"\n🔥 Perfil de CPU: {profile.describe()}")
+    return finish_run(args, stats, monitor, stages)
+
+
+def _replay_shard(
+    path: str,
+    url: str,
+    shard: Tuple[str, int, int],
+    options: Dict[str, Any],
+    run_options: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Reenvia um shard do arquivo de eventos (executado em um processo do pool)
+    
+    Args:
+        path: Arquivo NDJSON de eventos
+        url: URL do endpoint do webhook
+        shard: ("range", início, fim) em bytes ou ("subscription", índice, total)
+        options: Opções de create_sender (cada processo tem seu próprio pool)
+        run_options: Opções de run_load (concurrency, pacing, duration, faults, modelo)
+    
+    Returns:
+        Estatísticas do shard em formato to_dict()
+    """
+    mode, first, second = shard
+    if mode == "range":
+        events = iter_event_file_range(path, first, second)
+    else:
+        events = iter_event_file_shard(path, first, second)
+    run_options = dict(run_options)
+    log_path = run_options.pop("event_log_path", None)
+    event_log = EventLog(log_path) if log_path else None
+    metrics_address = run_options.pop("metrics_address", None)
+    metrics_server = MetricsServer(*metrics_address) if metrics_address else None
+    sender = create_sender(**options)
+    try:
+        stats = asyncio.run(run_load_with_sender(
+            sender, metrics_server=metrics_server, url=url, events=events, event_log=event_log, **run_options
+        ))
+    finally:
+        if event_log is not None:
+            event_log.close()
+    return stats.to_dict()
+
+
+def run_sharded_replay(
+    path: str,
+    url: str,
+    processes: int,
+    shard_by: str,
+    options: Dict[str, Any],
+    concurrency: int = 10,
+    pacing: Optional[Pacing] = None,
+    duration: Optional[float] = None,
+    faults: Optional[FaultInjection] = None,
+    open_model: bool = False,
+    max_in_flight: int = 256,
+    event_log_path: Optional[str] = None,
+    metrics_address: Optional[Tuple[str, int, float]] = None,
+) -> LoadStats:
+    """
+    Reenvia um arquivo de eventos dividido entre vários processos
+    
+    Cada processo lê apenas o seu shard, usa seu próprio pool de conexões e envia
+    a uma fração da taxa do perfil; com os instantes originais, todos os
+    processos usam o mesmo instante de origem. As estatísticas são combinadas
+    ao final.
+    
+    Args:
+        path: Arquivo NDJSON de eventos
+        url: URL do endpoint do webhook
+        processes: Número de processos
+        shard_by: "range" (intervalos de bytes) ou "subscription" (hash do
+            subscription_id, preservando a ordem por assinatura)
+        options: Opções de create_sender
+        concurrency: Requisições simultâneas por processo
+        pacing: Espaçamento dos envios (a taxa do perfil é dividida entre os processos)
+        duration: Duração máxima da execução em segundos (opcional)
+        faults: Falhas a injetar (cada processo injeta no seu shard)
+        open_model: Dispara nos instantes previstos (modelo aberto)
+        max_in_flight: Máximo de requisições em andamento por processo no modelo aberto
+        event_log_path: Registro JSON lines por requisição; cada processo grava em
+            "<arquivo>.<índice>" ("-" grava todos na saída padrão)
+        metrics_address: (host, porta, linger) do exportador de métricas; cada
+            processo usa a porta somada ao seu índice
+    """
+    if shard_by == "range":
+        shards = [("range", start, end) for start, end in split_file_ranges(path, processes)]
+    else:
+        shards = [("subscription", index, processes) for index in range(processes)]
+    
+    pacing = pacing or Pacing()
+    if pacing.original and pacing.origin is None:
+        first = next(iter_event_file(path), None)
+        pacing = Pacing(original=True, compress=pacing.compress, origin=first.at if first else None)
+    
+    def shard_pacing(index: int) -> Pacing:
+        if pacing.profile is None:
+            return pacing
+        seed = pacing.profile.seed + index if pacing.profile.seed is not None else None
+        return Pacing(profile=pacing.profile.scaled(1.0 / processes, seed=seed), compress=pacing.compress)
+    
+    def shard_faults(index: int) -> Optional[FaultInjection]:
+        if faults is None or faults.seed is None:
+            return faults
+        return replace(faults, seed=faults.seed + index)
+    
+    stats = LoadStats()
+    stats.start()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(_replay_shard, path, url, shard, options, {
+                "concurrency": concurrency,
+                "pacing": shard_pacing(index),
+                "duration": duration,
+                "faults": shard_faults(index),
+                "open_model": open_model,
+                "max_in_flight": max_in_flight,
+                "event_log_path": (
+                    event_log_path if event_log_path in (None, "-") else f"{event_log_path}.{index}"
+                ),
+                "metrics_address": (
+                    (metrics_address[0], metrics_address[1] + index, metrics_address[2])
+                    if metrics_address else None
+                ),
+            })
+            for index, shard in enumerate(shards)
+        ]
+        for future in futures:
+            stats.merge(LoadStats.from_dict(future.result()))
+    stats.stop()
+    return stats
@@ -0,0 +1,284 @@
+"""
+Geração dos eventos de carga: mistura aleatória e ciclo de vida de clientes
+"""
+
+import random
+import heapq
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional, List, Tuple, Iterator, Deque
+
+from .payloads import EventType, EVENT_COMMANDS, PLAN_MAPPING, PayloadFactory, timed_stage, PreparedEvent, prepare_event
+
+
+# Mistura padrão de eventos para o modo de carga
+DEFAULT_EVENT_MIX = "approved=70,renewed=20,canceled=5,chargeback=5"
+
+# Mistura padrão do capacity: só compras, que nunca dependem de estado anterior do backend
+CAPACITY_EVENT_MIX = "approved"
+
+# Clientes aprovados mantidos como alvo de renovações, cancelamentos e chargebacks
+ACTIVE_CUSTOMER_LIMIT = 100_000
+
+
+def parse_event_mix(spec: str) -> List[Tuple[EventType, float]]:
+    """
+    Interpreta a mistura de eventos no formato "approved=70,renewed=20,canceled=5"
+    
+    Args:
+        spec: Lista de subcomandos com pesos separados por vírgula (peso padrão: 1)
+    
+    Returns:
+        Lista de (tipo de evento, peso)
+    """
+    mix = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in EVENT_COMMANDS:
+            raise ValueError(f"Evento desconhecido na mistura: {name}")
+        value = float(weight) if weight else 1.0
+        if value < 0:
+            raise ValueError(f"Peso negativo na mistura: {item}")
+        mix.append((EVENT_COMMANDS[name], value))
+    
+    if not mix or sum(weight for _, weight in mix) <= 0:
+        raise ValueError("Mistura de eventos vazia")
+    return mix
+
+
+def load_email(prefix: str, index: int, email_domain: str, run_id: str = "") -> str:
+    """Email de um cliente gerado: <prefixo>+[<execução>-]<n>@<domínio>"""
+    return f"{prefix}+{run_id}-{index}@{email_domain}" if run_id else f"{prefix}+{index}@{email_domain}"
+
+
+def generate_load_events(
+    mix: List[Tuple[EventType, float]],
+    secret_key: str,
+    total: Optional[int] = None,
+    email_domain: str = "example.com",
+    seed: Optional[int] = None,
+    factory: Optional[PayloadFactory] = None,
+    start_index: int = 0,
+    run_id: str = "",
+    lag: int = 0,
+) -> Iterator[PreparedEvent]:
+    """
+    Gera eventos aleatórios, já serializados e assinados, segundo a mistura informada
+    
+    Cada compra aprovada cria um cliente novo. Renovações, cancelamentos e
+    chargebacks são enviados para clientes aprovados antes na mesma execução (com
+    o mesmo email, plano e subscription_id), como o backend espera; cancelamento e
+    chargeback encerram o cliente. Enquanto não houver cliente disponível, o evento
+    vira uma compra aprovada.
+    
+    Args:
+        mix: Lista de (tipo de evento, peso)
+        secret_key: Chave secreta da Kiwify para calcular a assinatura
+        total: Quantidade de eventos (None para gerar indefinidamente)
+        email_domain: Domínio dos emails gerados (loadtest+[<execução>-]<n>@<domínio>)
+        seed: Semente do gerador aleatório (opcional)
+        factory: Fábrica de payloads (opcional, uma é criada com a mesma semente)
+        start_index: Índice do primeiro email (faixas distintas evitam colisões entre agentes)
+        run_id: Identificador da execução incluído nos emails, para que execuções
+            seguidas contra o mesmo backend não reaproveitem clientes
+        lag: Eventos gerados entre a compra de um cliente e o primeiro evento que o
+            referencia (as requisições ainda em andamento quando o evento sai, para
+            que a compra já tenha sido processada); enquanto não houver cliente
+            liberado, os eventos viram compras e a mistura pende para elas
+    """
+    rng = random.Random(seed)
+    factory = factory or PayloadFactory(seed=seed)
+    event_types = [event_type for event_type, _ in mix]
+    weights = [weight for _, weight in mix]
+    plans = list(PLAN_MAPPING)
+    # Clientes aprovados: (índice do evento da compra, email, plano, subscription_id)
+    pending: Deque[Tuple[int, str, str, str]] = deque()
+    active: List[Tuple[str, str, str]] = []
+    
+    index = 0
+    while total is None or index < total:
+        while pending and pending[0][0] <= index - lag:
+            customer = pending.popleft()[1:]
+            if len(active) < ACTIVE_CUSTOMER_LIMIT:
+                active.append(customer)
+            else:
+                active[rng.randrange(len(active))] = customer
+        event_type = rng.choices(event_types, weights)[0]
+        if event_type != EventType.ORDER_APPROVED and active:
+            position = rng.randrange(len(active))
+            email, plan_id, subscription_id = active[position]
+            if event_type != EventType.SUBSCRIPTION_RENEWED:
+                active[position] = active[-1]
+                active.pop()
+        else:
+            event_type = EventType.ORDER_APPROVED
+            email = load_email("loadtest", start_index + index, email_domain, run_id)
+            plan_id, subscription_id = rng.choice(plans), factory.new_id()
+            pending.append((index, email, plan_id, subscription_id))
+        with timed_stage("build"):
+            payload = factory.build(event_type, email, plan_id=plan_id, subscription_id=subscription_id)
+        yield prepare_event(payload, secret_key)
+        index += 1
+
+
+# Duração de um dia e de um ciclo de cobrança mensal, em segundos
+DAY_SECONDS = 86400.0
+BILLING_PERIOD_SECONDS = 30 * DAY_SECONDS
+
+
+def parse_plan_mix(spec: str) -> List[Tuple[str, float]]:
+    """
+    Interpreta a distribuição de planos no formato "STARTER=50,SCALING=30,SCALED=20"
+    """
+    mix = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip().upper()
+        if name not in PLAN_MAPPING:
+            raise ValueError(f"Plano desconhecido na distribuição: {name}")
+        value = float(weight) if weight else 1.0
+        if value < 0:
+            raise ValueError(f"Peso negativo na distribuição: {item}")
+        mix.append((name, value))
+    
+    if not mix or sum(weight for _, weight in mix) <= 0:
+        raise ValueError("Distribuição de planos vazia")
+    return mix
+
+
+class _Customer:
+    """Estado de um cliente simulado: ids e email se mantêm em todos os seus eventos"""
+    
+    __slots__ = ("email", "plan_id", "subscription_id", "last_order_id")
+    
+    def __init__(self, email: str, plan_id: str, subscription_id: str):
+        self.email = email
+        self.plan_id = plan_id
+        self.subscription_id = subscription_id
+        self.last_order_id: Optional[str] = None
+
+
+def _customer_timeline(
+    rng: random.Random,
+    customer: _Customer,
+    horizon: float,
+    signup_window: float,
+    churn: float,
+    renewal: float,
+    chargeback: float,
+) -> Iterator[Tuple[float, EventType, _Customer]]:
+    """
+    Gera, em ordem cronológica, os eventos de um cliente
+    
+    Após a compra, a cada ciclo de cobrança a última cobrança pode sofrer
+    chargeback, o cliente pode cancelar antes da próxima cobrança (churn) ou a
+    cobrança é tentada: renova com probabilidade `renewal` e, se falhar, a
+    assinatura é cancelada.
+    """
+    at = rng.uniform(0, signup_window)
+    if at >= horizon:
+        return
+    yield at, EventType.ORDER_APPROVED, customer
+    
+    while True:
+        if rng.random() < chargeback:
+            chargeback_at = at + rng.uniform(1, 20) * DAY_SECONDS
+            if chargeback_at < horizon:
+                yield chargeback_at, EventType.CHARGEBACK, customer
+            return
+        
+        next_charge = at + BILLING_PERIOD_SECONDS
+        if rng.random() < churn:
+            cancel_at = rng.uniform(at, next_charge)
+            if cancel_at < horizon:
+                yield cancel_at, EventType.SUBSCRIPTION_CANCELED, customer
+            return
+        
+        if next_charge >= horizon:
+            return
+        if rng.random() >= renewal:
+            yield next_charge, EventType.SUBSCRIPTION_CANCELED, customer
+            return
+        at = next_charge
+        yield at, EventType.SUBSCRIPTION_RENEWED, customer
+
+
+def simulate_lifecycle(
+    secret_key: str,
+    customers: int = 1000,
+    months: float = 12,
+    plan_mix: Optional[List[Tuple[str, float]]] = None,
+    churn: float = 0.05,
+    renewal: float = 0.95,
+    chargeback: float = 0.01,
+    signup_days: float = 30.0,
+    email_domain: str = "example.com",
+    seed: Optional[int] = None,
+    factory: Optional[PayloadFactory] = None,
+    start: Optional[datetime] = None,
+    start_index: int = 0,
+    run_id: str = "",
+) -> Iterator[PreparedEvent]:
+    """
+    Simula o ciclo de vida das assinaturas de uma população de clientes
+    
+    Cada cliente compra um plano, renova mensalmente e pode cancelar ou sofrer
+    chargeback; todos os seus eventos usam o mesmo email e subscription_id. Os
+    eventos de todos os clientes são intercalados em ordem cronológica e cada um
+    traz em `at` o seu instante simulado (segundos desde `start`).
+    
+    Args:
+        secret_key: Chave secreta da Kiwify para calcular a assinatura
+        customers: Tamanho da população
+        months: Horizonte da simulação em meses (ciclos de 30 dias)
+        plan_mix: Distribuição de planos [(plano, peso)] (default: uniforme)
+        churn: Probabilidade de cancelamento voluntário a cada ciclo
+        renewal: Probabilidade de a cobrança de renovação ser aprovada
+        chargeback: Probabilidade de chargeback de cada cobrança
+        signup_days: Janela, em dias, em que as compras iniciais se distribuem
+        email_domain: Domínio dos emails gerados (cliente+[<execução>-]<n>@<domínio>)
+        seed: Semente do gerador aleatório (opcional)
+        factory: Fábrica de payloads (opcional, uma é criada com a mesma semente)
+        start: Data do início da simulação (default: agora)
+        start_index: Índice do primeiro cliente (faixas distintas evitam colisões entre agentes)
+        run_id: Identificador da execução incluído nos emails (opcional)
+    """
+    rng = random.Random(seed)
+    factory = factory or PayloadFactory(seed=seed)
+    plan_mix = plan_mix or [(plan_id, 1.0) for plan_id in PLAN_MAPPING]
+    plan_ids = [plan_id for plan_id, _ in plan_mix]
+    plan_weights = [weight for _, weight in plan_mix]
+    horizon = months * BILLING_PERIOD_SECONDS
+    start = start or datetime.now().replace(second=0, microsecond=0)
+    
+    timelines = []
+    for index in range(start_index, start_index + customers):
+        customer = _Customer(
+            email=load_email("cliente", index, email_domain, run_id),
+            plan_id=rng.choices(plan_ids, plan_weights)[0],
+            subscription_id=factory.new_id(),
+        )
+        timelines.append(_customer_timeline(
+            rng, customer, horizon, signup_days * DAY_SECONDS, churn, renewal, chargeback
+        ))
+    
+    for at, event_type, customer in heapq.merge(*timelines, key=lambda item: item[0]):
+        if event_type in (EventType.ORDER_APPROVED, EventType.SUBSCRIPTION_RENEWED):
+            customer.last_order_id = factory.new_id()
+        with timed_stage("build"):
+            payload = factory.build(
+                event_type,
+                customer.email,
+                plan_id=customer.plan_id,
+                order_id=customer.last_order_id,
+                subscription_id=customer.subscription_id,
+                now=start + timedelta(seconds=at),
+            )
+        yield prepare_event(payload, secret_key, at=at)
@@ -0,0 +1,286 @@
+"""
+Envio HTTP dos webhooks com tempos de conexão, TTFB e total por requisição
+"""
+
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+from .payloads import record_stage, encode_payload, calculate_signature, sign_url, PreparedEvent
+from .providers import PROVIDERS
+
+try:
+    import httpx  # Cliente HTTP/2 opcional: pip install "httpx[http2]"
+except ImportError:
+    httpx = None
+
+
+# Tempo gasto abrindo conexões (TCP + TLS) pela thread atual
+_connect_timing = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """Conexão HTTP que acumula o tempo de connect() na thread atual"""
+    
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connect_timing.seconds = getattr(_connect_timing, "seconds", 0.0) + time.perf_counter() - start
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    """Conexão HTTPS que acumula o tempo de connect() (incluindo handshake TLS) na thread atual"""
+    
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connect_timing.seconds = getattr(_connect_timing, "seconds", 0.0) + time.perf_counter() - start
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Adapter do requests que mede o tempo de abertura de conexões"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+@dataclass
+class RequestTiming:
+    """Tempos de uma requisição em segundos"""
+    connect: float
+    ttfb: float
+    total: float
+    scheduled: Optional[float] = None  # Desde o instante previsto de envio (modelo aberto)
+
+
+def timed_post(
+    session: requests.Session,
+    url: str,
+    timeout: float = 30,
+    **kwargs: Any,
+) -> Tuple[requests.Response, RequestTiming]:
+    """
+    Executa um POST medindo conexão, tempo até o primeiro byte e tempo total
+    
+    O tempo de conexão só é medido quando a sessão usa TimedHTTPAdapter e é zero
+    quando uma conexão existente do pool é reaproveitada.
+    
+    Args:
+        session: Sessão HTTP usada no envio
+        url: URL de destino
+        timeout: Timeout da requisição em segundos
+        **kwargs: Argumentos repassados a session.post (json, data, headers)
+    
+    Returns:
+        Tupla (resposta, tempos da requisição)
+    """
+    _connect_timing.seconds = 0.0
+    start = time.perf_counter()
+    response = session.post(url, timeout=timeout, **kwargs)
+    total = time.perf_counter() - start
+    record_stage("network", total)
+    timing = RequestTiming(
+        connect=_connect_timing.seconds,
+        ttfb=response.elapsed.total_seconds(),
+        total=total,
+    )
+    return response, timing
+
+
+# Status HTTP que disparam nova tentativa quando retries estão habilitados
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class WebhookSender:
+    """
+    Envia webhooks reaproveitando conexões de um requests.Session com pool
+    
+    Uma única instância pode ser compartilhada entre threads: o pool mantém até
+    `pool_size` conexões abertas por host e, com `keep_alive`, evita refazer o
+    handshake TCP/TLS a cada requisição.
+    """
+    
+    def __init__(
+        self,
+        pool_size: int = 10,
+        keep_alive: bool = True,
+        retries: int = 0,
+        backoff: float = 0.0,
+        timeout: float = 30.0,
+    ):
+        """
+        Args:
+            pool_size: Número máximo de conexões mantidas por host
+            keep_alive: Mantém conexões abertas entre requisições
+            retries: Número de novas tentativas em falhas de conexão e status 429/5xx
+            backoff: Fator de espera exponencial entre tentativas (segundos)
+            timeout: Timeout de cada requisição em segundos
+        """
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=RETRY_STATUS_CODES if retries else (),
+                allowed_methods=frozenset(["POST"]),
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+    
+    def post(self, url: str, **kwargs: Any) -> Tuple[requests.Response, RequestTiming]:
+        """Executa um POST medindo os tempos (kwargs repassados a session.post)"""
+        return timed_post(self.session, url, timeout=self.timeout, **kwargs)
+    
+    def send(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        secret_key: str,
+    ) -> Tuple[requests.Response, RequestTiming]:
+        """Serializa o payload uma única vez, assina esses bytes e os envia"""
+        body = encode_payload(payload)
+        signature = calculate_signature(body, secret_key)
+        return self.post(sign_url(url, signature), data=body)
+    
+    def send_event(self, url: str, event: PreparedEvent) -> Tuple[requests.Response, RequestTiming]:
+        """Envia um evento já serializado e assinado ao endpoint do seu provedor"""
+        target, headers = PROVIDERS[event.provider].delivery(url, event)
+        return self.post(target, data=event.body, headers=headers)
+    
+    def close(self) -> None:
+        self.session.close()
+    
+    def __enter__(self) -> "WebhookSender":
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class AsyncWebhookSender:
+    """
+    Envia webhooks com httpx.AsyncClient (HTTP/2 quando suportado pelo servidor)
+    
+    Requer o pacote opcional httpx[http2]. As requisições são multiplexadas no
+    próprio event loop, sem pool de threads.
+    """
+    
+    def __init__(
+        self,
+        pool_size: int = 10,
+        keep_alive: bool = True,
+        retries: int = 0,
+        timeout: float = 30.0,
+        http2: bool = True,
+    ):
+        """
+        Args:
+            pool_size: Número máximo de conexões simultâneas
+            keep_alive: Mantém conexões abertas entre requisições
+            retries: Número de novas tentativas em falhas de conexão
+            timeout: Timeout de cada requisição em segundos
+            http2: Negocia HTTP/2 (requer o pacote h2)
+        """
+        if httpx is None:
+            raise RuntimeError('Cliente assíncrono requer o pacote httpx: pip install "httpx[http2]"')
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            headers={"Content-Type": "application/json"},
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size if keep_alive else 0,
+            ),
+            transport=httpx.AsyncHTTPTransport(http2=http2, retries=retries),
+        )
+    
+    async def post(self, url: str, **kwargs: Any) -> Tuple["httpx.Response", RequestTiming]:
+        """Executa um POST medindo os tempos (kwargs repassados a client.post)"""
+        connect = 0.0
+        connect_started = 0.0
+        
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            nonlocal connect, connect_started
+            if event_name == "connection.connect_tcp.started":
+                connect_started = time.perf_counter()
+            elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+                connect = time.perf_counter() - connect_started
+        
+        start = time.perf_counter()
+        async with self.client.stream("POST", url, extensions={"trace": trace}, **kwargs) as response:
+            ttfb = time.perf_counter() - start
+            await response.aread()
+        total = time.perf_counter() - start
+        record_stage("network", total)
+        return response, RequestTiming(connect=connect, ttfb=ttfb, total=total)
+    
+    async def send(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        secret_key: str,
+    ) -> Tuple["httpx.Response", RequestTiming]:
+        """Serializa o payload uma única vez, assina esses bytes e os envia"""
+        body = encode_payload(payload)
+        signature = calculate_signature(body, secret_key)
+        return await self.post(sign_url(url, signature), content=body)
+    
+    async def send_event(self, url: str, event: PreparedEvent) -> Tuple["httpx.Response", RequestTiming]:
+        """Envia um evento já serializado e assinado ao endpoint do seu provedor"""
+        target, headers = PROVIDERS[event.provider].delivery(url, event)
+        return await self.post(target, content=event.body, headers=headers)
+    
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def create_sender(
+    pool_size: int = 10,
+    keep_alive: bool = True,
+    retries: int = 0,
+    timeout: float = 30.0,
+    http2: bool = False,
+):
+    """Cria o sender adequado: AsyncWebhookSender com HTTP/2 ou WebhookSender com pool"""
+    if http2:
+        return AsyncWebhookSender(pool_size=pool_size, keep_alive=keep_alive, retries=retries, timeout=timeout)
+    return WebhookSender(pool_size=pool_size, keep_alive=keep_alive, retries=retries, timeout=timeout)
+
+
+def signed_request(url: str, payload: Dict[str, Any], secret_key: str) -> Tuple[str, bytes, str]:
+    """
+    Serializa o payload uma única vez e assina os mesmos bytes que serão enviados
+    
+    Returns:
+        (URL com a assinatura na query string, corpo, assinatura HMAC SHA1)
+    """
+    body = encode_payload(payload)
+    signature = calculate_signature(body, secret_key)
+    return sign_url(url, signature), body, signature
@@ -0,0 +1,656 @@
+"""
+Estatísticas da carga: histogramas de latência, relatórios e comparação entre execuções
+"""
+
+import json
+import sys
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+
+from .payloads import PreparedEvent
+from .senders import RequestTiming
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências no estilo HDR (buckets log-lineares)
+    
+    Os valores são registrados em microssegundos. Abaixo de 2^SUB_BUCKET_BITS cada
+    microssegundo tem seu próprio bucket; acima disso a largura do bucket dobra a
+    cada potência de 2, mantendo o erro relativo dos percentis abaixo de 0,1%.
+    """
+    
+    SUB_BUCKET_BITS = 11
+    PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+    
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+    
+    @classmethod
+    def _bucket_key(cls, value_us: int) -> int:
+        shift = value_us.bit_length() - cls.SUB_BUCKET_BITS
+        if shift <= 0:
+            return value_us
+        return (shift << cls.SUB_BUCKET_BITS) | (value_us >> shift)
+    
+    @classmethod
+    def _bucket_value(cls, key: int) -> int:
+        """Maior valor equivalente (em microssegundos) representado pelo bucket"""
+        shift = key >> cls.SUB_BUCKET_BITS
+        if shift == 0:
+            return key
+        mantissa = key & ((1 << cls.SUB_BUCKET_BITS) - 1)
+        return ((mantissa + 1) << shift) - 1
+    
+    def record(self, seconds: float) -> None:
+        """Registra uma latência em segundos"""
+        self.record_us(max(0, int(round(seconds * 1_000_000))))
+    
+    def record_us(self, value_us: int, count: int = 1) -> None:
+        key = self._bucket_key(value_us)
+        self.counts[key] = self.counts.get(key, 0) + count
+        self.total_count += count
+        self.sum_us += value_us * count
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+    
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Soma os registros de outro histograma a este"""
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total_count += other.total_count
+        self.sum_us += other.sum_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+    
+    def difference(self, earlier: "LatencyHistogram") -> "LatencyHistogram":
+        """Histograma dos registros feitos depois de `earlier` (cópia anterior deste histograma)"""
+        window = LatencyHistogram()
+        for key, count in self.counts.items():
+            delta = count - earlier.counts.get(key, 0)
+            if delta > 0:
+                window.record_us(self._bucket_value(key), delta)
+        return window
+    
+    def percentile_us(self, percentile: float) -> int:
+        """Valor (em microssegundos) abaixo do qual estão `percentile`% dos registros"""
+        if not self.total_count:
+            return 0
+        target = max(1, math.ceil(percentile / 100.0 * self.total_count))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= target:
+                return min(self._bucket_value(key), self.max_us)
+        return self.max_us
+    
+    def percentile_ms(self, percentile: float) -> float:
+        return self.percentile_us(percentile) / 1000.0
+    
+    @property
+    def mean_ms(self) -> float:
+        return self.sum_us / self.total_count / 1000.0 if self.total_count else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Representação JSON (inclui os buckets para permitir combinar execuções)"""
+        return {
+            "count": self.total_count,
+            "min_ms": (self.min_us or 0) / 1000.0,
+            "max_ms": self.max_us / 1000.0,
+            "mean_ms": round(self.mean_ms, 3),
+            "percentiles_ms": {
+                f"p{percentile:g}": self.percentile_ms(percentile) for percentile in self.PERCENTILES
+            },
+            "sum_us": self.sum_us,
+            "buckets": {str(key): count for key, count in sorted(self.counts.items())},
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        """Reconstrói um histograma a partir de to_dict()"""
+        histogram = cls()
+        histogram.counts = {int(key): count for key, count in data.get("buckets", {}).items()}
+        histogram.total_count = data.get("count", sum(histogram.counts.values()))
+        histogram.sum_us = data.get("sum_us", 0)
+        histogram.min_us = int(round(data.get("min_ms", 0) * 1000)) if histogram.total_count else None
+        histogram.max_us = int(round(data.get("max_ms", 0) * 1000))
+        return histogram
+
+
+class EventLog:
+    """
+    Registro de uma linha JSON por requisição, gravado fora do caminho crítico
+    
+    Os registros são serializados e acumulados em memória; blocos de
+    `buffer_size` bytes são gravados em ordem por uma thread dedicada, sem
+    bloquear o event loop nem os workers.
+    """
+    
+    def __init__(self, path: str, buffer_size: int = 256 * 1024):
+        """
+        Args:
+            path: Arquivo JSON lines de saída ("-" para a saída padrão)
+            buffer_size: Bytes acumulados antes de cada gravação
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self._file = sys.stdout.buffer if path == "-" else open(path, "wb")
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self.records = 0
+    
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(',', ':'), ensure_ascii=False).encode("utf-8") + b"\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.records += 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+    
+    def _write_chunk(self, chunk: bytes) -> None:
+        if self._file is sys.stdout.buffer:
+            sys.stdout.flush()
+        self._file.write(chunk)
+        self._file.flush()
+    
+    def flush(self) -> None:
+        """Entrega o conteúdo acumulado à thread de gravação"""
+        if self._buffer:
+            chunk = b"".join(self._buffer)
+            self._buffer = []
+            self._buffered = 0
+            self._writer.submit(self._write_chunk, chunk)
+    
+    def close(self) -> None:
+        """Grava o restante e aguarda a thread de gravação"""
+        self.flush()
+        self._writer.shutdown(wait=True)
+        if self._file is not sys.stdout.buffer:
+            self._file.close()
+
+
+def result_record(
+    event: "PreparedEvent",
+    status_code: Optional[int] = None,
+    error: Optional[str] = None,
+    timing: Optional["RequestTiming"] = None,
+) -> Dict[str, Any]:
+    """Registro JSON do resultado de uma requisição (usado pelo EventLog)"""
+    record: Dict[str, Any] = {
+        "ts": round(time.time(), 6),
+        "event": event.event_type,
+        "subscription_id": event.subscription_id,
+        "status": status_code,
+    }
+    if error is not None:
+        record["error"] = error
+    if timing is not None:
+        record["total_ms"] = round(timing.total * 1000, 3)
+        record["ttfb_ms"] = round(timing.ttfb * 1000, 3)
+        record["connect_ms"] = round(timing.connect * 1000, 3)
+        if timing.scheduled is not None:
+            record["scheduled_ms"] = round(timing.scheduled * 1000, 3)
+    if event.tag:
+        record["tag"] = event.tag
+    return record
+
+
+class LoadStats:
+    """Contadores e histogramas de latência agregados de uma execução de carga"""
+    
+    TIMING_STAGES = ("connect", "ttfb", "total", "scheduled")
+    
+    def __init__(self):
+        self.sent = 0
+        self.status_counts: Dict[int, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.events: Dict[str, int] = {}
+        self.latency: Dict[str, LatencyHistogram] = {
+            stage: LatencyHistogram() for stage in self.TIMING_STAGES
+        }
+        self.latency_by_event: Dict[str, LatencyHistogram] = {}
+        self.failed_by_event: Dict[str, int] = {}  # Requisições sem resposta 2xx por tipo de evento
+        self.client_waits = 0  # Envios que aguardaram vaga no limite de requisições em andamento
+        self.injected: Dict[str, List[int]] = {}  # Grupo injetado -> [enviadas, aceitas]
+        self.injection_base: Dict[str, Dict[str, int]] = {}  # Resumos de outras execuções (merge)
+        self.receiver_side_effects: Optional[Dict[str, int]] = None  # Deltas do /__stats do receptor local
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+    
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+    
+    def stop(self) -> None:
+        self.finished_at = time.perf_counter()
+    
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+    
+    def record(
+        self,
+        event_type: str,
+        status_code: Optional[int] = None,
+        error: Optional[str] = None,
+        timing: Optional[RequestTiming] = None,
+    ) -> None:
+        """Registra o resultado de uma requisição (status HTTP ou nome do erro)"""
+        self.sent += 1
+        self.events[event_type] = self.events.get(event_type, 0) + 1
+        if error is not None or status_code is None or not 200 <= status_code < 300:
+            self.failed_by_event[event_type] = self.failed_by_event.get(event_type, 0) + 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        elif status_code is not None:
+            self.status_counts[status_code] = self.status_counts.get(status_code, 0) + 1
+        
+        if timing is not None:
+            # Conexões reaproveitadas não têm tempo de conexão
+            if timing.connect > 0:
+                self.latency["connect"].record(timing.connect)
+            self.latency["ttfb"].record(timing.ttfb)
+            self.latency["total"].record(timing.total)
+            if timing.scheduled is not None:
+                self.latency["scheduled"].record(timing.scheduled)
+            if event_type not in self.latency_by_event:
+                self.latency_by_event[event_type] = LatencyHistogram()
+            self.latency_by_event[event_type].record(
+                timing.scheduled if timing.scheduled is not None else timing.total
+            )
+    
+    @property
+    def response_latency(self) -> LatencyHistogram:
+        """Latência de referência: desde o instante previsto quando houver, senão a total"""
+        scheduled = self.latency.get("scheduled")
+        return scheduled if scheduled is not None and scheduled.total_count else self.latency["total"]
+    
+    def record_injected(self, tag: str, accepted: bool) -> None:
+        """Registra o resultado de uma requisição pertencente a um grupo de falhas injetadas"""
+        counts = self.injected.setdefault(tag, [0, 0])
+        counts[0] += 1
+        if accepted:
+            counts[1] += 1
+    
+    @property
+    def injection_summary(self) -> Dict[str, Dict[str, int]]:
+        """
+        Resumo por tipo de falha injetada
+        
+        Um grupo em que todas as requisições foram aceitas (2xx) é uma duplicata
+        aceita, o que não prova efeito colateral: um webhook idempotente também
+        responde 2xx à segunda entrega. Os efeitos reais (emails de ativação em
+        dobro, assinaturas sobrescritas) só aparecem no destino; contra o receptor
+        local eles ficam em receiver_side_effects.
+        """
+        summary = {kind: dict(counts) for kind, counts in self.injection_base.items()}
+        for tag, (sent, accepted) in self.injected.items():
+            kind = tag.partition(":")[0]
+            counts = summary.setdefault(kind, {
+                "groups": 0, "requests": 0, "all_accepted": 0, "partially_accepted": 0, "none_accepted": 0,
+            })
+            counts["groups"] += 1
+            counts["requests"] += sent
+            if accepted == sent:
+                counts["all_accepted"] += 1
+            elif accepted:
+                counts["partially_accepted"] += 1
+            else:
+                counts["none_accepted"] += 1
+        return summary
+    
+    @property
+    def succeeded(self) -> int:
+        return sum(count for code, count in self.status_counts.items() if 200 <= code < 300)
+    
+    @property
+    def error_rate(self) -> float:
+        """Fração de requisições sem resposta 2xx"""
+        return (self.sent - self.succeeded) / self.sent if self.sent else 0.0
+    
+    @property
+    def achieved_rps(self) -> float:
+        elapsed = self.elapsed
+        return self.sent / elapsed if elapsed > 0 else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Relatório da execução em formato JSON"""
+        return {
+            "requests": self.sent,
+            "succeeded": self.succeeded,
+            "error_rate": round(self.error_rate, 6),
+            "elapsed_s": round(self.elapsed, 3),
+            "achieved_rps": round(self.achieved_rps, 3),
+            "client_waits": self.client_waits,
+            "events": dict(sorted(self.events.items())),
+            "status_counts": {str(code): count for code, count in sorted(self.status_counts.items())},
+            "errors": dict(sorted(self.errors.items())),
+            "failed_by_event": dict(sorted(self.failed_by_event.items())),
+            "latency": {stage: histogram.to_dict() for stage, histogram in self.latency.items()},
+            "latency_by_event": {
+                event_type: histogram.to_dict()
+                for event_type, histogram in sorted(self.latency_by_event.items())
+            },
+            "injection": dict(sorted(self.injection_summary.items())),
+            **({"receiver_side_effects": self.receiver_side_effects} if self.receiver_side_effects is not None else {}),
+        }
+    
+    def merge(self, other: "LoadStats") -> None:
+        """Soma contadores e histogramas de outra execução (o tempo decorrido não é alterado)"""
+        self.sent += other.sent
+        self.client_waits += other.client_waits
+        for code, count in other.status_counts.items():
+            self.status_counts[code] = self.status_counts.get(code, 0) + count
+        for error, count in other.errors.items():
+            self.errors[error] = self.errors.get(error, 0) + count
+        for event_type, count in other.events.items():
+            self.events[event_type] = self.events.get(event_type, 0) + count
+        for event_type, count in other.failed_by_event.items():
+            self.failed_by_event[event_type] = self.failed_by_event.get(event_type, 0) + count
+        for stage, histogram in other.latency.items():
+            self.latency.setdefault(stage, LatencyHistogram()).merge(histogram)
+        for event_type, histogram in other.latency_by_event.items():
+            self.latency_by_event.setdefault(event_type, LatencyHistogram()).merge(histogram)
+        for kind, counts in other.injection_summary.items():
+            base = self.injection_base.setdefault(kind, {})
+            for key, count in counts.items():
+                base[key] = base.get(key, 0) + count
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LoadStats":
+        """Reconstrói as estatísticas a partir de to_dict()"""
+        stats = cls()
+        stats.sent = data.get("requests", 0)
+        stats.client_waits = data.get("client_waits", 0)
+        stats.status_counts = {int(code): count for code, count in data.get("status_counts", {}).items()}
+        stats.errors = dict(data.get("errors", {}))
+        stats.events = dict(data.get("events", {}))
+        stats.failed_by_event = dict(data.get("failed_by_event", {}))
+        for stage, histogram in data.get("latency", {}).items():
+            stats.latency[stage] = LatencyHistogram.from_dict(histogram)
+        for event_type, histogram in data.get("latency_by_event", {}).items():
+            stats.latency_by_event[event_type] = LatencyHistogram.from_dict(histogram)
+        stats.injection_base = {kind: dict(counts) for kind, counts in data.get("injection", {}).items()}
+        stats.receiver_side_effects = data.get("receiver_side_effects")
+        stats.started_at = 0.0
+        stats.finished_at = data.get("elapsed_s", 0.0)
+        return stats
+    
+    def print_summary(self) -> None:
+        print("\n📊 Resumo da carga")
+        print(f"   Requisições: {self.sent} em {self.elapsed:.2f}s ({self.achieved_rps:.1f} req/s)")
+        print(f"   Sucesso (2xx): {self.succeeded} | Taxa de erro: {self.error_rate * 100:.2f}%")
+        for event_type, count in sorted(self.events.items()):
+            print(f"   📋 {event_type}: {count} ({count / self.sent:.1%})")
+        for code, count in sorted(self.status_counts.items()):
+            print(f"   🔢 HTTP {code}: {count}")
+        for error, count in sorted(self.errors.items()):
+            print(f"   ❌ {error}: {count}")
+        
+        injection = self.injection_summary
+        if injection:
+            print("\n🧪 Falhas de entrega injetadas")
+            for kind, counts in sorted(injection.items()):
+                print(f"   {kind:<12} grupos: {counts['groups']} ({counts['requests']} requisições) | "
+                      f"duplicatas aceitas: {counts['all_accepted']} | parcialmente: {counts['partially_accepted']} | "
+                      f"nenhuma: {counts['none_accepted']}")
+            effects = self.receiver_side_effects
+            if effects is not None:
+                print(f"   🗂️  Efeitos no receptor local: {effects['duplicate_activation_emails']} email(s) de ativação "
+                      f"duplicado(s) | {effects['signature_overwrites']} assinatura(s) sobrescrita(s)")
+            else:
+                print("   ℹ️  Duplicatas aceitas não provam efeito colateral: um webhook idempotente também responde 2xx "
+                      "(contra o serve, os efeitos reais vêm do /__stats)")
+        
+        rows = [(stage, histogram) for stage, histogram in self.latency.items()]
+        rows += sorted(self.latency_by_event.items())
+        if not any(histogram.total_count for _, histogram in rows):
+            return
+        
+        labels = [f"p{percentile:g}" for percentile in LatencyHistogram.PERCENTILES]
+        header = "".join(f"{label:>10}" for label in labels + ["max", "média"])
+        print("\n⏱️  Latência (ms)")
+        print(f"   {'':<24}{'n':>8}{header}")
+        for name, histogram in rows:
+            if not histogram.total_count:
+                continue
+            values = [histogram.percentile_ms(p) for p in LatencyHistogram.PERCENTILES]
+            values += [histogram.max_us / 1000.0, histogram.mean_ms]
+            cells = "".join(f"{value:>10.1f}" for value in values)
+            print(f"   {name:<24}{histogram.total_count:>8}{cells}")
+        if self.latency["scheduled"].total_count:
+            print("   scheduled: medida desde o instante previsto de envio (inclui a fila; sem omissão "
+                  "coordenada); latências por evento usam essa medida")
+        if self.client_waits:
+            print(f"   ⚠️  {self.client_waits} envios aguardaram vaga no limite de requisições em andamento "
+                  f"(aumente --max-in-flight se o gargalo for o cliente)")
+
+
+def mann_whitney_histograms(baseline: LatencyHistogram, candidate: LatencyHistogram) -> Tuple[float, float]:
+    """
+    Teste U de Mann-Whitney entre dois histogramas de latência
+    
+    Registros no mesmo bucket são tratados como empates (postos médios). Usa a
+    aproximação normal com correção de empates e de continuidade.
+    
+    Returns:
+        (probabilidade de uma requisição do candidato ser mais lenta que uma da
+        base, p-valor unilateral para "o candidato é mais lento")
+    """
+    n_a, n_b = baseline.total_count, candidate.total_count
+    if not n_a or not n_b:
+        return 0.5, 1.0
+    total = n_a + n_b
+    rank_sum = 0.0
+    ties = 0.0
+    seen = 0
+    for key in sorted(set(baseline.counts) | set(candidate.counts)):
+        a, b = baseline.counts.get(key, 0), candidate.counts.get(key, 0)
+        tied = a + b
+        rank_sum += b * (seen + (tied + 1) / 2.0)
+        ties += tied ** 3 - tied
+        seen += tied
+    u = rank_sum - n_b * (n_b + 1) / 2.0
+    mean = n_a * n_b / 2.0
+    variance = n_a * n_b / 12.0 * ((total + 1) - ties / (total * (total - 1))) if total > 1 else 0.0
+    if variance <= 0:
+        return u / (n_a * n_b), 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return u / (n_a * n_b), 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def proportion_increase_p_value(failed_a: int, total_a: int, failed_b: int, total_b: int) -> float:
+    """P-valor unilateral (teste z de duas proporções) para "a taxa de erro do candidato é maior" """
+    if not total_a or not total_b:
+        return 1.0
+    pooled = (failed_a + failed_b) / (total_a + total_b)
+    variance = pooled * (1 - pooled) * (1 / total_a + 1 / total_b)
+    if variance <= 0:
+        return 1.0
+    z = (failed_b / total_b - failed_a / total_a) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def load_run_report(path: str) -> LoadStats:
+    """
+    Carrega o --report-json de uma execução (load, replay ou soak)
+    
+    Raises:
+        ValueError: Se o arquivo não for um relatório de execução
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path} não é um JSON válido: {e}")
+    if not isinstance(data, dict) or "latency_by_event" not in data:
+        raise ValueError(f"{path} não é um relatório de execução (gere com --report-json em load, replay ou soak)")
+    return LoadStats.from_dict(data)
+
+
+def compare_runs(
+    baseline: LoadStats,
+    candidate: LoadStats,
+    percentile: float = 99.0,
+    max_latency_increase: float = 0.1,
+    max_error_rate_increase: float = 0.001,
+    max_throughput_drop: Optional[float] = 0.1,
+    alpha: float = 0.01,
+    min_requests: int = 30,
+) -> Dict[str, Any]:
+    """
+    Compara duas execuções por tipo de evento e aponta as regressões
+    
+    Uma regressão de latência exige as duas condições: o percentil escolhido
+    subiu mais que `max_latency_increase` e o teste de Mann-Whitney indica que
+    a distribuição do candidato é mais lenta (p < alpha). Com muitas amostras o
+    teste acusa diferenças mínimas, e com poucas o percentil oscila à toa. A taxa
+    de erro é avaliada da mesma forma, no total e em cada tipo de evento, para que
+    uma regressão restrita a um evento de pouco volume (ex: chargeback) não se
+    dilua no total. Tipos de evento presentes em só uma das execuções são
+    marcados como ausentes e não são avaliados.
+    
+    Args:
+        baseline: Execução de referência (ex: antes do deploy)
+        candidate: Execução a avaliar (ex: depois do deploy)
+        percentile: Percentil usado no critério de latência
+        max_latency_increase: Aumento relativo tolerado do percentil (0.1 = 10%)
+        max_error_rate_increase: Aumento absoluto tolerado da taxa de erro (0.001 = 0,1 p.p.)
+        max_throughput_drop: Queda relativa tolerada da vazão total (None para não avaliar)
+        alpha: Nível de significância dos testes
+        min_requests: Mínimo de requisições de cada lado para avaliar um tipo de evento
+    
+    Returns:
+        {"events": [...], "overall": {...}, "regressions": [...]}
+    """
+    percentiles = sorted(set(LatencyHistogram.PERCENTILES) | {percentile})
+    regressions: List[str] = []
+    
+    def compare_histograms(name: str, a: LatencyHistogram, b: LatencyHistogram) -> Dict[str, Any]:
+        superiority, p_value = mann_whitney_histograms(a, b)
+        row: Dict[str, Any] = {
+            "name": name,
+            "requests": [a.total_count, b.total_count],
+            "percentiles_ms": {
+                f"p{p:g}": [a.percentile_ms(p), b.percentile_ms(p)] for p in percentiles
+            },
+            "p_slower": p_value,
+            "prob_slower": round(superiority, 4),
+            "evaluated": a.total_count >= min_requests and b.total_count >= min_requests,
+            "missing": "baseline" if not a.total_count else ("candidate" if not b.total_count else None),
+        }
+        before, after = a.percentile_ms(percentile), b.percentile_ms(percentile)
+        row["increase"] = (after - before) / before if before > 0 else 0.0
+        row["regressed"] = row["evaluated"] and row["increase"] > max_latency_increase and p_value < alpha
+        if row["regressed"]:
+            regressions.append(
+                f"{name}: p{percentile:g} {before:.1f}ms → {after:.1f}ms "
+                f"(+{row['increase']:.1%}, p={p_value:.2g})"
+            )
+        return row
+    
+    events = []
+    for event_type in sorted(set(baseline.latency_by_event) | set(candidate.latency_by_event)):
+        row = compare_histograms(
+            event_type,
+            baseline.latency_by_event.get(event_type, LatencyHistogram()),
+            candidate.latency_by_event.get(event_type, LatencyHistogram()),
+        )
+        rates = [
+            stats.events.get(event_type, 0) / stats.elapsed if stats.elapsed > 0 else 0.0
+            for stats in (baseline, candidate)
+        ]
+        row["rps"] = [round(rate, 3) for rate in rates]
+        failed = [stats.failed_by_event.get(event_type, 0) for stats in (baseline, candidate)]
+        sent = [stats.events.get(event_type, 0) for stats in (baseline, candidate)]
+        row["error_rate"] = [f / s if s else 0.0 for f, s in zip(failed, sent)]
+        row["error_p_value"] = proportion_increase_p_value(failed[0], sent[0], failed[1], sent[1])
+        row["error_regressed"] = (
+            all(sent)
+            and row["error_rate"][1] - row["error_rate"][0] > max_error_rate_increase
+            and row["error_p_value"] < alpha
+        )
+        if row["error_regressed"]:
+            regressions.append(
+                f"{event_type}: taxa de erro {row['error_rate'][0]:.3%} → {row['error_rate'][1]:.3%} "
+                f"(p={row['error_p_value']:.2g})"
+            )
+        events.append(row)
+    
+    overall = compare_histograms("total", baseline.response_latency, candidate.response_latency)
+    overall["rps"] = [round(baseline.achieved_rps, 3), round(candidate.achieved_rps, 3)]
+    overall["error_rate"] = [baseline.error_rate, candidate.error_rate]
+    overall["error_p_value"] = proportion_increase_p_value(
+        baseline.sent - baseline.succeeded, baseline.sent, candidate.sent - candidate.succeeded, candidate.sent
+    )
+    error_increase = candidate.error_rate - baseline.error_rate
+    overall["error_regressed"] = error_increase > max_error_rate_increase and overall["error_p_value"] < alpha
+    if overall["error_regressed"]:
+        regressions.append(
+            f"taxa de erro {baseline.error_rate:.3%} → {candidate.error_rate:.3%} (p={overall['error_p_value']:.2g})"
+        )
+    if max_throughput_drop is not None and baseline.achieved_rps > 0:
+        drop = 1 - candidate.achieved_rps / baseline.achieved_rps
+        if drop > max_throughput_drop:
+            regressions.append(
+                f"vazão {baseline.achieved_rps:.1f} → {candidate.achieved_rps:.1f} req/s (-{drop:.1%})"
+            )
+    
+    return {
+        "criteria": {
+            "percentile": percentile,
+            "max_latency_increase": max_latency_increase,
+            "max_error_rate_increase": max_error_rate_increase,
+            "max_throughput_drop": max_throughput_drop,
+            "alpha": alpha,
+            "min_requests": min_requests,
+        },
+        "events": events,
+        "overall": overall,
+        "regressions": regressions,
+    }
+
+
+def print_comparison(comparison: Dict[str, Any]) -> None:
+    """Exibe a tabela de deltas de compare_runs"""
+    criteria = comparison["criteria"]
+    gate = f"p{criteria['percentile']:g}"
+    print("\n⚖️  Comparação (base → candidato)")
+    print(f"   {'':<24}{'n':>14}{gate + ' (ms)':>22}{'Δ':>9}{'p-valor':>10}{'req/s':>18}{'erros':>20}")
+    for row in comparison["events"] + [comparison["overall"]]:
+        before, after = row["percentiles_ms"][gate]
+        requests_cell = f"{row['requests'][0]}→{row['requests'][1]}"
+        latency_cell = f"{before:.1f} → {after:.1f}"
+        rps_cell = f"{row['rps'][0]:.1f} → {row['rps'][1]:.1f}"
+        error_cell = f"{row['error_rate'][0]:.2%} → {row['error_rate'][1]:.2%}"
+        if row["regressed"] or row["error_regressed"]:
+            mark = "❌"
+        else:
+            mark = "  " if row["evaluated"] else " ·"
+        if row["missing"]:
+            side = "na base" if row["missing"] == "baseline" else "no candidato"
+            print(f"   {row['name']:<24}{requests_cell:>14}{'ausente ' + side:>41}{rps_cell:>18}{error_cell:>20}")
+            continue
+        print(f"   {row['name']:<24}{requests_cell:>14}{latency_cell:>22}{row['increase']:>+9.1%}"
+              f"{row['p_slower']:>10.2g}{rps_cell:>18}{error_cell:>20} {mark}")
+    print(f"   · poucas requisições (< {criteria['min_requests']}) para avaliar a latência")
+    
+    if comparison["regressions"]:
+        print(f"\n❌ Regressões (limite: {gate} +{criteria['max_latency_increase']:.0%}, "
+              f"erros +{criteria['max_error_rate_increase']:.2%}, α={criteria['alpha']:g})")
+        for regression in comparison["regressions"]:
+            print(f"   - {regression}")
+    else:
+        print("\n✅ Sem regressões significativas")
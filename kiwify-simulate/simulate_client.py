@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Cliente leve do daemon do simulador (python simulate_webhook.py daemon)
+
+Repassa ao daemon, por um socket Unix, os mesmos argumentos dos subcomandos
+approved/renewed/canceled/chargeback e repete a saída e o código de saída do
+comando. Usa apenas a biblioteca padrão, para não pagar a importação do requests
+nem a montagem do argparse a cada evento. Se o daemon não estiver no ar, executa
+o simulate_webhook.py diretamente com os mesmos argumentos.
+
+Uso:
+    python simulate_client.py approved --email usuario@example.com --secret-key 3ienivdzi7c
+    python simulate_client.py stop
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+# Mesmo padrão de DEFAULT_DAEMON_SOCKET em kiwify_sim/daemon.py
+DEFAULT_DAEMON_SOCKET = os.path.join(tempfile.gettempdir(), "kiwify-simulate.sock")
+
+
+def request_daemon(path: str, message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Envia uma mensagem ao daemon e aguarda a resposta
+    
+    Raises:
+        OSError: Se o daemon não estiver escutando em `path`
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        chunks = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    return json.loads(b"".join(chunks) or b"{}")
+
+
+def main(argv: List[str]) -> int:
+    path = os.environ.get("KIWIFY_SIMULATE_SOCKET", DEFAULT_DAEMON_SOCKET)
+    stop = argv == ["stop"]
+    try:
+        response = request_daemon(path, {"command": "stop"} if stop else {"argv": argv})
+    except (OSError, AttributeError):
+        # Sem daemon (ou sem suporte a sockets Unix): executa o simulador diretamente
+        if stop:
+            print(f"ℹ️  Nenhum daemon escutando em {path}")
+            return 1
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulate_webhook.py")
+        os.execv(sys.executable, [sys.executable, script] + argv)
+    sys.stdout.write(response.get("output", ""))
+    return response.get("exit_code", 1)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
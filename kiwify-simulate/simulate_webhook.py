@@ -6,548 +6,891 @@ Permite testar os eventos order_approved, subscription_renewed, subscription_can
 
 import json
 import sys
+import time
+import random
+import asyncio
 import argparse
-import uuid
-import hmac
-import hashlib
+import os
+import socket
 import requests
-from datetime import datetime
-from typing import Dict, Any, Optional
-from enum import Enum
-from urllib.parse import urlencode, urlparse, urlunparse, parse_qs
-
-
-class EventType(Enum):
-    """Tipos de eventos suportados (formato real da Kiwify)"""
-    ORDER_APPROVED = "order_approved"
-    SUBSCRIPTION_RENEWED = "subscription_renewed"
-    SUBSCRIPTION_CANCELED = "subscription_canceled"
-    CHARGEBACK = "chargeback"
-
-
-# Mapeamento de planos
-PLAN_MAPPING = {
-    "STARTER": {
-        "name": "Iniciante",
-        "product_id": "kiwify-product-starter-id",
-    },
-    "SCALING": {
-        "name": "Escalando",
-        "product_id": "kiwify-product-scaling-id",
-    },
-    "SCALED": {
-        "name": "Escalado",
-        "product_id": "kiwify-product-scaled-id",
-    },
-}
-
-
-def generate_order_id() -> str:
-    """Gera um ID de pedido simulado no formato UUID"""
-    return str(uuid.uuid4())
-
-
-def generate_customer_id() -> str:
-    """Gera um ID de cliente simulado no formato UUID"""
-    return str(uuid.uuid4())
-
-
-def create_order_approved_payload(
-    email: str,
-    plan_id: str = "STARTER",
-    order_id: Optional[str] = None,
-    customer_id: Optional[str] = None,
-    product_id: Optional[str] = None,
-    product_name: Optional[str] = None,
-    amount: Optional[float] = None,
-    subscription_id: Optional[str] = None,
-) -> Dict[str, Any]:
-    """
-    Cria payload para evento order_approved (formato real da Kiwify)
-    
-    Args:
-        email: Email do cliente
-        plan_id: ID do plano (STARTER, SCALING, SCALED)
-        order_id: ID do pedido (opcional, será gerado se não fornecido)
-        customer_id: ID do cliente (opcional, será gerado se não fornecido)
-        product_id: ID do produto na Kiwify (opcional)
-        product_name: Nome do produto (opcional)
-        amount: Valor do pedido em centavos (opcional, será convertido)
-        subscription_id: ID da assinatura (opcional)
-    """
-    plan = PLAN_MAPPING.get(plan_id, PLAN_MAPPING["STARTER"])
-    
-    # Valores padrão para preços em centavos
-    prices_cents = {
-        "STARTER": 4700,
-        "SCALING": 6700,
-        "SCALED": 9700,
-    }
-    
-    amount_cents = int((amount * 100) if amount else prices_cents.get(plan_id, 4700))
-    order_id_val = order_id or generate_order_id()
-    customer_id_val = customer_id or generate_customer_id()
-    subscription_id_val = subscription_id or str(uuid.uuid4())
-    product_id_val = product_id or plan["product_id"]
-    
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-    iso_now = datetime.now().isoformat() + "Z"
-    
-    return {
-        "order_id": order_id_val,
-        "order_ref": f"REF{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        "order_status": "paid",
-        "product_type": "membership",
-        "payment_method": "credit_card",
-        "store_id": "test_store_id",
-        "payment_merchant_id": 12345678,
-        "installments": 1,
-        "card_type": "mastercard",
-        "card_last4digits": "1234",
-        "card_rejection_reason": None,
-        "boleto_URL": None,
-        "boleto_barcode": None,
-        "boleto_expiry_date": None,
-        "pix_code": None,
-        "pix_expiration": None,
-        "sale_type": "producer",
-        "created_at": now_str,
-        "updated_at": now_str,
-        "approved_date": now_str,
-        "refunded_at": None,
-        "webhook_event_type": EventType.ORDER_APPROVED.value,
-        "Product": {
-            "product_id": product_id_val,
-            "product_name": product_name or plan["name"],
-        },
-        "Customer": {
-            "full_name": email.split("@")[0].title(),
-            "first_name": email.split("@")[0].split(".")[0].title(),
-            "email": email,
-            "mobile": "+5511999999999",
-            "cnpj": None,
-            "ip": "192.168.1.1",
-            "instagram": None,
-            "street": None,
-            "number": None,
-            "complement": None,
-            "neighborhood": None,
-            "city": None,
-            "state": None,
-            "zipcode": None,
-        },
-        "Commissions": {
-            "charge_amount": amount_cents,
-            "product_base_price": amount_cents,
-            "product_base_price_currency": "BRL",
-            "kiwify_fee": int(amount_cents * 0.11),
-            "kiwify_fee_currency": "BRL",
-            "settlement_amount": amount_cents,
-            "settlement_amount_currency": "BRL",
-            "sale_tax_rate": 0,
-            "sale_tax_amount": 0,
-            "currency": "BRL",
-            "my_commission": int(amount_cents * 0.89),
-        },
-        "TrackingParameters": {},
-        "Subscription": {
-            "id": subscription_id_val,
-            "start_date": iso_now,
-            "next_payment": iso_now,
-            "status": "active",
-            "plan": {
-                "id": str(uuid.uuid4()),
-                "name": plan["name"],
-                "frequency": "monthly",
-                "qty_charges": 0,
-            },
-            "charges": {
-                "completed": [
-                    {
-                        "order_id": order_id_val,
-                        "amount": amount_cents,
-                        "status": "paid",
-                        "installments": 1,
-                        "card_type": "mastercard",
-                        "card_last_digits": "1234",
-                        "card_first_digits": "123456",
-                        "created_at": iso_now,
-                    }
-                ],
-                "future": [],
-            },
-        },
-        "subscription_id": subscription_id_val,
-        "access_url": None,
-    }
-
-
-def create_subscription_canceled_payload(
-    email: str,
-    order_id: Optional[str] = None,
-    customer_id: Optional[str] = None,
-    subscription_id: Optional[str] = None,
-) -> Dict[str, Any]:
-    """
-    Cria payload para evento subscription_canceled (formato real da Kiwify)
-    
-    Args:
-        email: Email do cliente
-        order_id: ID do pedido (opcional)
-        customer_id: ID do cliente (opcional)
-        subscription_id: ID da assinatura (opcional)
-    """
-    order_id_val = order_id or generate_order_id()
-    customer_id_val = customer_id or generate_customer_id()
-    subscription_id_val = subscription_id or str(uuid.uuid4())
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-    iso_now = datetime.now().isoformat() + "Z"
-    
-    return {
-        "order_id": order_id_val,
-        "order_ref": f"REF{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        "order_status": "refunded",
-        "product_type": "membership",
-        "payment_method": "credit_card",
-        "store_id": "test_store_id",
-        "payment_merchant_id": 12345678,
-        "installments": 1,
-        "card_type": "mastercard",
-        "card_last4digits": "1234",
-        "card_rejection_reason": None,
-        "boleto_URL": None,
-        "boleto_barcode": None,
-        "boleto_expiry_date": None,
-        "pix_code": None,
-        "pix_expiration": None,
-        "sale_type": "producer",
-        "created_at": now_str,
-        "updated_at": now_str,
-        "approved_date": None,
-        "refunded_at": now_str,
-        "webhook_event_type": EventType.SUBSCRIPTION_CANCELED.value,
-        "Product": {
-            "product_id": str(uuid.uuid4()),
-            "product_name": "Example product",
-        },
-        "Customer": {
-            "full_name": email.split("@")[0].title(),
-            "first_name": email.split("@")[0].split(".")[0].title(),
-            "email": email,
-            "mobile": "+5511999999999",
-        },
-        "Commissions": {
-            "charge_amount": 0,
-            "currency": "BRL",
-        },
-        "TrackingParameters": {},
-        "Subscription": {
-            "id": subscription_id_val,
-            "start_date": iso_now,
-            "next_payment": iso_now,
-            "status": "canceled",
-            "plan": {
-                "id": str(uuid.uuid4()),
-                "name": "Example plan",
-                "frequency": "monthly",
-                "qty_charges": 0,
-            },
-            "charges": {
-                "completed": [],
-                "future": [
-                    {
-                        "charge_date": iso_now,
-                    }
-                ],
-            },
-        },
-        "subscription_id": subscription_id_val,
-    }
-
-
-def create_subscription_renewed_payload(
-    email: str,
-    order_id: Optional[str] = None,
-    customer_id: Optional[str] = None,
-    subscription_id: Optional[str] = None,
-    amount: Optional[float] = None,
-) -> Dict[str, Any]:
-    """
-    Cria payload para evento subscription_renewed (formato real da Kiwify)
-    
-    Args:
-        email: Email do cliente
-        order_id: ID do pedido (opcional)
-        customer_id: ID do cliente (opcional)
-        subscription_id: ID da assinatura (opcional)
-        amount: Valor do pedido em reais (opcional, será convertido para centavos)
-    """
-    order_id_val = order_id or generate_order_id()
-    customer_id_val = customer_id or generate_customer_id()
-    subscription_id_val = subscription_id or str(uuid.uuid4())
-    amount_cents = int((amount * 100) if amount else 4700)
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-    iso_now = datetime.now().isoformat() + "Z"
-    
-    return {
-        "order_id": order_id_val,
-        "order_ref": f"REF{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        "order_status": "paid",
-        "product_type": "membership",
-        "payment_method": "credit_card",
-        "store_id": "test_store_id",
-        "payment_merchant_id": 12345678,
-        "installments": 1,
-        "card_type": "mastercard",
-        "card_last4digits": "1234",
-        "card_rejection_reason": None,
-        "boleto_URL": None,
-        "boleto_barcode": None,
-        "boleto_expiry_date": None,
-        "pix_code": None,
-        "pix_expiration": None,
-        "sale_type": "producer",
-        "created_at": now_str,
-        "updated_at": now_str,
-        "approved_date": None,
-        "refunded_at": None,
-        "webhook_event_type": EventType.SUBSCRIPTION_RENEWED.value,
-        "Product": {
-            "product_id": str(uuid.uuid4()),
-            "product_name": "Example product",
-        },
-        "Customer": {
-            "full_name": email.split("@")[0].title(),
-            "first_name": email.split("@")[0].split(".")[0].title(),
-            "email": email,
-            "mobile": "+5511999999999",
-        },
-        "Commissions": {
-            "charge_amount": amount_cents,
-            "product_base_price": amount_cents,
-            "product_base_price_currency": "BRL",
-            "kiwify_fee": int(amount_cents * 0.11),
-            "currency": "BRL",
-            "my_commission": int(amount_cents * 0.89),
-        },
-        "TrackingParameters": {},
-        "Subscription": {
-            "id": subscription_id_val,
-            "start_date": iso_now,
-            "next_payment": iso_now,
-            "status": "active",
-            "plan": {
-                "id": str(uuid.uuid4()),
-                "name": "Example plan",
-                "frequency": "monthly",
-                "qty_charges": 0,
-            },
-            "charges": {
-                "completed": [
-                    {
-                        "order_id": order_id_val,
-                        "amount": amount_cents,
-                        "status": "paid",
-                        "installments": 1,
-                        "card_type": "mastercard",
-                        "card_last_digits": "1234",
-                        "card_first_digits": "123456",
-                        "created_at": iso_now,
-                    }
-                ],
-                "future": [
-                    {
-                        "charge_date": iso_now,
-                    }
-                ],
-            },
-        },
-        "subscription_id": subscription_id_val,
-    }
-
-
-def create_chargeback_payload(
-    email: str,
-    order_id: Optional[str] = None,
-    customer_id: Optional[str] = None,
-    subscription_id: Optional[str] = None,
-    amount: Optional[float] = None,
-) -> Dict[str, Any]:
-    """
-    Cria payload para evento chargeback (formato real da Kiwify)
-    
-    Args:
-        email: Email do cliente
-        order_id: ID do pedido (opcional)
-        customer_id: ID do cliente (opcional)
-        subscription_id: ID da assinatura (opcional)
-        amount: Valor do pedido em reais (opcional, será convertido para centavos)
-    """
-    order_id_val = order_id or generate_order_id()
-    customer_id_val = customer_id or generate_customer_id()
-    subscription_id_val = subscription_id or str(uuid.uuid4())
-    amount_cents = int((amount * 100) if amount else 4700)
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-    iso_now = datetime.now().isoformat() + "Z"
-    
-    return {
-        "order_id": order_id_val,
-        "order_ref": f"REF{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        "order_status": "chargedback",
-        "product_type": "membership",
-        "payment_method": "credit_card",
-        "store_id": "test_store_id",
-        "payment_merchant_id": 12345678,
-        "installments": 1,
-        "card_type": "mastercard",
-        "card_last4digits": "1234",
-        "card_rejection_reason": None,
-        "boleto_URL": None,
-        "boleto_barcode": None,
-        "boleto_expiry_date": None,
-        "pix_code": None,
-        "pix_expiration": None,
-        "sale_type": "producer",
-        "created_at": now_str,
-        "updated_at": now_str,
-        "approved_date": None,
-        "refunded_at": None,
-        "webhook_event_type": EventType.CHARGEBACK.value,
-        "Product": {
-            "product_id": str(uuid.uuid4()),
-            "product_name": "Example product",
-        },
-        "Customer": {
-            "full_name": email.split("@")[0].title(),
-            "first_name": email.split("@")[0].split(".")[0].title(),
-            "email": email,
-            "mobile": "+5511999999999",
-        },
-        "Commissions": {
-            "charge_amount": amount_cents,
-            "product_base_price": amount_cents,
-            "currency": "BRL",
-        },
-        "TrackingParameters": {},
-        "Subscription": {
-            "id": subscription_id_val,
-            "start_date": iso_now,
-            "next_payment": iso_now,
-            "status": "active",
-            "plan": {
-                "id": str(uuid.uuid4()),
-                "name": "Example plan",
-                "frequency": "monthly",
-                "qty_charges": 0,
-            },
-            "charges": {
-                "completed": [
-                    {
-                        "order_id": order_id_val,
-                        "amount": amount_cents,
-                        "status": "paid",
-                        "installments": 1,
-                        "card_type": "mastercard",
-                        "card_last_digits": "1234",
-                        "created_at": iso_now,
-                    }
-                ],
-                "future": [
-                    {
-                        "charge_date": iso_now,
-                    }
-                ],
-            },
-        },
-        "subscription_id": subscription_id_val,
-    }
-
-
-def calculate_signature(payload: Dict[str, Any], secret_key: str) -> str:
-    """
-    Calcula a assinatura HMAC SHA1 do payload
-    
-    Args:
-        payload: Payload JSON
-        secret_key: Chave secreta da Kiwify
-    
-    Returns:
-        Assinatura hexadecimal
-    """
-    payload_json = json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
-    signature = hmac.new(
-        secret_key.encode('utf-8'),
-        payload_json.encode('utf-8'),
-        hashlib.sha1
-    ).hexdigest()
-    return signature
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator, Iterable
+
+from kiwify_sim.payloads import (
+    DEFAULT_WEBHOOK_URL, EVENT_COMMANDS, create_order_approved_payload, create_subscription_canceled_payload,
+    create_subscription_renewed_payload, create_chargeback_payload, PreparedEvent,
+)
+from kiwify_sim.scenarios import DEFAULT_EVENT_MIX, CAPACITY_EVENT_MIX
+from kiwify_sim.providers import DEFAULT_PROVIDER_MIX
+from kiwify_sim.event_files import write_event_file, iter_event_file, verify_event_file
+from kiwify_sim.senders import WebhookSender, create_sender, signed_request
+from kiwify_sim.stats import EventLog, LoadStats, load_run_report, compare_runs, print_comparison
+from kiwify_sim.metrics import SoakMonitor
+from kiwify_sim.runner import (
+    build_scenario_events, DEFAULT_CONCURRENCY, warn_mix_deviation, write_report_json, run_with_sender,
+    sender_options, say, event_log_path, fetch_receiver_store, measure_receiver_side_effects, finish_run,
+    pacing_from_args, model_options, faults_from_args, validate_faults, describe_faults, describe_pacing,
+    execute_run, run_sharded_replay,
+)
+from kiwify_sim.distributed import is_loopback_address, parse_address, LoadCoordinator, run_load_agent
+from kiwify_sim.capacity import CapacityStep, find_capacity, latency_inflection
+from kiwify_sim.benchmarks import (
+    benchmark_signatures, print_signature_benchmark, payload_bench_cases, benchmark_payload_sizes, latency_slope,
+)
+from kiwify_sim.coldstart import ColdStartProbe, ColdStartProber, summarize_cold_starts
+from kiwify_sim.receiver import InMemorySignatureStore, InstancePool, KiwifyReceiver, run_receiver
+from kiwify_sim.capture import CaptureLog, is_capture_file, iter_capture_events, RecordingProxy, run_recording_proxy
+from kiwify_sim.daemon import DEFAULT_DAEMON_SOCKET, SimulatorDaemon
+
+try:
+    import httpx  # Cliente HTTP/2 opcional: pip install "httpx[http2]"
+except ImportError:
+    httpx = None
 
 
 def send_webhook(
     url: str,
     payload: Dict[str, Any],
     secret_key: str,
+    sender: Optional[WebhookSender] = None,
+    show_payload: bool = False,
+    output: str = "summary",
 ) -> requests.Response:
     """
     Envia webhook para o endpoint especificado com assinatura HMAC
     
+    O payload é serializado uma única vez; os mesmos bytes são assinados e
+    enviados como corpo da requisição.
+    
     Args:
         url: URL do endpoint do webhook
         payload: Payload JSON a ser enviado
         secret_key: Chave secreta da Kiwify para calcular a assinatura
+        sender: Sender com pool de conexões (opcional, um temporário é criado se omitido)
+        show_payload: Exibe o payload formatado antes do envio (equivale a output="verbose")
+        output: "quiet" (nada), "summary" (uma linha de resultado) ou "verbose"
+            (dados da requisição, payload e resposta formatados, para depuração)
     
     Returns:
         Response da requisição HTTP
     """
-    # Calcula a assinatura HMAC SHA1
-    signature = calculate_signature(payload, secret_key)
-    
-    # Adiciona a assinatura como query parameter
-    parsed_url = urlparse(url)
-    query_params = parse_qs(parsed_url.query)
-    query_params['signature'] = signature
-    new_query = urlencode(query_params, doseq=True)
-    signed_url = urlunparse((
-        parsed_url.scheme,
-        parsed_url.netloc,
-        parsed_url.path,
-        parsed_url.params,
-        new_query,
-        parsed_url.fragment
-    ))
-    
-    headers = {
-        "Content-Type": "application/json",
-    }
-    
-    print(f"\n📤 Enviando webhook para: {url}")
-    print(f"🔑 Chave secreta: {secret_key[:10]}...")
-    print(f"✍️  Assinatura: {signature[:20]}...")
-    print(f"📋 Evento: {payload.get('webhook_event_type')}")
+    if show_payload:
+        output = "verbose"
+    signed_url, body, signature = signed_request(url, payload, secret_key)
+    
+    event_type = payload.get('webhook_event_type')
     customer_email = payload.get('Customer', {}).get('email', 'N/A')
-    print(f"📧 Email: {customer_email}")
-    print(f"\n📦 Payload:")
-    print(json.dumps(payload, indent=2, ensure_ascii=False))
+    if output == "verbose":
+        print(f"\n📤 Enviando webhook para: {url}")
+        print(f"🔑 Chave secreta: {secret_key[:10]}...")
+        print(f"✍️  Assinatura: {signature[:20]}...")
+        print(f"📋 Evento: {event_type}")
+        print(f"📧 Email: {customer_email}")
+        print(f"📏 Tamanho do corpo: {len(body)} bytes")
+        print(f"\n📦 Payload:")
+        print(json.dumps(payload, indent=2, ensure_ascii=False))
     
     try:
-        response = requests.post(signed_url, json=payload, headers=headers, timeout=30)
+        if sender is not None:
+            response, timing = sender.post(signed_url, data=body)
+        else:
+            with WebhookSender(pool_size=1) as one_shot_sender:
+                response, timing = one_shot_sender.post(signed_url, data=body)
         
-        print(f"\n✅ Status Code: {response.status_code}")
-        print(f"📄 Response:")
-        try:
-            response_json = response.json()
-            print(json.dumps(response_json, indent=2, ensure_ascii=False))
-        except ValueError:
-            print(response.text)
+        if output == "summary":
+            print(f"📤 {event_type} {customer_email} → HTTP {response.status_code} "
+                  f"em {timing.total * 1000:.1f} ms ({len(body)} bytes)")
+        elif output == "verbose":
+            print(f"\n✅ Status Code: {response.status_code}")
+            print(f"⏱️  Tempo: total {timing.total * 1000:.1f} ms "
+                  f"(conexão {timing.connect * 1000:.1f} ms, TTFB {timing.ttfb * 1000:.1f} ms)")
+            print(f"📄 Response:")
+            try:
+                response_json = response.json()
+                print(json.dumps(response_json, indent=2, ensure_ascii=False))
+            except ValueError:
+                print(response.text)
         
         return response
     except requests.exceptions.RequestException as e:
-        print(f"\n❌ Erro ao enviar webhook: {e}")
+        if output != "quiet":
+            print(f"\n❌ Erro ao enviar webhook: {e}")
         raise
 
 
-def main():
-    """Função principal"""
+# Modos de saída dos comandos
+OUTPUT_MODES = ("quiet", "summary", "verbose")
+
+
+def run_serve_command(args: argparse.Namespace) -> int:
+    """Executa o subcomando serve: receptor local do webhook"""
+    if args.latency < 0 or args.store_latency < 0 or (args.task_latency or 0) < 0 or not 0 <= args.jitter <= 1:
+        print("❌ --latency, --store-latency e --task-latency devem ser positivas e --jitter deve estar entre 0 e 1")
+        return 1
+    if args.cold_start < 0 or args.idle_timeout <= 0:
+        print("❌ --cold-start deve ser positivo e --idle-timeout maior que zero")
+        return 1
+    
+    store = InMemorySignatureStore(
+        latency=args.store_latency / 1000.0,
+        jitter=args.jitter,
+        seed=args.seed,
+        task_latency=args.task_latency / 1000.0 if args.task_latency is not None else None,
+    )
+    receiver = KiwifyReceiver(
+        args.secret_key,
+        store=store,
+        latency=args.latency / 1000.0,
+        jitter=args.jitter,
+        seed=args.seed,
+        tiktok_secret=args.tiktok_secret,
+        instances=InstancePool(args.cold_start / 1000.0, args.idle_timeout, jitter=args.jitter,
+                               rng=random.Random(args.seed)) if args.cold_start > 0 else None,
+    )
+    print(f"🛰️  Receptor local em: http://{args.host}:{args.port}/kiwifyWebhook "
+          f"(também /tiktokWebhook e /saleWebhook)")
+    print(f"   Latência por requisição: {args.latency:g}ms | por operação no armazenamento: "
+          f"{args.store_latency:g}ms | jitter: {args.jitter:.0%}")
+    if args.cold_start > 0:
+        print(f"   Cold start: {args.cold_start:g}ms por instância nova | instâncias recolhidas após "
+              f"{args.idle_timeout:g}s ociosas")
+    print(f"   Estatísticas: http://{args.host}:{args.port}/__stats (Ctrl+C para encerrar)")
+    try:
+        asyncio.run(run_receiver(receiver, args.host, args.port, duration=args.duration))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"❌ Não foi possível escutar em {args.host}:{args.port}: {e}")
+        return 1
+    receiver.print_summary()
+    return 0
+
+
+def run_record_command(args: argparse.Namespace) -> int:
+    """Executa o subcomando record: proxy reverso que grava as entregas reais"""
+    if args.timeout <= 0 or args.pool_size < 1:
+        print("❌ --timeout deve ser maior que zero e --pool-size maior ou igual a 1")
+        return 1
+    log = CaptureLog(args.output)
+    already = log.records
+    proxy = RecordingProxy(args.target, log, timeout=args.timeout, pool_size=args.pool_size)
+    print(f"🎙️  Proxy de gravação em: http://{args.host}:{args.port} → {args.target}")
+    print(f"   Captura: {args.output} (índice: {args.output}.idx"
+          f"{f', continuando após {already} registros' if already else ''}) | Ctrl+C para encerrar")
+    try:
+        asyncio.run(run_recording_proxy(proxy, args.host, args.port, duration=args.duration))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"❌ Não foi possível escutar em {args.host}:{args.port}: {e}")
+        return 1
+    finally:
+        proxy.close()
+        log.close()
+    
+    print(f"\n💾 {log.records - already} entregas gravadas ({log.records} na captura, "
+          f"{log.offset / 1024:.1f} KB comprimidos)")
+    print(f"   Repassadas: {proxy.forwarded} | Falhas no destino: {proxy.failed}")
+    for code, count in sorted(proxy.status_counts.items()):
+        print(f"   🔢 HTTP {code}: {count}")
+    print(f"   Reenvie com: python simulate_webhook.py replay --file {args.output} --timing original")
+    return 0
+
+
+def run_verify_command(args: argparse.Namespace) -> int:
+    """Executa o subcomando verify: confere as assinaturas de um arquivo NDJSON"""
+    if not Path(args.file).is_file():
+        print(f"❌ Arquivo não encontrado: {args.file}")
+        return 1
+    if args.processes < 1:
+        print("❌ --processes deve ser maior ou igual a 1")
+        return 1
+    
+    mode = "JSON reserializado, como o backend" if args.mirror_backend else "bytes gravados"
+    print(f"🔏 Verificando {args.file} com {args.processes} processo(s) ({mode})")
+    report = verify_event_file(
+        args.file,
+        args.secret_key,
+        processes=args.processes,
+        reserialize=args.mirror_backend,
+        max_samples=args.show_invalid,
+    )
+    report.print_summary()
+    if args.report_json:
+        write_report_json(args.report_json, report.to_dict())
+    return 0 if report.total and report.valid == report.total else 1
+
+
+def run_bench_signature_command(args: argparse.Namespace) -> int:
+    """Executa o subcomando bench-signature: vazão de assinatura e verificação"""
+    try:
+        event_types = [EVENT_COMMANDS[name.strip()] for name in args.events.split(",") if name.strip()]
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()] if args.sizes else []
+    except (KeyError, ValueError) as e:
+        print(f"❌ Opção inválida: {e} (eventos: {', '.join(EVENT_COMMANDS)}; tamanhos em bytes)")
+        return 1
+    
+    print(f"⏱️  Medindo {len(event_types)} evento(s) x {len(sizes) + 1} tamanho(s), {args.seconds:g}s por caso")
+    rows = benchmark_signatures(args.secret_key, event_types, sizes=sizes, seconds=args.seconds)
+    print_signature_benchmark(rows)
+    if args.report_json:
+        write_report_json(args.report_json, {"seconds_per_case": args.seconds, "results": rows})
+    return 0
+
+
+def run_bench_payload_command(args: argparse.Namespace, url: str) -> int:
+    """Executa o subcomando bench-payload: latência e assinatura conforme o tamanho do payload"""
+    try:
+        dimensions = [
+            [int(value) for value in option.split(",") if value.strip()]
+            for option in (args.charges, args.tracking, args.name_length)
+        ]
+    except ValueError as e:
+        print(f"❌ Opção inválida: {e} (listas de inteiros separados por vírgula)")
+        return 1
+    if not all(dimensions) or any(value < 0 for values in dimensions for value in values):
+        print("❌ --charges, --tracking e --name-length precisam de ao menos um valor >= 0")
+        return 1
+    if args.requests < 1 or args.concurrency < 1:
+        print("❌ --requests e --concurrency devem ser >= 1")
+        return 1
+    try:
+        sender = create_sender(**sender_options(args))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    cases = payload_bench_cases(*dimensions, grid=args.grid)
+    print(f"\n📦 Escalando o payload de {args.event_type} contra: {url}")
+    print(f"   {len(cases)} caso(s) x {args.requests} requisições, {args.concurrency} simultânea(s)")
+    print(f"   {'cobranças':>10}{'rastreio':>10}{'nome':>8}{'bytes':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}"
+          f"{'2xx':>6}{'401':>6}{'outros':>8}{'local (µs)':>12}")
+    
+    def show_case(row: Dict[str, Any]) -> None:
+        icon = "✅" if row["accepted"] == row["requests"] else ("🔏" if row["signature_rejected"] else "⚠️ ")
+        print(f"   {row['charges']:>10}{row['tracking_chars']:>10}{row['name_chars']:>8}{row['bytes']:>10,}"
+              f"{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['accepted']:>6}{row['signature_rejected']:>6}"
+              f"{row['other_failures']:>8}{row['local_verify_json_us']:>12.1f}  {icon}")
+    
+    try:
+        rows = asyncio.run(run_with_sender(sender, benchmark_payload_sizes(
+            url,
+            sender,
+            args.secret_key,
+            EVENT_COMMANDS[args.event_type],
+            cases,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            seed=args.seed,
+            on_case=show_case,
+        )))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    slope = latency_slope(rows)
+    if slope is not None:
+        print(f"\n📈 Latência p50 cresce ~{slope:.3f}ms por KB de corpo "
+              f"(reserialização + HMAC locais: ~{latency_slope(rows, 'local_verify_json_us'):.1f}µs por KB)")
+    rejected = [row for row in rows if row["signature_rejected"]]
+    if any(not row["roundtrip_ok"] for row in rows):
+        print("❌ A reserialização local não reproduz o corpo enviado: a assinatura do backend não vai bater")
+    if rejected:
+        print(f"🔏 Assinaturas recusadas (401) a partir de {min(row['bytes'] for row in rejected):,} bytes: "
+              "confira limites de corpo e a reserialização do JSON no backend")
+    elif rows:
+        print("✅ Nenhuma assinatura recusada em nenhum tamanho")
+    
+    if args.report_json:
+        write_report_json(args.report_json, {
+            "event": EVENT_COMMANDS[args.event_type].value,
+            "requests_per_case": args.requests,
+            "concurrency": args.concurrency,
+            "p50_ms_per_kb": round(slope, 4) if slope is not None else None,
+            "results": rows,
+        })
+    return 1 if rejected else 0
+
+
+def run_coldstart_command(args: argparse.Namespace, url: str) -> int:
+    """Executa o subcomando coldstart: sonda de cold starts por ociosidade e rajadas"""
+    try:
+        gaps = sorted(float(value) for value in args.gaps.split(",") if value.strip())
+        bursts = [int(value) for value in args.bursts.split(",") if value.strip()] if args.bursts else []
+    except ValueError as e:
+        print(f"❌ Opção inválida: {e} (listas de números separados por vírgula)")
+        return 1
+    if any(gap < 0 for gap in gaps) or any(burst < 1 for burst in bursts) or args.repeats < 1 or args.warmup < 1:
+        print("❌ --gaps devem ser >= 0, --bursts >= 1 e --repeats e --warmup >= 1")
+        return 1
+    
+    total_idle = sum(gaps) * args.repeats + args.burst_idle * len(bursts)
+    print(f"\n🧊 Sondando cold starts de: {url}")
+    print(f"   Ociosidade: {', '.join(f'{gap:g}s' for gap in gaps)} x {args.repeats} | rajadas: "
+          f"{', '.join(map(str, bursts)) or 'nenhuma'} | duração estimada: ~{total_idle / 60:.1f} min")
+    
+    def show_probe(probe: ColdStartProbe) -> None:
+        if probe.phase == "warmup":
+            return
+        if probe.error is not None:
+            print(f"   ❌ {probe.phase:<6} ocioso {probe.idle:>7g}s x{probe.concurrency:<4} {probe.error}")
+            return
+        print(f"   {'🧊' if probe.cold else '🔥'} {probe.phase:<6} ocioso {probe.idle:>7g}s x{probe.concurrency:<4} "
+              f"HTTP {probe.status} | servidor {probe.server_ms:>9.1f}ms | total {probe.total_ms:>9.1f}ms")
+    
+    prober = ColdStartProber(url, args.secret_key, EVENT_COMMANDS[args.event_type], timeout=args.timeout,
+                             max_concurrency=max(bursts, default=1), seed=args.seed)
+    try:
+        warm_ms = prober.warm_up(args.warmup, threshold_ms=args.cold_threshold, factor=args.cold_factor,
+                                 margin_ms=args.cold_margin)
+        print(f"   🔥 Latência quente (mediana): {warm_ms:.1f}ms | limiar de cold start: {prober.threshold_ms:.1f}ms")
+        for gap in gaps:
+            for _ in range(args.repeats):
+                prober.probe_gap(gap, on_probe=show_probe)
+        for burst in bursts:
+            prober.probe_burst(burst, args.burst_idle, on_probe=show_probe)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrompido; resumindo as requisições já feitas")
+        if prober.threshold_ms is None:
+            return 1
+    finally:
+        prober.close()
+    
+    summary = summarize_cold_starts(prober.probes, prober.warm_ms, prober.threshold_ms)
+    statuses: Dict[int, int] = {}
+    for probe in prober.probes:
+        if probe.status is not None:
+            statuses[probe.status] = statuses.get(probe.status, 0) + 1
+    
+    print(f"\n📊 Cold starts: {summary['cold_starts']} de {summary['requests']} requisições "
+          f"(erros: {summary['errors']}) | HTTP {', '.join(f'{code}: {count}' for code, count in sorted(statuses.items()))}")
+    if summary["errors"]:
+        print("   ⚠️  Respostas sem 2xx medem o caminho de erro do webhook, não o processamento do evento")
+    if summary["cold_ms"]:
+        cold = summary["cold_ms"]
+        print(f"   Tempo de servidor frio: p50 {cold['p50']:.1f}ms | p90 {cold['p90']:.1f}ms | máx {cold['max']:.1f}ms "
+              f"(+{cold['penalty_p50']:.1f}ms sobre o quente)")
+    if summary["gaps"]:
+        print(f"   {'ocioso (s)':>12}{'frias':>8}{'p50 (ms)':>12}")
+        for row in summary["gaps"]:
+            print(f"   {row['idle_s']:>12g}{row['cold']:>4}/{row['requests']:<3}{row['p50_server_ms']:>12.1f}")
+    reclaim = summary["reclaim_idle_s"]
+    if reclaim is not None:
+        print(f"\n   ⏳ Instâncias recolhidas entre {reclaim['after_s']:g}s e {reclaim['by_s']:g}s de ociosidade")
+    elif summary["gaps"]:
+        print(f"\n   ⏳ Instâncias continuaram quentes após {summary['gaps'][-1]['idle_s']:g}s ociosas")
+    for row in summary["bursts"]:
+        print(f"   📈 Rajada de {row['concurrency']}: {row['cold']} cold start(s), {row['errors']} erro(s), "
+              f"servidor máx {row['max_server_ms']:.1f}ms")
+    
+    if args.report_json:
+        write_report_json(args.report_json, {
+            **summary,
+            "status_counts": {str(code): count for code, count in sorted(statuses.items())},
+            "probes": [probe.to_dict() for probe in prober.probes],
+        })
+    return 0
+
+
+def _describe_scenario(args: argparse.Namespace) -> str:
+    if args.scenario == "lifecycle":
+        description = (f"ciclo de vida de {args.customers} clientes em {args.months:g} meses "
+                       f"(churn {args.churn:g}, renovação {args.renewal:g}, chargeback {args.chargeback:g})")
+    else:
+        description = f"mistura {args.mix}"
+    if args.providers != DEFAULT_PROVIDER_MIX:
+        description += f" | provedores {args.providers} ({args.users} usuários)"
+    return description
+
+
+def run_load_command(args: argparse.Namespace, url: str) -> int:
+    """Executa o subcomando load e retorna o código de saída"""
+    total = args.requests
+    if total is None and not args.duration and args.scenario == "random":
+        total = 100
+    try:
+        events = build_scenario_events(args, total=total)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    say(args, f"\n🚀 Iniciando carga contra: {url}")
+    say(args, f"   Cenário: {_describe_scenario(args)}")
+    return execute_run(args, url, events)
+
+
+def run_soak_command(args: argparse.Namespace, url: str) -> int:
+    """Executa o subcomando soak: carga em taxa fixa amostrando os recursos do simulador"""
+    if not args.duration or args.duration <= 0:
+        print("❌ --duration é obrigatório no soak")
+        return 1
+    if not args.rps and not args.profile:
+        print("❌ Informe a taxa do soak com --rps ou --profile")
+        return 1
+    if args.sample_interval <= 0 or args.drift_threshold < 0:
+        print("❌ --sample-interval deve ser maior que zero e --drift-threshold não pode ser negativo")
+        return 1
+    try:
+        events = build_scenario_events(args, total=args.requests)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    samples_log = EventLog(args.samples_log, buffer_size=1) if args.samples_log else None
+    
+    def on_sample(sample: Dict[str, Any]) -> None:
+        if samples_log is not None:
+            samples_log.write(sample)
+        if args.output != "quiet":
+            print(f"   🩺 {sample['elapsed_s']:>8.0f}s | RSS {sample['rss_mb']} MB | sockets {sample['sockets']} | "
+                  f"loop p99 {sample['loop_lag_p99_ms']} ms | GC {sample['gc_pause_ms']} ms | "
+                  f"{sample['rps']} req/s | p99 {sample['p99_ms']} ms")
+    
+    monitor = SoakMonitor(
+        interval=args.sample_interval,
+        drift_threshold=args.drift_threshold,
+        trace_memory=args.tracemalloc,
+        on_sample=on_sample,
+    )
+    say(args, f"\n🚀 Iniciando soak contra: {url}")
+    say(args, f"   Cenário: {_describe_scenario(args)} | Duração: {args.duration:g}s | "
+              f"Amostras a cada {args.sample_interval:g}s")
+    try:
+        return execute_run(args, url, events, monitor=monitor)
+    finally:
+        if samples_log is not None:
+            samples_log.close()
+
+
+def run_compare_command(args: argparse.Namespace) -> int:
+    """Executa o subcomando compare: deltas entre dois relatórios e gate de regressão"""
+    if not 0 < args.alpha < 1 or args.max_latency_increase < 0 or args.max_error_rate_increase < 0:
+        print("❌ --alpha deve estar entre 0 e 1 e os limites de aumento não podem ser negativos")
+        return 1
+    try:
+        percentile = float(args.percentile.lstrip("pP"))
+        if not 0 < percentile < 100:
+            raise ValueError
+    except ValueError:
+        print(f"❌ Percentil inválido: {args.percentile} (ex: p99, p99.9, 95)")
+        return 1
+    try:
+        baseline = load_run_report(args.baseline)
+        candidate = load_run_report(args.candidate)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    
+    comparison = compare_runs(
+        baseline,
+        candidate,
+        percentile=percentile,
+        max_latency_increase=args.max_latency_increase,
+        max_error_rate_increase=args.max_error_rate_increase,
+        max_throughput_drop=args.max_throughput_drop if args.max_throughput_drop >= 0 else None,
+        alpha=args.alpha,
+        min_requests=args.min_requests,
+    )
+    print(f"📂 Base: {args.baseline} ({baseline.sent} requisições) | Candidato: {args.candidate} "
+          f"({candidate.sent} requisições)")
+    print_comparison(comparison)
+    if args.report_json:
+        write_report_json(args.report_json, comparison)
+    return 1 if comparison["regressions"] else 0
+
+
+def run_generate_command(args: argparse.Namespace) -> int:
+    """Executa o subcomando generate: grava eventos assinados em NDJSON"""
+    total = args.count
+    if total is None and args.scenario == "random":
+        total = 1000
+    try:
+        events = build_scenario_events(args, total=total)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    counts: Dict[str, int] = {}
+    
+    def counted(items: Iterable[PreparedEvent]) -> Iterator[PreparedEvent]:
+        for event in items:
+            counts[event.event_type] = counts.get(event.event_type, 0) + 1
+            yield event
+    
+    print(f"📝 Cenário: {_describe_scenario(args)}")
+    start = time.perf_counter()
+    count = write_event_file(args.output, counted(events))
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"💾 {count} eventos gravados em {args.output} ({elapsed:.2f}s, {rate:.0f} eventos/s)")
+    for event_type, event_count in sorted(counts.items()):
+        print(f"   📋 {event_type}: {event_count} ({event_count / count:.1%})")
+    warn_mix_deviation(args, counts)
+    return 0
+
+
+def run_replay_command(args: argparse.Namespace, url: str) -> int:
+    """Executa o subcomando replay: reenvia um arquivo NDJSON de eventos assinados ou uma captura do record"""
+    if not Path(args.file).is_file():
+        print(f"❌ Arquivo não encontrado: {args.file}")
+        return 1
+    
+    capture = is_capture_file(args.file)
+    say(args, f"\n🔁 Reenviando {'a captura ' if capture else ''}{args.file} para: {url}")
+    if capture:
+        if args.processes > 1:
+            print("❌ Capturas do record são reenviadas por um único processo (use --processes 1)")
+            return 1
+        return execute_run(args, url, iter_capture_events(args.file))
+    if args.processes <= 1:
+        return execute_run(args, url, iter_event_file(args.file))
+    if args.stage_timings or args.cpu_profile:
+        print("❌ --stage-timings e --cpu-profile medem um único processo (use --processes 1)")
+        return 1
+    
+    if args.concurrency < 1 or args.max_in_flight < 1:
+        print("❌ --concurrency e --max-in-flight devem ser maiores ou iguais a 1")
+        return 1
+    if args.http2 and httpx is None:
+        print('❌ Cliente assíncrono requer o pacote httpx: pip install "httpx[http2]"')
+        return 1
+    fault_error = validate_faults(args)
+    if fault_error:
+        print(f"❌ {fault_error}")
+        return 1
+    try:
+        pacing = pacing_from_args(args)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    faults = faults_from_args(args)
+    options = model_options(args, pacing)
+    say(args, f"   Processos: {args.processes} (shards por {args.shard_by}) | "
+              f"Concorrência por processo: {args.concurrency} | Ritmo total: {describe_pacing(pacing)}")
+    if faults.enabled:
+        say(args, f"   Falhas injetadas: {describe_faults(faults)}")
+    if args.metrics_port:
+        say(args, f"   📈 Métricas em: http://{args.metrics_host}:{args.metrics_port}-"
+                  f"{args.metrics_port + args.processes - 1}/metrics (uma porta por processo)")
+    receiver_before = fetch_receiver_store(url) if faults.enabled else None
+    stats = run_sharded_replay(
+        args.file,
+        url,
+        processes=args.processes,
+        shard_by=args.shard_by,
+        options=sender_options(args, options["open_model"]),
+        concurrency=args.concurrency,
+        pacing=pacing,
+        duration=args.duration,
+        faults=faults,
+        event_log_path=event_log_path(args),
+        metrics_address=(
+            (args.metrics_host, args.metrics_port, args.metrics_linger) if args.metrics_port else None
+        ),
+        **options,
+    )
+    measure_receiver_side_effects(stats, url, receiver_before)
+    if args.events_log:
+        say(args, f"\n🧾 Resultados gravados em: {args.events_log}.<processo>")
+    return finish_run(args, stats)
+
+
+def run_coordinator_command(args: argparse.Namespace, url: str) -> int:
+    """Executa o subcomando coordinator: distribui a carga entre agentes e combina o relatório"""
+    if args.agents < 1 or args.start_delay < 0 or args.agent_timeout <= 0 or args.progress_interval <= 0:
+        print("❌ --agents deve ser >= 1, --start-delay positivo e --agent-timeout e --progress-interval maiores que zero")
+        return 1
+    if args.concurrency < 1 or args.max_in_flight < 1:
+        print("❌ --concurrency e --max-in-flight devem ser maiores ou iguais a 1")
+        return 1
+    if args.events_log or args.metrics_port:
+        print("❌ --events-log e --metrics-port não são suportados no coordinator")
+        return 1
+    if args.stage_timings or args.cpu_profile:
+        print("❌ --stage-timings e --cpu-profile medem um único processo: use-os em um load local")
+        return 1
+    if args.tiktok_secret:
+        print("❌ As chaves não são enviadas aos agentes: informe --tiktok-secret (ou TIKTOK_WEBHOOK_SECRET) em cada agent")
+        return 1
+    fault_error = validate_faults(args)
+    if fault_error:
+        print(f"❌ {fault_error}")
+        return 1
+    try:
+        host, port = parse_address(args.listen, 8786)
+        pacing = pacing_from_args(args)
+        # Valida o cenário com uma chave qualquer: as chaves reais ficam só nos agentes
+        validation = argparse.Namespace(**{**vars(args), "secret_key": "validation", "tiktok_secret": None})
+        next(iter(build_scenario_events(validation, total=1)), None)
+        args.run_id = validation.run_id
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    if not args.token and not is_loopback_address(host):
+        print(f"❌ --token é obrigatório ao escutar em {host}, fora da máquina local")
+        return 1
+    
+    say(args, f"\n🛰️  Coordenando carga contra: {url}")
+    say(args, f"   Cenário: {_describe_scenario(args)} | Ritmo total: {describe_pacing(pacing)}")
+    say(args, f"   Aguardando {args.agents} agente(s) em {host}:{port} "
+              f"(python simulate_webhook.py agent --coordinator HOST:{port} --secret-key ...)")
+    
+    def show_progress(stats: LoadStats, elapsed: float) -> None:
+        rate = stats.sent / elapsed if elapsed > 0 else 0.0
+        say(args, f"   📡 {stats.sent} requisições | {rate:.1f} req/s | erros {stats.error_rate:.2%} | "
+                  f"p99 {stats.latency['total'].percentile_ms(99):.1f}ms")
+    
+    coordinator = LoadCoordinator(args, url, args.agents, token=args.token, start_delay=args.start_delay)
+    try:
+        stats = asyncio.run(coordinator.run(host, port, agent_timeout=args.agent_timeout,
+                                            progress_interval=args.progress_interval, on_progress=show_progress))
+    except OSError as e:
+        print(f"❌ Não foi possível escutar em {host}:{port}: {e}")
+        return 1
+    if stats is None:
+        return 1
+    return finish_run(args, stats)
+
+
+def run_agent_command(args: argparse.Namespace) -> int:
+    """Executa o subcomando agent: gera a sua parte da carga distribuída"""
+    if args.stats_interval <= 0:
+        print("❌ --stats-interval deve ser maior que zero")
+        return 1
+    if not args.secret_key:
+        print("❌ Informe a chave secreta com --secret-key ou KIWIFY_SECRET_KEY (ela não é enviada pelo coordenador)")
+        return 1
+    try:
+        host, port = parse_address(args.coordinator, 8786)
+    except ValueError as e:
+        print(f"❌ Endereço inválido: {e}")
+        return 1
+    try:
+        return asyncio.run(run_load_agent(host, port, name=args.name, token=args.token,
+                                          stats_interval=args.stats_interval, secret_key=args.secret_key,
+                                          tiktok_secret=args.tiktok_secret))
+    except KeyboardInterrupt:
+        return 1
+
+
+def run_capacity_command(args: argparse.Namespace, url: str) -> int:
+    """Executa o subcomando capacity: rampa e busca binária da vazão máxima dentro do SLO"""
+    if args.concurrency < 1 or args.start_rps <= 0 or args.max_rps < args.start_rps:
+        print("❌ --concurrency deve ser >= 1 e 0 < --start-rps <= --max-rps")
+        return 1
+    if args.step_factor <= 1 or args.step_duration <= 0 or args.precision <= 0:
+        print("❌ --step-factor deve ser > 1 e --step-duration e --precision maiores que zero")
+        return 1
+    try:
+        events = build_scenario_events(args)
+        sender = create_sender(**sender_options(args))
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    
+    print(f"\n📈 Buscando capacidade de: {url}")
+    print(f"   Cenário: {_describe_scenario(args)}")
+    print(f"   SLO: p99 <= {args.slo_p99:g}ms e erros <= {args.max_error_rate:.2%} | "
+          f"degraus de {args.step_duration:g}s | até {args.concurrency} requisições em andamento")
+    
+    def show_step(step: CapacityStep) -> None:
+        icon = "✅" if step.passed else "❌"
+        arrow = "🔼" if step.phase == "ramp" else "🔍"
+        print(f"   {arrow} {step.rps:>9.1f} req/s → alcançado {step.achieved_rps:>8.1f} | "
+              f"p99 {step.p99_ms:>8.1f}ms | erros {step.error_rate:>7.2%} | n={step.requests} {icon}")
+    
+    best, steps = asyncio.run(run_with_sender(sender, find_capacity(
+        url,
+        iter(events),
+        sender,
+        slo_p99_ms=args.slo_p99,
+        max_error_rate=args.max_error_rate,
+        start_rps=args.start_rps,
+        max_rps=args.max_rps,
+        step_factor=args.step_factor,
+        step_duration=args.step_duration,
+        precision=args.precision,
+        concurrency=args.concurrency,
+        on_step=show_step,
+    )))
+    
+    print("\n📊 Curva de latência")
+    print(f"   {'req/s':>10}{'alcançado':>12}{'p99 (ms)':>12}{'erros':>10}")
+    for step in sorted(steps, key=lambda step: step.rps):
+        print(f"   {step.rps:>10.1f}{step.achieved_rps:>12.1f}{step.p99_ms:>12.1f}{step.error_rate:>10.2%}"
+              f"  {'✅' if step.passed else '❌'}")
+    
+    inflection = latency_inflection(steps)
+    if inflection is not None:
+        print(f"\n   ↗️  A latência p99 dobra a partir de ~{inflection.rps:.1f} req/s")
+    if best is None:
+        print(f"\n❌ O SLO não foi atendido nem na taxa inicial de {args.start_rps:g} req/s "
+              f"(a capacidade está abaixo dela; reduza --start-rps)")
+    elif all(step.passed for step in steps):
+        print(f"\n✅ SLO atendido até o limite testado: {best:.1f} req/s (aumente --max-rps)")
+    else:
+        print(f"\n🎯 Joelho da curva: ~{best:.1f} req/s é a maior taxa sustentável dentro do SLO")
+    
+    if args.report_json:
+        write_report_json(args.report_json, {
+            "slo": {"p99_ms": args.slo_p99, "max_error_rate": args.max_error_rate},
+            "max_sustainable_rps": round(best, 3) if best is not None else None,
+            "latency_inflection_rps": round(inflection.rps, 3) if inflection is not None else None,
+            "steps": [step.to_dict() for step in steps],
+        })
+    return 0 if best is not None else 1
+
+
+def run_daemon_command(args: argparse.Namespace) -> int:
+    """Executa o subcomando daemon: envia eventos avulsos recebidos por socket Unix"""
+    if not hasattr(socket, "AF_UNIX"):
+        print("❌ O daemon requer sockets Unix (Linux ou macOS)")
+        return 1
+    if args.pool_size < 1 or args.timeout <= 0 or (args.idle_exit is not None and args.idle_exit <= 0):
+        print("❌ --pool-size deve ser >= 1 e --timeout e --idle-exit maiores que zero")
+        return 1
+    daemon = SimulatorDaemon(
+        args.socket,
+        build_parser(),
+        run_event_command,
+        pool_size=args.pool_size,
+        timeout=args.timeout,
+        idle_exit=args.idle_exit,
+    )
+    print(f"🔌 Daemon do simulador em: {args.socket} (python simulate_client.py approved ... | "
+          f"python simulate_client.py stop)")
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"❌ Não foi possível escutar em {args.socket}: {e}")
+        return 1
+    print(f"📊 Comandos atendidos: {daemon.handled}")
+    return 0
+
+
+def _add_scenario_arguments(parser: argparse.ArgumentParser, default_mix: str = DEFAULT_EVENT_MIX) -> None:
+    """Adiciona as opções de escolha do cenário de eventos (load, generate)"""
+    parser.add_argument("--scenario", choices=["random", "lifecycle"], default="random",
+                        help="random: eventos independentes segundo --mix; lifecycle: ciclo de vida "
+                             "de uma população de clientes (default: random)")
+    parser.add_argument("--mix", default=default_mix,
+                        help=f"Mistura de eventos com pesos no cenário random (default: {default_mix})")
+    parser.add_argument("--customers", type=int, default=1000,
+                        help="Clientes simulados no cenário lifecycle (default: 1000)")
+    parser.add_argument("--months", type=float, default=12,
+                        help="Horizonte do cenário lifecycle em meses (default: 12)")
+    parser.add_argument("--plan-mix", help="Distribuição de planos no cenário lifecycle, "
+                                           "ex: STARTER=50,SCALING=30,SCALED=20 (default: uniforme)")
+    parser.add_argument("--churn", type=float, default=0.05,
+                        help="Probabilidade de cancelamento a cada ciclo (default: 0.05)")
+    parser.add_argument("--renewal", type=float, default=0.95,
+                        help="Probabilidade de a renovação ser aprovada (default: 0.95)")
+    parser.add_argument("--chargeback", type=float, default=0.01,
+                        help="Probabilidade de chargeback de cada cobrança (default: 0.01)")
+    parser.add_argument("--signup-days", type=float, default=30.0,
+                        help="Janela em dias em que as compras iniciais se distribuem (default: 30)")
+    parser.add_argument("--email-domain", default="example.com",
+                        help="Domínio dos emails gerados (default: example.com)")
+    parser.add_argument("--run-id",
+                        help="Identificador da execução nos emails (loadtest+<ID>-<n>), para que execuções "
+                             "seguidas não reaproveitem clientes (default: sorteado a cada execução)")
+    parser.add_argument("--providers", default=DEFAULT_PROVIDER_MIX,
+                        help="Mistura de webhooks com pesos, ex: kiwify=70,tiktok=20,sale=10; tiktok e sale "
+                             "vão para tiktokWebhook e saleWebhook ao lado da URL (default: kiwify)")
+    parser.add_argument("--tiktok-secret",
+                        help="TIKTOK_WEBHOOK_SECRET para assinar os eventos do TikTok (default: sem assinatura)")
+    parser.add_argument("--users", type=int, default=100,
+                        help="Usuários simulados que recebem as vendas de tiktok e sale (default: 100)")
+    parser.add_argument("--seed", type=int, help="Semente do gerador aleatório (opcional)")
+
+
+def _add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adiciona as opções de execução compartilhadas pelos modos de envio em massa"""
+    parser.add_argument("--duration", type=float, help="Duração máxima da execução em segundos (opcional)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Número máximo de requisições simultâneas (default: 10)")
+    parser.add_argument("--rps", type=float, help="Taxa alvo de requisições por segundo (default: sem limite)")
+    parser.add_argument("--profile",
+                        help="Perfil de taxa: constant:RATE, poisson:RATE, step:RATE@SEG,..., "
+                             "spike:BASE,PICO,INICIO,LARGURA ou curve:ARQUIVO (contagens por minuto)")
+    parser.add_argument("--timing", choices=["profile", "original"], default="profile",
+                        help="original: envia cada evento no seu instante simulado \"at\" "
+                             "(ex: cenário lifecycle) (default: profile)")
+    parser.add_argument("--compress", type=float, default=1.0,
+                        help="Fator de compressão do tempo do cenário/perfil, ex: 4320 comprime "
+                             "30 dias em 10 minutos (default: 1)")
+    parser.add_argument("--model", choices=["open", "closed"], default="open",
+                        help="open: com --rps/--profile/--timing original, dispara cada evento no instante "
+                             "previsto e mede a latência desde ele; closed: workers enviam o próximo evento "
+                             "só após a resposta (default: open)")
+    parser.add_argument("--max-in-flight", type=int, default=256,
+                        help="Máximo de requisições em andamento no modelo aberto (default: 256)")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0,
+                        help="Fração de eventos reenviados mais tarde com o mesmo corpo e assinatura (default: 0)")
+    parser.add_argument("--concurrent-rate", type=float, default=0.0,
+                        help="Fração de eventos disparados em cópias simultâneas (default: 0)")
+    parser.add_argument("--reorder-rate", type=float, default=0.0,
+                        help="Fração de eventos entregues depois do evento seguinte da mesma assinatura, "
+                             "ex: cancelamento antes da compra (default: 0)")
+    parser.add_argument("--copies", type=int, default=2,
+                        help="Entregas de cada evento duplicado ou simultâneo (default: 2)")
+    parser.add_argument("--duplicate-gap", type=int, default=10,
+                        help="Eventos entre as entregas de uma duplicata (default: 10)")
+    parser.add_argument("--reorder-window", type=int, default=1000,
+                        help="Eventos aguardados pelo evento seguinte da assinatura antes de desistir "
+                             "da reordenação (default: 1000)")
+    _add_sender_arguments(parser)
+    parser.add_argument("--report-json", help="Arquivo para salvar o relatório em JSON (\"-\" para stdout)")
+    parser.add_argument("--output", choices=OUTPUT_MODES, default="summary",
+                        help="quiet: nenhuma saída além dos erros; summary: resumo final; verbose: também "
+                             "uma linha JSON por requisição na saída padrão (depuração) (default: summary)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Expõe métricas Prometheus/OpenMetrics ao vivo em http://HOST:PORTA/metrics "
+                             "(com --processes, uma porta por processo a partir desta)")
+    parser.add_argument("--metrics-host", default="127.0.0.1",
+                        help="Endereço do endpoint de métricas (default: 127.0.0.1)")
+    parser.add_argument("--metrics-linger", type=float, default=0.0,
+                        help="Segundos que o endpoint de métricas fica no ar após o fim, para a última "
+                             "coleta (default: 0)")
+    parser.add_argument("--events-log",
+                        help="Arquivo JSON lines com o resultado de cada requisição, gravado em blocos "
+                             "por uma thread dedicada (\"-\" para stdout)")
+    parser.add_argument("--stage-timings", action="store_true",
+                        help="Mede o tempo de cada etapa do caminho quente (montagem do payload, json.dumps, "
+                             "HMAC, URL, rede) e indica se o limite é o simulador ou o backend")
+    parser.add_argument("--cpu-profile",
+                        help="Arquivo para gravar o perfil de CPU da execução (pilhas collapsed para "
+                             "flamegraph ou pstats com --cpu-profiler cprofile)")
+    parser.add_argument("--cpu-profiler", choices=["sampling", "cprofile"], default="sampling",
+                        help="sampling: amostra todas as threads, formato collapsed; cprofile: cProfile do "
+                             "thread do event loop, formato pstats (default: sampling)")
+    parser.add_argument("--cpu-profile-interval", type=float, default=0.005,
+                        help="Intervalo entre amostras do profiler sampling em segundos (default: 0.005)")
+
+
+def _add_sender_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adiciona as opções do cliente HTTP (timeout, pool de conexões, retentativas, HTTP/2)"""
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="Timeout de cada requisição em segundos (default: 30)")
+    parser.add_argument("--pool-size", type=int,
+                        help="Conexões mantidas no pool por host (default: --max-in-flight no modelo aberto, "
+                             "senão --concurrency)")
+    parser.add_argument("--no-keep-alive", action="store_true",
+                        help="Fecha a conexão após cada requisição (mede o custo do handshake)")
+    parser.add_argument("--retries", type=int, default=0,
+                        help="Novas tentativas em falhas de conexão e status 429/5xx (default: 0)")
+    parser.add_argument("--http2", action="store_true",
+                        help="Usa cliente assíncrono com HTTP/2 (requer httpx[http2])")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser da linha de comando com todos os subcomandos"""
     parser = argparse.ArgumentParser(
         description="Simula eventos de webhook da Kiwify",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -565,6 +908,61 @@ Exemplos:
   # Simular chargeback
   python simulate_webhook.py chargeback --email usuario@example.com
 
+  # Gerar carga: 500 eventos, 20 simultâneos, 50 req/s
+  python simulate_webhook.py load --secret-key 3ienivdzi7c \\
+    --requests 500 --concurrency 20 --rps 50
+
+  # Gerar 100 mil eventos assinados em arquivo e reenviá-los depois
+  python simulate_webhook.py generate --secret-key 3ienivdzi7c \\
+    --count 100000 --seed 42 --output eventos.ndjson
+  python simulate_webhook.py replay --file eventos.ndjson --concurrency 20
+
+  # Gerar o ciclo de vida de 5 mil clientes ao longo de 6 meses
+  python simulate_webhook.py generate --secret-key 3ienivdzi7c \\
+    --scenario lifecycle --customers 5000 --months 6 --output ciclo.ndjson
+
+  # Benchmark sem rede contra o receptor local
+  python simulate_webhook.py serve --secret-key 3ienivdzi7c --store-latency 20
+  python simulate_webhook.py load --secret-key 3ienivdzi7c \\
+    --url http://127.0.0.1:8787/kiwifyWebhook --requests 1000
+
+  # Carga distribuída: coordenador e 4 agentes (em uma ou várias máquinas)
+  python simulate_webhook.py coordinator --agents 4 --rps 400 --duration 300 \\
+    --listen 0.0.0.0:8786 --token segredo
+  python simulate_webhook.py agent --coordinator 10.0.0.5:8786 --token segredo --secret-key 3ienivdzi7c
+  
+  # Daemon para scripts com muitos eventos avulsos (sem reiniciar o Python a cada um)
+  python simulate_webhook.py daemon --idle-exit 600 &
+  python simulate_client.py approved --email usuario@example.com --secret-key 3ienivdzi7c
+  
+  # Soak de 4 horas a 20 req/s, conferindo se o próprio simulador degrada
+  python simulate_webhook.py soak --secret-key 3ienivdzi7c --rps 20 --duration 14400
+  
+  # Tempo por etapa (payload, json, HMAC, URL, rede) e flamegraph do simulador
+  python simulate_webhook.py load --secret-key 3ienivdzi7c --requests 5000 --concurrency 50 \\
+    --stage-timings --cpu-profile load.collapsed
+
+  # Gate de regressão: mesma carga antes e depois do deploy
+  python simulate_webhook.py load --secret-key 3ienivdzi7c --rps 20 --duration 120 --report-json antes.json
+  python simulate_webhook.py load --secret-key 3ienivdzi7c --rps 20 --duration 120 --report-json depois.json
+  python simulate_webhook.py compare antes.json depois.json --max-latency-increase 0.1
+
+  # Maior taxa sustentável com p99 <= 800ms e até 0,1% de erros
+  python simulate_webhook.py capacity --secret-key 3ienivdzi7c --slo-p99 800
+
+  # Latência e assinatura com históricos longos e nomes fora do ASCII
+  python simulate_webhook.py bench-payload --secret-key 3ienivdzi7c --charges 1,60,240 --requests 50
+  
+  # Cold starts após até 15 minutos ociosos e em rajadas de 5 e 20 requisições
+  python simulate_webhook.py coldstart --secret-key 3ienivdzi7c --gaps 30,120,300,600,900
+  
+  # Gravar entregas reais da Kiwify e reenviá-las 10x mais rápido
+  python simulate_webhook.py record --target https://us-central1-minerx-app-login.cloudfunctions.net/kiwifyWebhook
+  python simulate_webhook.py replay --file capture.kcap --timing original --compress 10
+
+  # Conferir as assinaturas de um arquivo de eventos com 4 processos
+  python simulate_webhook.py verify --file eventos.ndjson --secret-key 3ienivdzi7c --processes 4
+
   # Usar URL e chave secreta customizados
   python simulate_webhook.py approved --email usuario@example.com \\
     --url https://us-central1-minerx-app-login.cloudfunctions.net/kiwifyWebhook \\
@@ -609,16 +1007,303 @@ Exemplos:
     chargeback_parser.add_argument("--subscription-id", help="ID da assinatura (opcional)")
     chargeback_parser.add_argument("--amount", type=float, help="Valor do pedido em reais (opcional)")
     
+    # Parser para geração de carga
+    load_parser = subparsers.add_parser("load", help="Gerar carga concorrente com uma mistura de eventos")
+    load_parser.add_argument("--requests", type=int, default=None,
+                             help="Quantidade total de requisições (default: 100 no cenário random, "
+                                  "ou ilimitado com --duration)")
+    _add_scenario_arguments(load_parser)
+    _add_run_arguments(load_parser)
+    
+    # Parsers para carga distribuída
+    coordinator_parser = subparsers.add_parser("coordinator",
+                                               help="Distribuir a carga entre agentes conectados por TCP")
+    coordinator_parser.add_argument("--agents", type=int, required=True, help="Número de agentes aguardados")
+    coordinator_parser.add_argument("--listen", default="127.0.0.1:8786",
+                                    help="Endereço de escuta dos agentes; use 0.0.0.0:8786 para outras "
+                                         "máquinas (default: 127.0.0.1:8786)")
+    coordinator_parser.add_argument("--token", help="Token exigido dos agentes (obrigatório fora de 127.0.0.1)")
+    coordinator_parser.add_argument("--start-delay", type=float, default=2.0,
+                                    help="Segundos entre o sinal de início e os primeiros envios (default: 2)")
+    coordinator_parser.add_argument("--agent-timeout", type=float, default=60.0,
+                                    help="Segundos aguardando todos os agentes (default: 60)")
+    coordinator_parser.add_argument("--progress-interval", type=float, default=5.0,
+                                    help="Segundos entre as linhas de progresso (default: 5)")
+    coordinator_parser.add_argument("--requests", type=int, default=None,
+                                    help="Total de requisições dividido entre os agentes (default: 100 no "
+                                         "cenário random, ou ilimitado com --duration)")
+    _add_scenario_arguments(coordinator_parser)
+    _add_run_arguments(coordinator_parser)
+    
+    agent_parser = subparsers.add_parser("agent", help="Gerar a parte de um agente da carga distribuída")
+    agent_parser.add_argument("--coordinator", required=True, help="Endereço do coordenador (HOST:PORTA)")
+    agent_parser.add_argument("--name", default="", help="Nome do agente no relatório (default: endereço)")
+    agent_parser.add_argument("--token", help="Token exigido pelo coordenador")
+    agent_parser.add_argument("--secret-key", default=os.environ.get("KIWIFY_SECRET_KEY"),
+                              help="Chave secreta da Kiwify para assinar os eventos; o coordenador não a envia "
+                                   "(default: variável KIWIFY_SECRET_KEY)")
+    agent_parser.add_argument("--tiktok-secret", default=os.environ.get("TIKTOK_WEBHOOK_SECRET"),
+                              help="TIKTOK_WEBHOOK_SECRET para assinar os eventos do TikTok "
+                                   "(default: variável TIKTOK_WEBHOOK_SECRET)")
+    agent_parser.add_argument("--stats-interval", type=float, default=2.0,
+                              help="Segundos entre os envios de estatísticas parciais (default: 2)")
+    
+    # Parser para soak (execução longa com monitoramento do próprio simulador)
+    soak_parser = subparsers.add_parser("soak",
+                                        help="Carga longa em taxa fixa monitorando memória, sockets e event loop "
+                                             "do simulador")
+    soak_parser.add_argument("--requests", type=int, default=None,
+                             help="Limite de requisições (default: até o fim de --duration)")
+    soak_parser.add_argument("--sample-interval", type=float, default=30.0,
+                             help="Segundos entre amostras de recursos (default: 30)")
+    soak_parser.add_argument("--drift-threshold", type=float, default=0.2,
+                             help="Aumento relativo entre o início e o fim que sinaliza deriva (default: 0.2)")
+    soak_parser.add_argument("--tracemalloc", action="store_true",
+                             help="Rastreia alocações com tracemalloc e mostra as linhas que mais cresceram "
+                                  "(custo de CPU considerável)")
+    soak_parser.add_argument("--samples-log",
+                             help="Arquivo JSON lines com cada amostra de recursos (\"-\" para stdout)")
+    _add_scenario_arguments(soak_parser)
+    _add_run_arguments(soak_parser)
+    
+    # Parser para comparação entre execuções
+    compare_parser = subparsers.add_parser("compare",
+                                           help="Comparar dois relatórios --report-json e falhar em regressões")
+    compare_parser.add_argument("baseline", help="Relatório de referência (ex: antes do deploy)")
+    compare_parser.add_argument("candidate", help="Relatório a avaliar (ex: depois do deploy)")
+    compare_parser.add_argument("--percentile", default="p99",
+                                help="Percentil do critério de latência (default: p99)")
+    compare_parser.add_argument("--max-latency-increase", type=float, default=0.1,
+                                help="Aumento relativo tolerado do percentil por tipo de evento (default: 0.1)")
+    compare_parser.add_argument("--max-error-rate-increase", type=float, default=0.001,
+                                help="Aumento absoluto tolerado da taxa de erro, no total e por tipo de evento (default: 0.001)")
+    compare_parser.add_argument("--max-throughput-drop", type=float, default=0.1,
+                                help="Queda relativa tolerada da vazão total; negativo desativa (default: 0.1)")
+    compare_parser.add_argument("--alpha", type=float, default=0.01,
+                                help="Nível de significância dos testes estatísticos (default: 0.01)")
+    compare_parser.add_argument("--min-requests", type=int, default=30,
+                                help="Mínimo de requisições de cada lado para avaliar a latência de um tipo de evento (default: 30)")
+    compare_parser.add_argument("--report-json", help="Arquivo para salvar a comparação em JSON (\"-\" para stdout)")
+    
+    # Parser para busca de capacidade
+    capacity_parser = subparsers.add_parser("capacity",
+                                            help="Encontrar a vazão máxima sustentável dentro de um SLO",
+                                            description="Encontra a vazão máxima sustentável dentro de um SLO. "
+                                                        "Por padrão envia só compras aprovadas (--mix approved): "
+                                                        "cada requisição sem 2xx conta contra --max-error-rate, "
+                                                        "então eventos para clientes que o backend não conhece "
+                                                        "(HTTP 500 \"assinatura não encontrada\") reprovariam "
+                                                        "todos os degraus. Para outros eventos use --mix com "
+                                                        "approved ou --scenario lifecycle.")
+    capacity_parser.add_argument("--slo-p99", type=float, default=800.0,
+                                 help="Latência p99 máxima em ms (default: 800)")
+    capacity_parser.add_argument("--max-error-rate", type=float, default=0.001,
+                                 help="Fração máxima de requisições sem 2xx, inclusive HTTP 500 de cliente não "
+                                      "encontrado (default: 0.001)")
+    capacity_parser.add_argument("--start-rps", type=float, default=5.0,
+                                 help="Taxa do primeiro degrau em req/s (default: 5)")
+    capacity_parser.add_argument("--max-rps", type=float, default=1000.0,
+                                 help="Taxa máxima testada em req/s (default: 1000)")
+    capacity_parser.add_argument("--step-factor", type=float, default=2.0,
+                                 help="Multiplicador da taxa a cada degrau da rampa (default: 2)")
+    capacity_parser.add_argument("--step-duration", type=float, default=10.0,
+                                 help="Duração de cada degrau em segundos (default: 10)")
+    capacity_parser.add_argument("--precision", type=float, default=0.05,
+                                 help="Precisão relativa da busca binária (default: 0.05)")
+    capacity_parser.add_argument("--concurrency", type=int, default=100,
+                                 help="Máximo de requisições em andamento (default: 100)")
+    _add_scenario_arguments(capacity_parser, default_mix=CAPACITY_EVENT_MIX)
+    _add_sender_arguments(capacity_parser)
+    capacity_parser.add_argument("--report-json", help="Arquivo para salvar o resultado em JSON (\"-\" para stdout)")
+    
+    # Parser para geração de arquivo de eventos
+    generate_parser = subparsers.add_parser("generate", help="Gerar arquivo NDJSON de eventos assinados")
+    generate_parser.add_argument("--output", required=True, help="Arquivo NDJSON de saída")
+    generate_parser.add_argument("--count", type=int, default=None,
+                                 help="Quantidade de eventos (default: 1000 no cenário random, "
+                                      "todos os eventos no lifecycle)")
+    _add_scenario_arguments(generate_parser)
+    generate_parser.add_argument("--secret-key", required=True,
+                                 help="Chave secreta da Kiwify para calcular a assinatura HMAC")
+    
+    # Parser para reenvio de arquivo de eventos
+    replay_parser = subparsers.add_parser("replay", help="Reenviar um arquivo NDJSON de eventos assinados")
+    replay_parser.add_argument("--file", required=True,
+                               help="Arquivo NDJSON gerado pelo subcomando generate ou captura gravada pelo record")
+    replay_parser.add_argument("--url", help=f"URL do webhook (default: {DEFAULT_WEBHOOK_URL})")
+    replay_parser.add_argument("--processes", type=int, default=1,
+                               help="Número de processos que dividem o arquivo (default: 1)")
+    replay_parser.add_argument("--shard-by", choices=["range", "subscription"], default="range",
+                               help="Divisão entre processos: intervalos de bytes ou hash do "
+                                    "subscription_id, que preserva a ordem por assinatura (default: range)")
+    replay_parser.add_argument("--secret-key",
+                               help="Chave secreta (opcional), usada apenas para assinar os cancelamentos "
+                                    "sintetizados por --reorder-rate")
+    replay_parser.add_argument("--seed", type=int,
+                               help="Semente do perfil poisson e da injeção de falhas (opcional)")
+    _add_run_arguments(replay_parser)
+    
+    # Parser para o receptor local
+    serve_parser = subparsers.add_parser("serve", help="Iniciar um receptor local que replica o kiwifyWebhook")
+    serve_parser.add_argument("--secret-key", required=True, help="Chave secreta da Kiwify usada na validação")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8787, help="Porta de escuta (default: 8787)")
+    serve_parser.add_argument("--latency", type=float, default=0.0,
+                              help="Latência artificial de cada requisição em ms (default: 0)")
+    serve_parser.add_argument("--store-latency", type=float, default=0.0,
+                              help="Latência de cada operação no armazenamento em memória em ms, "
+                                   "como uma ida ao Firestore (default: 0)")
+    serve_parser.add_argument("--task-latency", type=float,
+                              help="Latência de cada notificação enfileirada no Cloud Tasks em ms "
+                                   "(default: a mesma de --store-latency)")
+    serve_parser.add_argument("--tiktok-secret",
+                              help="TIKTOK_WEBHOOK_SECRET para validar x-tiktok-signature (default: não valida)")
+    serve_parser.add_argument("--cold-start", type=float, default=0.0,
+                              help="Simula instâncias do Cloud Functions: ms de inicialização de cada "
+                                   "instância nova, uma requisição por instância (default: 0, desativado)")
+    serve_parser.add_argument("--idle-timeout", type=float, default=900.0,
+                              help="Segundos ociosos após os quais uma instância é recolhida, com "
+                                   "--cold-start (default: 900)")
+    serve_parser.add_argument("--jitter", type=float, default=0.0,
+                              help="Variação aleatória das latências, como fração delas (default: 0)")
+    serve_parser.add_argument("--duration", type=float, help="Encerra após N segundos (opcional)")
+    serve_parser.add_argument("--seed", type=int, help="Semente do gerador aleatório (opcional)")
+    
+    # Parser para o daemon de eventos avulsos
+    daemon_parser = subparsers.add_parser("daemon",
+                                          help="Manter o simulador no ar para eventos avulsos via socket Unix")
+    daemon_parser.add_argument("--socket", default=os.environ.get("KIWIFY_SIMULATE_SOCKET", DEFAULT_DAEMON_SOCKET),
+                               help=f"Caminho do socket Unix (default: $KIWIFY_SIMULATE_SOCKET ou "
+                                    f"{DEFAULT_DAEMON_SOCKET})")
+    daemon_parser.add_argument("--pool-size", type=int, default=4,
+                               help="Conexões mantidas no pool por host (default: 4)")
+    daemon_parser.add_argument("--timeout", type=float, default=30.0,
+                               help="Timeout de cada requisição em segundos (default: 30)")
+    daemon_parser.add_argument("--idle-exit", type=float,
+                               help="Encerra após N segundos sem comandos (opcional, útil em CI)")
+    
+    # Parser para o proxy de gravação
+    record_parser = subparsers.add_parser("record",
+                                          help="Proxy reverso que grava as entregas reais para o replay")
+    record_parser.add_argument("--target", required=True,
+                               help="URL do webhook para onde as requisições são repassadas")
+    record_parser.add_argument("--output", default="capture.kcap",
+                               help="Arquivo de captura, comprimido e somente de acréscimo (default: capture.kcap)")
+    record_parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (default: 127.0.0.1)")
+    record_parser.add_argument("--port", type=int, default=8788, help="Porta de escuta (default: 8788)")
+    record_parser.add_argument("--timeout", type=float, default=30.0,
+                               help="Timeout do repasse ao destino em segundos (default: 30)")
+    record_parser.add_argument("--pool-size", type=int, default=32,
+                               help="Conexões e threads de repasse ao destino (default: 32)")
+    record_parser.add_argument("--duration", type=float, help="Encerra após N segundos (opcional)")
+    
+    # Parser para verificação em lote
+    verify_parser = subparsers.add_parser("verify", help="Verificar as assinaturas de um arquivo NDJSON de eventos")
+    verify_parser.add_argument("--file", required=True, help="Arquivo NDJSON (generate ou eventos capturados)")
+    verify_parser.add_argument("--secret-key", required=True, help="Chave secreta da Kiwify")
+    verify_parser.add_argument("--processes", type=int, default=1,
+                               help="Número de processos que dividem o arquivo (default: 1)")
+    verify_parser.add_argument("--mirror-backend", action="store_true",
+                               help="Assina o JSON reserializado, como o validateKiwifyWebhook, "
+                                    "em vez dos bytes gravados")
+    verify_parser.add_argument("--show-invalid", type=int, default=20,
+                               help="Linhas com problema listadas no relatório (default: 20)")
+    verify_parser.add_argument("--report-json", help="Arquivo para salvar o relatório em JSON (\"-\" para stdout)")
+    
+    # Parser para benchmark de assinatura
+    bench_parser = subparsers.add_parser("bench-signature", help="Medir a vazão de assinatura e verificação HMAC")
+    bench_parser.add_argument("--secret-key", default="benchmark",
+                              help="Chave usada nas assinaturas (default: benchmark)")
+    bench_parser.add_argument("--events", default=",".join(EVENT_COMMANDS),
+                              help=f"Eventos medidos (default: {','.join(EVENT_COMMANDS)})")
+    bench_parser.add_argument("--sizes", default="4096,16384,65536",
+                              help="Tamanhos adicionais do corpo em bytes, além do payload original "
+                                   "(default: 4096,16384,65536)")
+    bench_parser.add_argument("--seconds", type=float, default=0.5,
+                              help="Duração de cada medição em segundos (default: 0.5)")
+    bench_parser.add_argument("--report-json", help="Arquivo para salvar o resultado em JSON (\"-\" para stdout)")
+    
+    # Parser para benchmark de tamanho do payload
+    payload_parser = subparsers.add_parser("bench-payload",
+                                           help="Medir latência e aceitação da assinatura conforme o payload cresce")
+    payload_parser.add_argument("--event-type", choices=list(EVENT_COMMANDS), default="renewed",
+                                help="Evento enviado (default: renewed; fora approved, cada caso aprova antes "
+                                     "um cliente da sonda)")
+    payload_parser.add_argument("--charges", default="1,12,60,240",
+                                help="Cobranças passadas em Subscription.charges (default: 1,12,60,240)")
+    payload_parser.add_argument("--tracking", default="0,2000,20000",
+                                help="Caracteres nos valores de TrackingParameters (default: 0,2000,20000)")
+    payload_parser.add_argument("--name-length", default="0,200,2000",
+                                help="Caracteres fora do ASCII no nome do cliente e do produto, 0 mantém os "
+                                     "originais (default: 0,200,2000)")
+    payload_parser.add_argument("--grid", action="store_true",
+                                help="Mede todas as combinações em vez de variar uma dimensão por vez")
+    payload_parser.add_argument("--requests", type=int, default=30,
+                                help="Requisições por caso (default: 30)")
+    payload_parser.add_argument("--concurrency", type=int, default=1,
+                                help="Requisições simultâneas em cada caso (default: 1)")
+    payload_parser.add_argument("--seed", type=int, default=0, help="Semente dos ids gerados (default: 0)")
+    _add_sender_arguments(payload_parser)
+    payload_parser.add_argument("--report-json", help="Arquivo para salvar o resultado em JSON (\"-\" para stdout)")
+    
+    # Parser para sonda de cold start
+    coldstart_parser = subparsers.add_parser("coldstart",
+                                             help="Medir cold starts por ociosidade e rajadas de concorrência")
+    coldstart_parser.add_argument("--gaps", default="30,120,300,600,900",
+                                  help="Segundos ociosos antes de cada requisição (default: 30,120,300,600,900)")
+    coldstart_parser.add_argument("--repeats", type=int, default=1,
+                                  help="Requisições por período ocioso (default: 1)")
+    coldstart_parser.add_argument("--bursts", default="5,20",
+                                  help="Rajadas de requisições simultâneas, vazio desativa (default: 5,20)")
+    coldstart_parser.add_argument("--burst-idle", type=float, default=5.0,
+                                  help="Segundos ociosos antes de cada rajada (default: 5)")
+    coldstart_parser.add_argument("--warmup", type=int, default=5,
+                                  help="Requisições seguidas que medem a latência quente (default: 5)")
+    coldstart_parser.add_argument("--cold-threshold", type=float,
+                                  help="Tempo de servidor em ms acima do qual a resposta é fria "
+                                       "(default: derivado da latência quente)")
+    coldstart_parser.add_argument("--cold-factor", type=float, default=3.0,
+                                  help="Limiar como múltiplo da mediana quente (default: 3)")
+    coldstart_parser.add_argument("--cold-margin", type=float, default=250.0,
+                                  help="Limiar mínimo em ms acima da mediana quente (default: 250)")
+    coldstart_parser.add_argument("--event-type", choices=list(EVENT_COMMANDS), default="renewed",
+                                  help="Evento enviado; com renewed, canceled ou chargeback uma compra aprovada no "
+                                       "aquecimento cria um único cliente da sonda, usado por todas as requisições "
+                                       "(default: renewed)")
+    coldstart_parser.add_argument("--timeout", type=float, default=60.0,
+                                  help="Timeout de cada requisição em segundos (default: 60)")
+    coldstart_parser.add_argument("--seed", type=int, default=0, help="Semente dos ids gerados (default: 0)")
+    coldstart_parser.add_argument("--report-json", help="Arquivo para salvar o resultado em JSON (\"-\" para stdout)")
+    
     # Argumentos comuns
-    for p in [approved_parser, renewed_parser, canceled_parser, chargeback_parser]:
-        p.add_argument("--url", help="URL do webhook (default: https://us-central1-minerx-app-login.cloudfunctions.net/kiwifyWebhook)")
+    for p in [approved_parser, renewed_parser, canceled_parser, chargeback_parser, load_parser, soak_parser,
+              capacity_parser, payload_parser, coldstart_parser]:
+        p.add_argument("--url", help=f"URL do webhook (default: {DEFAULT_WEBHOOK_URL})")
         p.add_argument("--secret-key", required=True, help="Chave secreta da Kiwify para calcular a assinatura HMAC")
+    # O coordenador não assina eventos: cada agente usa a sua chave secreta
+    coordinator_parser.add_argument("--url", help=f"URL do webhook (default: {DEFAULT_WEBHOOK_URL})")
     
-    args = parser.parse_args()
+    for p in [approved_parser, renewed_parser, canceled_parser, chargeback_parser]:
+        p.add_argument("--output", choices=OUTPUT_MODES, default="summary",
+                       help="quiet: só o código de saída; summary: uma linha de resultado; verbose: payload "
+                            "e resposta formatados (default: summary)")
+        p.add_argument("--show-payload", action="store_true", help="Equivale a --output verbose")
+    
+    return parser
     
-    # URL padrão
-    url = args.url or "https://us-central1-minerx-app-login.cloudfunctions.net/kiwifyWebhook"
     
+def run_event_command(args: argparse.Namespace, url: str, sender: Optional[WebhookSender] = None) -> int:
+    """
+    Envia um evento avulso (approved, renewed, canceled, chargeback)
+    
+    Args:
+        args: Argumentos do subcomando do evento
+        url: URL do webhook
+        sender: Sender com pool de conexões (opcional, usado pelo daemon)
+    
+    Returns:
+        Código de saída (0 apenas com resposta 200)
+    """
     # Gera payload baseado no tipo de evento
     if args.event == "approved":
         payload = create_order_approved_payload(
@@ -656,32 +1341,79 @@ Exemplos:
         )
     else:
         print(f"❌ Tipo de evento inválido: {args.event}")
-        sys.exit(1)
+        return 1
     
     # Envia webhook
+    output = "verbose" if args.show_payload else args.output
     try:
         secret_key = getattr(args, "secret_key", None)
         if not secret_key:
             print("❌ Chave secreta não fornecida. Use --secret-key")
-            sys.exit(1)
+            return 1
         
         response = send_webhook(
             url=url,
             payload=payload,
             secret_key=secret_key,
+            sender=sender,
+            output=output,
         )
         
         if response.status_code == 200:
-            print("\n✅ Webhook enviado com sucesso!")
-            sys.exit(0)
+            if output == "verbose":
+                print("\n✅ Webhook enviado com sucesso!")
+            return 0
         else:
-            print(f"\n⚠️  Webhook retornou status {response.status_code}")
-            sys.exit(1)
+            if output != "quiet":
+                print(f"\n⚠️  Webhook retornou status {response.status_code}")
+            return 1
     except Exception as e:
-        print(f"\n❌ Erro: {e}")
-        sys.exit(1)
+        if output != "quiet":
+            print(f"\n❌ Erro: {e}")
+        return 1
+
+
+def main():
+    """Função principal"""
+    args = build_parser().parse_args()
+    
+    if args.event == "generate":
+        sys.exit(run_generate_command(args))
+    if args.event == "serve":
+        sys.exit(run_serve_command(args))
+    if args.event == "record":
+        sys.exit(run_record_command(args))
+    if args.event == "verify":
+        sys.exit(run_verify_command(args))
+    if args.event == "bench-signature":
+        sys.exit(run_bench_signature_command(args))
+    if args.event == "compare":
+        sys.exit(run_compare_command(args))
+    if args.event == "agent":
+        sys.exit(run_agent_command(args))
+    if args.event == "daemon":
+        sys.exit(run_daemon_command(args))
+    
+    # URL padrão
+    url = args.url or DEFAULT_WEBHOOK_URL
+    
+    if args.event == "load":
+        sys.exit(run_load_command(args, url))
+    if args.event == "soak":
+        sys.exit(run_soak_command(args, url))
+    if args.event == "coordinator":
+        sys.exit(run_coordinator_command(args, url))
+    if args.event == "replay":
+        sys.exit(run_replay_command(args, url))
+    if args.event == "capacity":
+        sys.exit(run_capacity_command(args, url))
+    if args.event == "bench-payload":
+        sys.exit(run_bench_payload_command(args, url))
+    if args.event == "coldstart":
+        sys.exit(run_coldstart_command(args, url))
+    
+    sys.exit(run_event_command(args, url))
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os testes importam o pacote kiwify_sim da pasta do simulador, como o simulate_webhook.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
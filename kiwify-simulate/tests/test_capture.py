@@ -0,0 +1,76 @@
+"""Testes do log de captura do record: gravação, leitura pelo índice e varredura sem índice"""
+
+import os
+
+import pytest
+
+from kiwify_sim.capture import CaptureLog, is_capture_file, read_capture, redact_capture_headers
+
+
+def records(count):
+    return [
+        ({"ts": 1000.0 + index, "method": "POST", "path": "/kiwifyWebhook", "headers": {"x-n": str(index)}},
+         f'{{"n":{index},"texto":"ção"}}'.encode("utf-8") + b"\n\x00" * index)
+        for index in range(count)
+    ]
+
+
+@pytest.fixture
+def capture(tmp_path):
+    path = str(tmp_path / "captura.kwlog")
+    log = CaptureLog(path)
+    for metadata, body in records(20):
+        log.append(metadata, body)
+    log.close()
+    return path
+
+
+def read_all(path, start=0, stop=None):
+    return [(metadata["ts"], body) for metadata, body in read_capture(path, start, stop)]
+
+
+def expected(start=0, stop=None):
+    return [(metadata["ts"], body) for metadata, body in records(20)[start:stop]]
+
+
+def test_round_trip_through_the_index(capture):
+    assert is_capture_file(capture)
+    assert read_all(capture) == expected()
+    assert read_all(capture, 5, 9) == expected(5, 9)
+    metadata, _ = next(read_capture(capture))
+    assert metadata["body_length"] == len(records(1)[0][1])
+
+
+def test_appending_continues_the_numbering(capture):
+    log = CaptureLog(capture)
+    assert log.records == 20
+    assert log.append({"ts": 5000.0}, b"{}") == 20
+    log.close()
+    assert read_all(capture)[-1] == (5000.0, b"{}")
+
+
+def test_scan_without_index(capture):
+    os.remove(capture + ".idx")
+    assert read_all(capture) == expected()
+    assert read_all(capture, 18) == expected(18)
+
+
+def test_truncated_tail_is_skipped(capture):
+    with open(capture, "ab") as f:
+        f.write(b"\x1f\x8b\x08\x00partial")
+    os.remove(capture + ".idx")
+    assert read_all(capture) == expected()
+
+
+def test_index_ahead_of_data_falls_back_to_scan(capture):
+    size = os.path.getsize(capture)
+    with open(capture, "r+b") as f:
+        f.truncate(size - 5)
+    assert read_all(capture) == expected(0, 19)
+
+
+def test_sensitive_headers_are_redacted():
+    headers = {"authorization": "Bearer x", "cookie": "a=b", "x-forwarded-for": "1.2.3.4", "content-type": "json"}
+    assert redact_capture_headers(headers) == {
+        "authorization": "[redacted]", "cookie": "[redacted]", "x-forwarded-for": "[redacted]", "content-type": "json",
+    }
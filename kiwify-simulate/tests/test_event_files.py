@@ -0,0 +1,69 @@
+"""Testes dos arquivos NDJSON de eventos: intervalos de bytes, shards por assinatura e formato das linhas"""
+
+from dataclasses import replace
+
+import pytest
+
+from kiwify_sim.event_files import (
+    format_event_line, iter_event_file, iter_event_file_range, iter_event_file_shard, parse_event_line,
+    split_file_ranges, write_event_file,
+)
+from kiwify_sim.scenarios import simulate_lifecycle
+
+
+@pytest.fixture
+def event_file(tmp_path):
+    path = tmp_path / "eventos.ndjson"
+    write_event_file(str(path), simulate_lifecycle("k", customers=40, months=3, seed=3))
+    return str(path)
+
+
+def test_line_round_trip_keeps_body_bytes():
+    event = next(simulate_lifecycle("k", customers=1, months=1, seed=1))
+    parsed = parse_event_line(format_event_line(event))
+    # O instante é gravado com precisão de milissegundos
+    assert parsed == replace(event, at=round(event.at, 3))
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 7, 16])
+def test_ranges_cover_the_file_exactly_once(event_file, count):
+    everything = [event.body for event in iter_event_file(event_file)]
+    ranges = split_file_ranges(event_file, count)
+    assert len(ranges) == count
+    assert ranges[0][0] == 0
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    
+    pieces = [event.body for start, end in ranges for event in iter_event_file_range(event_file, start, end)]
+    assert pieces == everything
+
+
+def test_ranges_of_an_empty_file(tmp_path):
+    path = tmp_path / "vazio.ndjson"
+    path.write_bytes(b"")
+    ranges = split_file_ranges(str(path), 3)
+    assert ranges == [(0, 0)] * 3
+    assert list(iter_event_file_range(str(path), 0, 0)) == []
+
+
+def test_shards_partition_by_subscription_in_file_order(event_file):
+    everything = list(iter_event_file(event_file))
+    shards = [list(iter_event_file_shard(event_file, index, 3)) for index in range(3)]
+    assert sorted(event.body for shard in shards for event in shard) == sorted(event.body for event in everything)
+    
+    owner = {}
+    for index, shard in enumerate(shards):
+        for event in shard:
+            assert owner.setdefault(event.subscription_id, index) == index
+        # Cada shard mantém a ordem relativa do arquivo
+        order = [event.body for event in everything if owner.get(event.subscription_id) == index]
+        assert [event.body for event in shard] == order
+
+
+def test_shard_key_falls_back_to_parsing_non_standard_lines(tmp_path):
+    path = tmp_path / "manual.ndjson"
+    path.write_bytes(
+        b'{"body":{"a":1},"event":"x","signature":"s","subscription_id":"sub-1"}\n'
+        b'{"event":"y","signature":"s","subscription_id":"sub\\u002d1","body":{"a":2}}\n'
+    )
+    shards = [list(iter_event_file_shard(str(path), index, 4)) for index in range(4)]
+    assert [len(shard) for shard in shards].count(2) == 1
@@ -0,0 +1,113 @@
+"""Testes dos perfis de taxa (parse_rate_profile) e da injeção de falhas (FaultInjection)"""
+
+import itertools
+import json
+
+import pytest
+
+from kiwify_sim.loadgen import FaultInjection, parse_rate_profile
+from kiwify_sim.payloads import EventType, PreparedEvent
+from kiwify_sim.scenarios import generate_load_events, parse_event_mix
+
+
+def test_constant_profile_spaces_arrivals_evenly():
+    profile = parse_rate_profile("constant:10")
+    assert profile.segments == [(float("inf"), 10.0)]
+    arrivals = list(itertools.islice(profile.arrivals(), 5))
+    assert arrivals == pytest.approx([0.1, 0.2, 0.3, 0.4, 0.5])
+    # A compressão acelera o relógio sem mudar o formato
+    assert list(itertools.islice(profile.arrivals(compress=2), 2)) == pytest.approx([0.05, 0.1])
+
+
+def test_step_profile_counts_per_segment():
+    profile = parse_rate_profile("step:10@1,20@2")
+    assert profile.segments == [(1.0, 10.0), (2.0, 20.0)]
+    arrivals = list(profile.arrivals())
+    assert len(arrivals) == 50
+    assert sum(at <= 1.0 + 1e-9 for at in arrivals) == 10
+    assert profile.rate_at(0.5) == 10 and profile.rate_at(2.5) == 20 and profile.rate_at(3.5) == 0
+
+
+def test_spike_profile_segments():
+    profile = parse_rate_profile("spike:5,50,10,2")
+    assert profile.segments == [(10.0, 5.0), (2.0, 50.0), (float("inf"), 5.0)]
+    assert profile.rate_at(11) == 50
+
+
+def test_poisson_profile_is_reproducible_with_seed():
+    first = list(itertools.islice(parse_rate_profile("poisson:100", seed=7).arrivals(), 200))
+    second = list(itertools.islice(parse_rate_profile("poisson:100", seed=7).arrivals(), 200))
+    assert first == second
+    assert first != [index / 100 for index in range(1, 201)]
+    assert 1.0 < first[-1] < 3.0
+
+
+def test_curve_profile_reads_counts_per_minute(tmp_path):
+    curve = tmp_path / "curva.csv"
+    curve.write_text("minuto,contagem\n0,60\n1,120\n", encoding="utf-8")
+    profile = parse_rate_profile(f"curve:{curve}")
+    assert profile.segments == [(60.0, 1.0), (60.0, 2.0)]
+    assert len(list(profile.arrivals())) == 180
+
+
+@pytest.mark.parametrize("spec", ["linear:10", "constant:abc", "step:10", "spike:1,2"])
+def test_invalid_profiles_raise_value_error(spec):
+    with pytest.raises(ValueError):
+        parse_rate_profile(spec)
+
+
+def events(count, subscriptions=None):
+    return [
+        PreparedEvent(
+            event_type="order_approved",
+            body=json.dumps({"n": index}).encode(),
+            signature=f"sig{index}",
+            subscription_id=(subscriptions or {}).get(index, f"sub{index}"),
+        )
+        for index in range(count)
+    ]
+
+
+def test_no_faults_pass_events_through():
+    original = events(20)
+    faults = FaultInjection(seed=1)
+    assert not faults.enabled
+    assert list(faults.apply(original)) == original
+
+
+def test_duplicates_are_resent_after_the_gap():
+    original = events(10)
+    delivered = list(FaultInjection(duplicate=1.0, copies=3, gap=2, seed=1).apply(original))
+    assert len(delivered) == 30
+    for event in original:
+        positions = [index for index, sent in enumerate(delivered) if sent.body == event.body]
+        assert len(positions) == 3
+        assert len({delivered[index].tag for index in positions}) == 1
+        assert delivered[positions[0]].tag.startswith("duplicate:")
+        assert all(delivered[index].signature == event.signature for index in positions)
+
+
+def test_concurrent_copies_are_tagged_in_place():
+    delivered = list(FaultInjection(concurrent=1.0, copies=4, seed=1).apply(events(5)))
+    assert [event.body for event in delivered] == [event.body for event in events(5)]
+    assert all(event.copies == 4 and event.tag.startswith("concurrent:") for event in delivered)
+
+
+def test_reorder_swaps_events_of_the_same_subscription():
+    original = events(4, subscriptions={0: "a", 1: "b", 2: "a", 3: "b"})
+    delivered = list(FaultInjection(reorder=1.0, seed=1).apply(original))
+    assert [event.body for event in delivered] == [original[2].body, original[0].body,
+                                                   original[3].body, original[1].body]
+    assert delivered[0].tag == delivered[1].tag != delivered[2].tag == delivered[3].tag
+
+
+def test_reorder_without_partner_synthesizes_a_cancel_first():
+    mix = parse_event_mix("approved")
+    original = list(generate_load_events(mix, "k", total=3, seed=1))
+    delivered = list(FaultInjection(reorder=1.0, window=1, secret_key="k", seed=1).apply(original))
+    assert len(delivered) == 6
+    for cancel, purchase in zip(delivered[::2], delivered[1::2]):
+        assert cancel.event_type == EventType.SUBSCRIPTION_CANCELED.value
+        assert purchase.event_type == EventType.ORDER_APPROVED.value
+        assert cancel.subscription_id == purchase.subscription_id
+        assert cancel.tag == purchase.tag
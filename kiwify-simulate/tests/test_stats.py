@@ -0,0 +1,124 @@
+"""Testes do LatencyHistogram e da comparação entre execuções (compare_runs)"""
+
+import random
+
+from kiwify_sim.stats import LatencyHistogram, LoadStats, compare_runs
+
+
+def make_stats(latencies_ms, failures=None, elapsed=10.0):
+    """LoadStats com as latências (ms) e falhas por tipo de evento"""
+    failures = failures or {}
+    stats = LoadStats()
+    for event_type, values in latencies_ms.items():
+        histogram = stats.latency_by_event.setdefault(event_type, LatencyHistogram())
+        for value in values:
+            histogram.record(value / 1000)
+            stats.latency["total"].record(value / 1000)
+        failed = failures.get(event_type, 0)
+        stats.sent += len(values)
+        stats.events[event_type] = len(values)
+        stats.failed_by_event[event_type] = failed
+        stats.status_counts[200] = stats.status_counts.get(200, 0) + len(values) - failed
+        if failed:
+            stats.status_counts[500] = stats.status_counts.get(500, 0) + failed
+    stats.started_at, stats.finished_at = 0.0, elapsed
+    return stats
+
+
+def sample(mean_ms, count, seed):
+    rng = random.Random(seed)
+    return [max(0.1, rng.gauss(mean_ms, mean_ms / 10)) for _ in range(count)]
+
+
+def test_histogram_percentiles_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(value / 1000)
+    assert histogram.total_count == 1000
+    for percentile, expected in ((50, 500), (90, 900), (99, 990)):
+        assert abs(histogram.percentile_ms(percentile) - expected) / expected < 0.002
+    assert abs(histogram.mean_ms - 500.5) < 0.01
+    assert histogram.percentile_ms(100) >= 1000
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.total_count == 0
+    assert histogram.percentile_ms(99) == 0
+    assert histogram.mean_ms == 0
+
+
+def test_histogram_merge_and_difference():
+    first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for value in sample(20, 500, seed=1):
+        first.record(value / 1000)
+        combined.record(value / 1000)
+    snapshot = LatencyHistogram.from_dict(first.to_dict())
+    for value in sample(80, 500, seed=2):
+        second.record(value / 1000)
+        combined.record(value / 1000)
+    
+    first.merge(second)
+    assert first.counts == combined.counts
+    assert first.total_count == 1000
+    assert first.percentile_ms(99) == combined.percentile_ms(99)
+    assert first.difference(snapshot).counts == second.counts
+
+
+def test_histogram_dict_round_trip():
+    histogram = LatencyHistogram()
+    for value in sample(35, 300, seed=3):
+        histogram.record(value / 1000)
+    restored = LatencyHistogram.from_dict(histogram.to_dict())
+    assert restored.counts == histogram.counts
+    assert restored.total_count == histogram.total_count
+    assert restored.max_us == histogram.max_us
+    for percentile in LatencyHistogram.PERCENTILES:
+        assert restored.percentile_ms(percentile) == histogram.percentile_ms(percentile)
+
+
+def test_compare_identical_runs_has_no_regressions():
+    latencies = {"order_approved": sample(50, 400, seed=4), "chargeback": sample(60, 100, seed=5)}
+    comparison = compare_runs(make_stats(latencies), make_stats(latencies))
+    assert comparison["regressions"] == []
+    assert not any(row["regressed"] or row["error_regressed"] for row in comparison["events"])
+
+
+def test_compare_flags_slower_event():
+    baseline = make_stats({"order_approved": sample(50, 400, seed=6), "chargeback": sample(50, 400, seed=7)})
+    candidate = make_stats({"order_approved": sample(50, 400, seed=8), "chargeback": sample(90, 400, seed=9)})
+    comparison = compare_runs(baseline, candidate, max_throughput_drop=None)
+    rows = {row["name"]: row for row in comparison["events"]}
+    assert rows["chargeback"]["regressed"]
+    assert not rows["order_approved"]["regressed"]
+    assert any(regression.startswith("chargeback: p99") for regression in comparison["regressions"])
+
+
+def test_compare_gates_error_rate_per_event():
+    latencies = {"order_approved": sample(50, 5000, seed=10), "chargeback": sample(50, 200, seed=11)}
+    baseline = make_stats(latencies)
+    # 20% de erro no chargeback, diluído para menos de 1% no total
+    candidate = make_stats(latencies, failures={"chargeback": 40})
+    comparison = compare_runs(baseline, candidate, max_error_rate_increase=0.01)
+    rows = {row["name"]: row for row in comparison["events"]}
+    assert rows["chargeback"]["error_regressed"]
+    assert not rows["order_approved"]["error_regressed"]
+    assert not comparison["overall"]["error_regressed"]
+    assert any("chargeback: taxa de erro" in regression for regression in comparison["regressions"])
+
+
+def test_compare_marks_missing_event_types():
+    baseline = make_stats({"order_approved": sample(50, 300, seed=12)})
+    candidate = make_stats({"order_approved": sample(50, 300, seed=12), "chargeback": sample(50, 300, seed=13)})
+    comparison = compare_runs(baseline, candidate)
+    rows = {row["name"]: row for row in comparison["events"]}
+    assert rows["chargeback"]["missing"] == "baseline"
+    assert not rows["chargeback"]["evaluated"]
+    assert not rows["chargeback"]["error_regressed"]
+    assert rows["order_approved"]["missing"] is None
+
+
+def test_compare_flags_throughput_drop():
+    latencies = {"order_approved": sample(50, 400, seed=14)}
+    comparison = compare_runs(make_stats(latencies, elapsed=10.0), make_stats(latencies, elapsed=20.0))
+    assert any(regression.startswith("vazão") for regression in comparison["regressions"])